@@ -0,0 +1,194 @@
+"""
+Vektorisierte Variante von calculate_score für viele Kandidaten auf einmal und ein
+Parameter-Sweep darüber (ebAlert sweep). Die Rechenschritte sind exakt die aus
+calculate_score, in derselben Reihenfolge und mit denselben Float-Operationen, so dass
+Marge und Score bitgenau übereinstimmen.
+
+Datengrundlage sind die Kandidaten aus dem Scan-Archiv, die bis zur Bewertung gekommen
+sind (eBay-Median und GPT-Flags vorhanden). Optional zeigt eine Label-Datei (CSV mit
+Anzeigen-ID und 1/0 für guter/schlechter Deal), wie präzise die Alarme je Parameter wären.
+"""
+import csv
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ebAlert.core.rules import RuleSet
+from ebAlert.core.scan_archive import iter_records
+from ebAlert.main import EBAY_ASKING_TO_SALE_FACTOR, NONE_PRICE
+
+
+@dataclass
+class CandidateBatch:
+    ids: np.ndarray
+    offer_prices: np.ndarray
+    medians: np.ndarray
+    bundle: np.ndarray
+    obsolete: np.ndarray
+    accessory_only: np.ndarray
+    boosted: np.ndarray
+    # 1 = guter Deal, 0 = schlechter Deal, -1 = kein Label
+    labels: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def score_batch(offer_prices, medians, bundle, obsolete, accessory_only, boosted,
+                sale_factor: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Wie calculate_score, nur für Arrays: liefert (Marge in EUR, Score 0-100)."""
+    if sale_factor is None:
+        sale_factor = EBAY_ASKING_TO_SALE_FACTOR
+    offer_prices = np.asarray(offer_prices, dtype=np.float64)
+    medians = np.asarray(medians, dtype=np.float64)
+
+    net_sale = medians * sale_factor
+    target_buy = offer_prices * 0.88
+    margin_eur = net_sale - target_buy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin_pct = np.where(target_buy != 0, margin_eur / target_buy, -1.0)
+    score = margin_pct * 200
+
+    score = np.where(np.asarray(bundle, dtype=bool), 100.0, score)
+    score = np.where(np.asarray(obsolete, dtype=bool), score - 40, score)
+    score = np.where(np.asarray(accessory_only, dtype=bool), 0.0, score)
+    score = np.where(np.asarray(boosted, dtype=bool), score + 30, score)
+
+    # int() schneidet Richtung 0 ab, danach auf 0..100 begrenzen
+    scores = np.clip(np.trunc(score), 0, 100).astype(np.int64)
+    return round_like_python(margin_eur, 2), scores
+
+
+def round_like_python(values: np.ndarray, digits: int) -> np.ndarray:
+    """np.round rechnet über x * 10**digits und kann bei fast genau ,5 anders runden als
+    Pythons round(). Die (seltenen) Werte nahe dieser Grenze werden deshalb einzeln mit
+    round() nachgerechnet."""
+    rounded = np.round(values, digits)
+    scaled = values * 10 ** digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_tie):
+        rounded[index] = round(float(values[index]), digits)
+    return rounded
+
+
+def alert_mask(margins: np.ndarray, scores: np.ndarray, minimum_margin_eur: float, minimum_score: float) -> np.ndarray:
+    """Wie is_alert: Marge oder Score reicht, aber nie bei Score 0."""
+    return ((margins >= minimum_margin_eur) | (scores >= minimum_score)) & (scores != 0)
+
+
+def load_candidates(records: Iterable[dict], rules: RuleSet, labels: Optional[Dict[str, int]] = None) -> CandidateBatch:
+    rows = []
+    seen = set()
+    for record in records:
+        if record.get("ebay_median") is None or record.get("gpt_flags") is None:
+            continue
+        listing = record["listing"]
+        item_id = str(listing["id"])
+        if item_id in seen:
+            continue
+        seen.add(item_id)
+        flags = record["gpt_flags"]
+        price = listing.get("price_value")
+        title_lower = (listing.get("title") or "").lower()
+        description_lower = (listing.get("description") or "").lower()
+        boosted = bool(rules.matcher.matches(title_lower, "score_boosters")
+                       or rules.matcher.matches(description_lower, "score_boosters"))
+        rows.append((
+            item_id,
+            NONE_PRICE if price is None else price,
+            record["ebay_median"],
+            bool(flags.get("bundle")),
+            bool(flags.get("obsolete")),
+            bool(flags.get("accessory_only")),
+            boosted,
+            (labels or {}).get(item_id, -1),
+        ))
+    columns = list(zip(*rows)) if rows else [()] * 8
+    return CandidateBatch(
+        ids=np.array(columns[0], dtype=object),
+        offer_prices=np.array(columns[1], dtype=np.float64),
+        medians=np.array(columns[2], dtype=np.float64),
+        bundle=np.array(columns[3], dtype=bool),
+        obsolete=np.array(columns[4], dtype=bool),
+        accessory_only=np.array(columns[5], dtype=bool),
+        boosted=np.array(columns[6], dtype=bool),
+        labels=np.array(columns[7], dtype=np.int8),
+    )
+
+
+def load_labels(path: str) -> Dict[str, int]:
+    """CSV-Zeilen "anzeigen_id,1" (guter Deal) oder "anzeigen_id,0"; Kopfzeile optional."""
+    labels = {}
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file):
+            if len(row) >= 2 and row[1].strip() in ("0", "1"):
+                labels[row[0].strip()] = int(row[1])
+    return labels
+
+
+@dataclass
+class SweepCell:
+    sale_factor: float
+    minimum_score: float
+    minimum_margin_eur: float
+    alerts: int
+    labeled_alerts: int
+    good_alerts: int
+
+    @property
+    def precision(self) -> Optional[float]:
+        return self.good_alerts / self.labeled_alerts if self.labeled_alerts else None
+
+
+def sweep(batch: CandidateBatch, sale_factors: Sequence[float], minimum_scores: Sequence[float],
+          minimum_margins: Sequence[float]) -> List[SweepCell]:
+    cells = []
+    scores_grid = np.asarray(minimum_scores, dtype=np.float64)[:, None, None]
+    margins_grid = np.asarray(minimum_margins, dtype=np.float64)[None, :, None]
+    labeled = batch.labels >= 0
+    good = batch.labels == 1
+    for sale_factor in sale_factors:
+        margins, scores = score_batch(batch.offer_prices, batch.medians, batch.bundle, batch.obsolete,
+                                      batch.accessory_only, batch.boosted, sale_factor)
+        # (Score-Schwellen x Margen-Schwellen x Kandidaten) in einem Rutsch
+        alerts = ((margins[None, None, :] >= margins_grid) | (scores[None, None, :] >= scores_grid)) \
+            & (scores != 0)[None, None, :]
+        alert_counts = alerts.sum(axis=2)
+        labeled_counts = (alerts & labeled).sum(axis=2)
+        good_counts = (alerts & good).sum(axis=2)
+        for i, minimum_score in enumerate(minimum_scores):
+            for j, minimum_margin in enumerate(minimum_margins):
+                cells.append(SweepCell(sale_factor, minimum_score, minimum_margin, int(alert_counts[i, j]),
+                                       int(labeled_counts[i, j]), int(good_counts[i, j])))
+    return cells
+
+
+def parse_range(value: str) -> List[float]:
+    """"start:stop:step" (inklusive stop) oder eine kommagetrennte Liste."""
+    if ":" in value:
+        start, stop, step = (float(part) for part in value.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + index * step, 6) for index in range(count)]
+    return [float(part) for part in value.split(",") if part.strip()]
+
+
+def run_sweep(days: int, rules: RuleSet, sale_factors: Sequence[float], minimum_scores: Sequence[float],
+              minimum_margins: Sequence[float], labels_file: Optional[str] = None) -> Tuple[CandidateBatch, List[SweepCell]]:
+    labels = load_labels(labels_file) if labels_file else None
+    batch = load_candidates(iter_records(days), rules, labels)
+    return batch, sweep(batch, sale_factors, minimum_scores, minimum_margins)
+
+
+def print_sweep(batch: CandidateBatch, cells: List[SweepCell], days: int, rules: RuleSet, top: Optional[int] = None):
+    print(f"{len(batch)} Kandidaten aus {days} Tagen, davon {int((batch.labels >= 0).sum())} mit Label")
+    print(f"{'Faktor':>8}{'Score':>7}{'Marge':>7}{'Alarme':>8}{'pro Tag':>9}{'Präzision':>11}")
+    if top and any(cell.labeled_alerts for cell in cells):
+        cells = sorted(cells, key=lambda cell: (cell.precision or 0, cell.alerts), reverse=True)[:top]
+    for cell in cells:
+        precision = f"{cell.precision:.0%} ({cell.good_alerts}/{cell.labeled_alerts})" if cell.labeled_alerts else "-"
+        current = "  <- aktuell" if (abs(cell.sale_factor - EBAY_ASKING_TO_SALE_FACTOR) < 1e-9
+                                     and cell.minimum_score == rules.minimum_score
+                                     and cell.minimum_margin_eur == rules.minimum_margin_eur) else ""
+        print(f"{cell.sale_factor:>8.4f}{cell.minimum_score:>7.0f}{cell.minimum_margin_eur:>7.0f}{cell.alerts:>8}"
+              f"{cell.alerts / days:>9.1f}{precision:>11}{current}")
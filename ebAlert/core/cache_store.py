@@ -0,0 +1,313 @@
+"""
+Gemeinsamer Key-Value-Cache auf SQLite (WAL-Modus) für alles, was bisher als JSON-Datei
+komplett geladen und bei jeder Änderung komplett neu geschrieben wurde (eBay-Preise,
+GPT-Suchbegriffe). Jeder Cache ist ein Namespace mit eigener Version: Einträge einer
+anderen Version gelten als nicht vorhanden und werden beim Öffnen entfernt.
+
+- Lesen: erst ein kleiner LRU im Prozess, dann ein indizierter Zugriff auf genau einen Key
+- Schreiben: pro Aufruf eine Transaktion, Upsert pro Key - parallel laufende Prozesse
+  (links --sync und start) überschreiben sich nicht mehr gegenseitig ganze Dateien
+- optionales TTL pro Eintrag, abgelaufene Einträge zählen als nicht vorhanden
+- pro Namespace höchstens max_entries Einträge, die ältesten fliegen zuerst raus
+
+Daneben liegt in derselben Datei der Preisverlauf pro Query (Tabelle price_history, siehe
+ebayscrapping/price_history.py) - der wird nur angehängt, nie überschrieben.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from ebAlert.core.config import settings
+
+# Version des Tabellen-Layouts (PRAGMA user_version), nicht der Cache-Inhalte
+SCHEMA_VERSION = 2  # 2: Tabelle price_history
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    version TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_cache_entry_stored_at ON cache_entry (namespace, stored_at);
+CREATE INDEX IF NOT EXISTS ix_cache_entry_expires_at ON cache_entry (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS cache_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    query TEXT NOT NULL,
+    ts REAL NOT NULL,
+    median REAL NOT NULL,
+    n_samples INTEGER NOT NULL,
+    dispersion REAL,
+    PRIMARY KEY (query, ts)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: Any
+    stored_at: float
+    expires_at: Optional[float]
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.time()) - self.stored_at
+
+
+class CacheStore:
+    def __init__(self, path: str, memory_entries: int = 1024, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.memory_entries = memory_entries
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, "CacheNamespace"] = {}
+        self._schema_ready = False
+
+    def connection(self) -> sqlite3.Connection:
+        """Eine Verbindung pro Thread - sqlite3-Verbindungen dürfen nicht geteilt werden."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            try:
+                # Enthält u.a. den eBay-OAuth-Token - nur für den eigenen Benutzer lesbar
+                os.chmod(self.path, 0o600)
+            except OSError:
+                pass
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+            with self._lock:
+                if not self._schema_ready:
+                    self._migrate(conn)
+                    self._schema_ready = True
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        (current,) = conn.execute("PRAGMA user_version").fetchone()
+        if current > SCHEMA_VERSION:
+            raise RuntimeError(f"Cache-Datei {self.path} hat Schema {current}, unterstützt wird bis {SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def namespace(self, name: str, version: str, max_entries: Optional[int] = None,
+                  default_ttl: Optional[float] = None) -> "CacheNamespace":
+        with self._lock:
+            namespace = self._namespaces.get(name)
+            if namespace is None:
+                namespace = CacheNamespace(self, name, version, max_entries, default_ttl)
+                self._namespaces[name] = namespace
+            return namespace
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.connection().execute("SELECT value FROM cache_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.connection().execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def acquire_lease(self, name: str, owner: str, duration: float) -> bool:
+        """Prozessübergreifende Sperre mit Ablaufzeit: True, wenn `owner` die Lease jetzt
+        hält (neu erworben oder verlängert). Stirbt der Halter, läuft sie einfach ab."""
+        key = f"lease:{name}"
+        now = self.now()
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM cache_meta WHERE key = ?", (key,)).fetchone()
+            if row:
+                holder, until = row[0].rsplit("|", 1)
+                if holder != owner and float(until) > now:
+                    conn.execute("COMMIT")
+                    return False
+            conn.execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES (?, ?)", (key, f"{owner}|{now + duration}"))
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_lease(self, name: str, owner: str):
+        self.connection().execute("DELETE FROM cache_meta WHERE key = ? AND value LIKE ?",
+                                  (f"lease:{name}", f"{owner}|%"))
+
+    def now(self) -> float:
+        return self._clock()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class CacheNamespace:
+    def __init__(self, store: CacheStore, name: str, version: str, max_entries: Optional[int],
+                 default_ttl: Optional[float]):
+        self.store = store
+        self.name = name
+        self.version = version
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._purged = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = self.store.connection()
+        if not self._purged:
+            self._purged = True
+            # Einträge einer alten Version werden nie wieder gelesen - gleich beim ersten Zugriff entfernen
+            dropped = conn.execute("DELETE FROM cache_entry WHERE namespace = ? AND version != ?",
+                                   (self.name, self.version)).rowcount
+            expired = conn.execute("DELETE FROM cache_entry WHERE namespace = ? AND expires_at < ?",
+                                   (self.name, self.store.now())).rowcount
+            if dropped:
+                print(f"🧹 Cache '{self.name}': {dropped} Einträge einer alten Version verworfen.")
+            if expired:
+                print(f"🧹 Cache '{self.name}': {expired} abgelaufene Einträge entfernt.")
+        return conn
+
+    def get_entry(self, key: str, use_memory: bool = True) -> Optional[CacheEntry]:
+        """use_memory=False liest immer aus der Datei, z.B. um Änderungen anderer Prozesse zu sehen."""
+        now = self.store.now()
+        entry = None
+        with self._lock:
+            if use_memory:
+                entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            row = self._conn().execute(
+                "SELECT value, stored_at, expires_at FROM cache_entry WHERE namespace = ? AND key = ? AND version = ?",
+                (self.name, key, self.version)).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(json.loads(row[0]), row[1], row[2])
+            self._remember(key, entry)
+        if entry.expires_at is not None and entry.expires_at <= now:
+            return None
+        return entry
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry.value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_entry(key) is not None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, stored_at: Optional[float] = None):
+        self.set_many({key: value}, ttl=ttl, stored_at=stored_at)
+
+    def set_many(self, items: Mapping[str, Any], ttl: Optional[float] = None, stored_at: Optional[float] = None):
+        """Alle Einträge in einer Transaktion - entweder alle oder keiner."""
+        if not items:
+            return
+        stored_at = stored_at if stored_at is not None else self.store.now()
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = stored_at + ttl if ttl is not None else None
+        rows = [(self.name, key, json.dumps(value), self.version, stored_at, expires_at) for key, value in items.items()]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO cache_entry (namespace, key, value, version, stored_at, expires_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        for key, value in items.items():
+            self._remember(key, CacheEntry(value, stored_at, expires_at))
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", (self.name, key))
+        with self._lock:
+            self._memory.pop(key, None)
+
+    def clear(self) -> int:
+        count = self._conn().execute("DELETE FROM cache_entry WHERE namespace = ?", (self.name,)).rowcount
+        with self._lock:
+            self._memory.clear()
+        return count
+
+    def __len__(self) -> int:
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM cache_entry WHERE namespace = ? AND version = ?",
+                                        (self.name, self.version)).fetchone()
+        return count
+
+    def items(self) -> Iterable[Tuple[str, CacheEntry]]:
+        rows = self._conn().execute(
+            "SELECT key, value, stored_at, expires_at FROM cache_entry WHERE namespace = ? AND version = ?",
+            (self.name, self.version)).fetchall()
+        for key, value, stored_at, expires_at in rows:
+            yield key, CacheEntry(json.loads(value), stored_at, expires_at)
+
+    def import_json_once(self, path: str, convert: Callable[[str, Any], Optional[Tuple[Any, Optional[float]]]]) -> int:
+        """Übernimmt eine alte JSON-Cachedatei einmalig. convert(key, raw) liefert (Wert,
+        Speicherzeitpunkt oder None) oder None zum Überspringen. Die Datei selbst bleibt
+        liegen; ist sie nicht lesbar, wird es beim nächsten Start erneut versucht."""
+        marker = f"imported:{self.name}:{os.path.abspath(path)}"
+        if not os.path.exists(path) or self.store.get_meta(marker):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except Exception as e:
+            print(f"❌ Cache '{self.name}': {path} nicht lesbar ({e}) - Import später erneut.")
+            return 0
+
+        by_time: Dict[Optional[float], Dict[str, Any]] = {}
+        for key, value in raw.items():
+            converted = convert(key, value)
+            if converted is not None:
+                value, stored_at = converted
+                by_time.setdefault(stored_at, {})[key] = value
+        imported = 0
+        for stored_at, items in by_time.items():
+            # bereits vorhandene (neuere) Einträge nicht mit Altdaten überschreiben
+            items = {key: value for key, value in items.items() if self.get_entry(key) is None}
+            self.set_many(items, stored_at=stored_at)
+            imported += len(items)
+        self.store.set_meta(marker, str(self.store.now()))
+        print(f"📥 Cache '{self.name}': {imported} Einträge aus {path} übernommen.")
+        return imported
+
+    def _remember(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.store.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self, conn: sqlite3.Connection):
+        if not self.max_entries:
+            return
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entry WHERE namespace = ?", (self.name,)).fetchone()
+        if count <= self.max_entries:
+            return
+        evicted = [row[0] for row in conn.execute(
+            "SELECT key FROM cache_entry WHERE namespace = ? ORDER BY stored_at LIMIT ?",
+            (self.name, count - self.max_entries))]
+        conn.executemany("DELETE FROM cache_entry WHERE namespace = ? AND key = ?",
+                         [(self.name, key) for key in evicted])
+        with self._lock:
+            for key in evicted:
+                self._memory.pop(key, None)
+
+
+cache_store = CacheStore(settings.CACHE_DB, memory_entries=settings.CACHE_MEMORY_ENTRIES)
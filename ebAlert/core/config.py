@@ -21,6 +21,58 @@ class Settings:
     LOGGING = os.environ.get("LOGGING") or logging.ERROR
     URL_BASE = "https://www.kleinanzeigen.de"
     OPEN_API_KEY = os.environ.get("OPEN_API_KEY") or "Your_OpenAI_Key"
+    # GPT-Aufrufe (siehe gpt_evaluator.py) laufen in Chunks parallel: höchstens
+    # GPT_CONCURRENCY gleichzeitig, jeder bricht nach GPT_CHUNK_TIMEOUT Sekunden ab.
+    # Chunkgrößen für Suchbegriffe und Bewertung.
+    GPT_CONCURRENCY = int(os.environ.get("GPT_CONCURRENCY") or 5)
+    GPT_CHUNK_TIMEOUT = float(os.environ.get("GPT_CHUNK_TIMEOUT") or 60)
+    GPT_QUERY_CHUNK_SIZE = int(os.environ.get("GPT_QUERY_CHUNK_SIZE") or 10)
+    GPT_EVAL_CHUNK_SIZE = int(os.environ.get("GPT_EVAL_CHUNK_SIZE") or 8)
+
+    # Parallele Abrufe (siehe core/fetch_engine.py): höchstens so viele gleichzeitige
+    # Requests pro Host, und jeder Request bricht nach FETCH_TIMEOUT Sekunden ab -
+    # eine hängende Suchseite blockiert damit nicht mehr den ganzen Scan.
+    FETCH_CONCURRENCY_PER_HOST = int(os.environ.get("FETCH_CONCURRENCY_PER_HOST") or 4)
+    FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT") or 20)
+    # Gemeinsamer HTTP-Client (siehe core/http_client.py)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT") or 5)
+    HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES") or 3)
+    HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE") or max(10, FETCH_CONCURRENCY_PER_HOST * 2))
+    # Adaptiver Rate-Limiter für kleinanzeigen.de (siehe core/ratelimit.py), in Requests/s.
+    # Startwert, Unter-/Obergrenze und wie viele Requests kurz hintereinander erlaubt sind.
+    RATE_LIMIT_INITIAL = float(os.environ.get("RATE_LIMIT_INITIAL") or 2)
+    RATE_LIMIT_MIN = float(os.environ.get("RATE_LIMIT_MIN") or 0.2)
+    RATE_LIMIT_MAX = float(os.environ.get("RATE_LIMIT_MAX") or 8)
+    RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST") or 4)
+    # Obergrenze fürs Weiterblättern pro Link und Scan (siehe EbayItemFactory)
+    MAX_PAGES_PER_LINK = int(os.environ.get("MAX_PAGES_PER_LINK") or 5)
+    # Adaptiver Abruf-Takt pro Link (siehe core/scheduler.py), Angaben in Sekunden.
+    # Tagsüber wurde bisher alle 45-90s gescannt - daran orientieren sich die Defaults.
+    SCHEDULER_MIN_INTERVAL = float(os.environ.get("SCHEDULER_MIN_INTERVAL") or 45)
+    SCHEDULER_MAX_INTERVAL = float(os.environ.get("SCHEDULER_MAX_INTERVAL") or 900)
+    SCHEDULER_INITIAL_INTERVAL = float(os.environ.get("SCHEDULER_INITIAL_INTERVAL") or 60)
+    # Gesamtbudget: so viele Link-Abrufe pro Stunde über alle Links zusammen
+    SCHEDULER_MAX_POLLS_PER_HOUR = float(os.environ.get("SCHEDULER_MAX_POLLS_PER_HOUR") or 240)
+    # Zielwert: im Schnitt so viele neue Anzeigen pro Abruf eines Links
+    SCHEDULER_TARGET_NEW_PER_POLL = float(os.environ.get("SCHEDULER_TARGET_NEW_PER_POLL") or 1)
+    # Parser für die Ergebnisseiten: "lxml" (schnell, parst nur die Ergebnisliste) oder
+    # "soup" (bisheriger BeautifulSoup/html.parser-Weg als Fallback)
+    PARSER_BACKEND = os.environ.get("PARSER_BACKEND") or "lxml"
+    # Wie lange die Entscheidungsspur pro Anzeige (ebAlert rules --trace) aufgehoben wird
+    DECISION_TRACE_DAYS = int(os.environ.get("DECISION_TRACE_DAYS") or 14)
+    # Archiv aller ausgewerteten Anzeigen für "ebAlert replay" (SCAN_ARCHIVE=0 schaltet es ab)
+    SCAN_ARCHIVE = (os.environ.get("SCAN_ARCHIVE") or "1") != "0"
+    ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR") or os.path.join(PERSISTENT_DIR, "scan_archive")
+    ARCHIVE_RETENTION_DAYS = int(os.environ.get("ARCHIVE_RETENTION_DAYS") or 60)
+    # Regeldatei mit Keyword-Listen und Schwellwerten; leer = ebAlert/rules.toml
+    RULES_FILE = os.environ.get("RULES_FILE") or ""
+    # Gemeinsamer SQLite-Cache für eBay-Preise und GPT-Suchbegriffe (siehe core/cache_store.py):
+    # wie viele Einträge zusätzlich im Speicher gehalten werden und Obergrenze pro Cache
+    CACHE_DB = os.environ.get("CACHE_DB") or os.path.join(PERSISTENT_DIR, "cache.db")
+    CACHE_MEMORY_ENTRIES = int(os.environ.get("CACHE_MEMORY_ENTRIES") or 2048)
+    CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES") or 50000)
+    # Wie lange Fingerprints bewerteter Anzeigen für die Repost-Erkennung aufgehoben werden
+    REPOST_RETENTION_DAYS = int(os.environ.get("REPOST_RETENTION_DAYS") or 30)
 
     # Offizielle eBay Browse API (ersetzt die gescheiterten Scraping-Versuche via
     # ScraperAPI/ZenRows/Scrapfly/Oxylabs - eBay verlangt für die Sold/Completed-Suche
@@ -30,13 +82,46 @@ class Settings:
     EBAY_CLIENT_ID = os.environ.get("EBAY_CLIENT_ID") or ""
     EBAY_CLIENT_SECRET = os.environ.get("EBAY_CLIENT_SECRET") or ""
     EBAY_MARKETPLACE_ID = os.environ.get("EBAY_MARKETPLACE_ID") or "EBAY_DE"
+    # So viele verschiedene Preisabfragen laufen pro Scan gleichzeitig
+    EBAY_LOOKUP_CONCURRENCY = int(os.environ.get("EBAY_LOOKUP_CONCURRENCY") or 4)
+    # Preis-Cache: bis EBAY_PRICE_FRESH_SECONDS gilt ein Median als frisch (8 Wochen). Danach
+    # wird er noch EBAY_PRICE_STALE_SECONDS lang sofort verwendet und parallel im Hintergrund
+    # erneuert (stale-while-revalidate); erst noch ältere Werte werden im Scan live abgefragt.
+    # EBAY_PRICE_STALE_SECONDS=0 schaltet das ab.
+    EBAY_PRICE_FRESH_SECONDS = float(os.environ.get("EBAY_PRICE_FRESH_SECONDS") or 8 * 7 * 24 * 3600)
+    EBAY_PRICE_STALE_SECONDS = float(os.environ.get("EBAY_PRICE_STALE_SECONDS") or 8 * 7 * 24 * 3600)
+    # Schätzer für den Marktwert aus der eBay-Stichprobe (siehe ebayscrapping/price_estimators.py):
+    # "legacy" (bisherige feste Buckets) oder "robust" (MAD-Ausreißerfilter + Median). Der
+    # Standard bleibt "legacy", damit sich Alarme nicht unbemerkt verschieben - "robust" erst
+    # nach einem Vergleich mit `ebAlert estimators` einschalten.
+    PRICE_ESTIMATOR = os.environ.get("PRICE_ESTIMATOR") or "legacy"
+    # Preisverlauf pro Query (siehe ebayscrapping/price_history.py). Trend über die letzten
+    # PRICE_TREND_DAYS Tage, Volatilität über PRICE_VOLATILITY_DAYS Tage. Ein Punkt entsteht
+    # nur bei einer Live-Abfrage, also etwa alle EBAY_PRICE_FRESH_SECONDS (8 Wochen) - das
+    # Trendfenster muss mindestens zwei solcher Abstände umfassen, sonst gibt es keinen Trend.
+    PRICE_TREND_DAYS = float(os.environ.get("PRICE_TREND_DAYS") or 120)
+    PRICE_VOLATILITY_DAYS = float(os.environ.get("PRICE_VOLATILITY_DAYS") or 180)
+    # Marktwert aus einer älteren Stichprobe mit dem Trend auf heute fortschreiben,
+    # höchstens um PRICE_TREND_MAX_ADJUST (relativ) nach oben oder unten
+    PRICE_TREND_ADJUST = (os.environ.get("PRICE_TREND_ADJUST") or "false").lower() == "true"
+    PRICE_TREND_MAX_ADJUST = float(os.environ.get("PRICE_TREND_MAX_ADJUST") or 0.15)
+    # Adaptive Cache-Laufzeit pro Query: statt fest EBAY_PRICE_FRESH_SECONDS so lange, bis
+    # sich der Preis voraussichtlich um PRICE_VOLATILITY_TARGET (5%) bewegt hat - zwischen
+    # EBAY_PRICE_MIN_FRESH_SECONDS (3 Tage) und EBAY_PRICE_MAX_FRESH_SECONDS (16 Wochen).
+    # Braucht mindestens drei Punkte im Verlauf, vorher gilt EBAY_PRICE_FRESH_SECONDS.
+    EBAY_PRICE_ADAPTIVE_EXPIRY = (os.environ.get("EBAY_PRICE_ADAPTIVE_EXPIRY") or "true").lower() == "true"
+    EBAY_PRICE_MIN_FRESH_SECONDS = float(os.environ.get("EBAY_PRICE_MIN_FRESH_SECONDS") or 3 * 24 * 3600)
+    EBAY_PRICE_MAX_FRESH_SECONDS = float(os.environ.get("EBAY_PRICE_MAX_FRESH_SECONDS") or 16 * 7 * 24 * 3600)
+    PRICE_VOLATILITY_TARGET = float(os.environ.get("PRICE_VOLATILITY_TARGET") or 0.05)
+    # Der OAuth-Token wird so viele Sekunden vor Ablauf im Hintergrund erneuert
+    EBAY_TOKEN_REFRESH_MARGIN = float(os.environ.get("EBAY_TOKEN_REFRESH_MARGIN") or 600)
     # Zustands-Filter: 3000-6000 = gebrauchte Abstufungen (excellent/very good/good/
     # acceptable). Bewusst OHNE 1000/1500 (Neu), 2000/2500 (Refurbished - Händler-
     # Aufpreis) und 7000 (defekt/Ersatzteile) - diese verzerren den Median sonst nach
     # oben bzw. unten weg vom realistischen Preis eines gebrauchten Privatverkaufs.
     EBAY_CONDITION_IDS = os.environ.get("EBAY_CONDITION_IDS") or "3000|4000|5000|6000"
     # Testmodus: die eBay-API wird aufgerufen und die Preise fürs Scoring genutzt,
-    # aber NICHT in ebay_price_cache.json geschrieben. Auf "true" setzen, solange du
+    # aber NICHT in den Preis-Cache geschrieben. Auf "true" setzen, solange du
     # dir noch nicht sicher bist, dass die Werte zuverlässig gut sind - so bleiben die
     # bestehenden Cache-Werte unangetastet.
     EBAY_PRICE_CACHE_READONLY = (os.environ.get("EBAY_PRICE_CACHE_READONLY") or "false").lower() == "true"
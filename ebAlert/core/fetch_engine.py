@@ -0,0 +1,167 @@
+"""
+Kleine asyncio-Engine, um viele blockierende Abrufe (requests, Parsing, ...) parallel
+auszuführen. Jeder Job läuft in einem Worker-Thread, pro Ziel-Host sind höchstens
+FETCH_CONCURRENCY_PER_HOST Jobs gleichzeitig aktiv und jeder Job hat einen eigenen
+Timeout. Ergebnisse werden in der Reihenfolge geliefert, in der sie fertig werden -
+eine Scan-Runde dauert damit so lange wie der langsamste Abruf, nicht wie die Summe.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from ebAlert.core.config import settings
+
+
+class Job(NamedTuple):
+    key: Hashable
+    func: Callable[[], Any]
+    host: str = ""
+    timeout: Optional[float] = None
+
+
+class JobResult(NamedTuple):
+    key: Hashable
+    result: Any
+    error: Optional[BaseException]
+    elapsed: float
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+# Eigener Executor statt des Default-Executors: der ist auf min(32, CPUs + 4) Threads
+# begrenzt und würde auf einer 1-CPU-Maschine die Parallelität still deckeln. Er wird
+# von allen Aufrufen geteilt, statt pro Runde einen neuen anzulegen.
+MAX_WORKERS = 32
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fetch")
+
+
+class _HostSlots:
+    """Belegte Plätze pro Host, über alle Runden hinweg. Ein Platz wird erst frei, wenn der
+    Worker-Thread wirklich fertig ist - auch wenn der Job vorher per Timeout aufgegeben
+    wurde. Ein hängender Request zählt damit weiter gegen das Limit seines Hosts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy: Dict[str, int] = {}
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+
+    async def acquire(self, host: str, limit: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._busy.get(host, 0) < limit:
+                    self._busy[host] = self._busy.get(host, 0) + 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.setdefault(host, []).append((loop, waiter))
+            await waiter
+
+    def release(self, host: str):
+        """Darf aus jedem Thread aufgerufen werden."""
+        with self._lock:
+            self._busy[host] -= 1
+            waiters = self._waiters.pop(host, [])
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # Loop einer bereits beendeten Runde - dort wartet niemand mehr
+                pass
+
+    def busy(self, host: str) -> int:
+        with self._lock:
+            return self._busy.get(host, 0)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_slots = _HostSlots()
+
+
+async def iter_jobs_async(jobs: Iterable[Job], per_host_limit: Optional[int] = None,
+                          timeout: Optional[float] = None) -> AsyncIterator[JobResult]:
+    """Führt alle Jobs aus und liefert die JobResults, sobald sie fertig sind.
+    Fehler und Timeouts landen in JobResult.error, statt die ganze Runde abzubrechen."""
+    jobs = list(jobs)
+    if not jobs:
+        return
+    per_host_limit = per_host_limit or settings.FETCH_CONCURRENCY_PER_HOST
+    timeout = timeout or settings.FETCH_TIMEOUT
+
+    async def run(job: Job) -> JobResult:
+        await _slots.acquire(job.host, per_host_limit)
+        started = time.perf_counter()
+        try:
+            future = _executor.submit(job.func)
+        except BaseException:
+            _slots.release(job.host)
+            raise
+        # Platz erst freigeben, wenn der Thread fertig ist - nicht schon beim Timeout
+        future.add_done_callback(lambda _: _slots.release(job.host))
+        try:
+            # shield: ein Timeout gibt nur das Warten auf, nicht den (laufenden) Thread
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), job.timeout or timeout)
+            return JobResult(job.key, result, None, time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            # noch nicht gestartete Jobs gar nicht erst laufen lassen
+            future.cancel()
+            error = TimeoutError(f"Timeout nach {job.timeout or timeout:.0f}s")
+            return JobResult(job.key, None, error, time.perf_counter() - started)
+        except Exception as e:
+            return JobResult(job.key, None, e, time.perf_counter() - started)
+
+    tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Nicht auf hängende Threads warten - requests hat eigene Timeouts und beendet sie,
+        # ihre Plätze bleiben bis dahin belegt.
+        for task in tasks:
+            task.cancel()
+
+
+def iter_completed(jobs: Iterable[Job], per_host_limit: Optional[int] = None,
+                   timeout: Optional[float] = None) -> Iterator[JobResult]:
+    """Synchrone Variante für den (synchronen) Rest des Bots: die Event-Loop läuft in
+    einem Hintergrund-Thread, die Ergebnisse kommen im aufrufenden Thread an. Dadurch
+    können DB-Session & Co. weiterhin nur im Haupt-Thread benutzt werden."""
+    results = queue.Queue()
+    finished = object()
+    stop = threading.Event()
+    failure = []
+
+    async def pump():
+        async for job_result in iter_jobs_async(jobs, per_host_limit, timeout):
+            results.put(job_result)
+            if stop.is_set():
+                break
+
+    def worker():
+        try:
+            asyncio.run(pump())
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            results.put(finished)
+
+    threading.Thread(target=worker, name="fetch-engine", daemon=True).start()
+    try:
+        while True:
+            job_result = results.get()
+            if job_result is finished:
+                break
+            yield job_result
+    finally:
+        stop.set()
+    if failure:
+        raise failure[0]
@@ -0,0 +1,130 @@
+"""
+Gemeinsamer HTTP-Client für alle ausgehenden Requests (Suchseiten, Detailseiten,
+eBay-API, Telegram). Eine Session mit Connection-Pool pro Host und Keep-Alive, damit
+nicht jeder Abruf einen neuen TLS-Handshake bezahlt, dazu einheitliche Timeouts,
+Retries und Zähler für übertragene Bytes und Latenz pro Host.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ebAlert import create_logger
+from ebAlert.core.config import settings
+from ebAlert.core.fetch_engine import host_of
+from ebAlert.core.ratelimit import all_limiters, limiter_for
+
+log = create_logger(__name__)
+
+try:
+    # urllib3 dekodiert "br" nur, wenn eines der Brotli-Pakete installiert ist
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HttpClient:
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        # Wiederholt werden nur Verbindungsfehler und 5xx bei idempotenten Requests.
+        # 429/403 bewusst nicht - die soll der Aufrufer sehen und darauf reagieren.
+        retries = Retry(
+            total=settings.HTTP_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[500, 502, 503, 504],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=settings.HTTP_POOL_SIZE, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", (settings.HTTP_CONNECT_TIMEOUT, settings.FETCH_TIMEOUT))
+        host = host_of(url)
+        # Drosselung pro Host (siehe core/ratelimit.py) - blockiert, bis ein Token frei ist
+        limiter = limiter_for(host)
+        if limiter:
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self._record(host, time.perf_counter() - started, 0, error=True)
+            if limiter:
+                limiter.on_throttle(f"Verbindungsfehler ({type(e).__name__})")
+            raise
+        latency = time.perf_counter() - started
+        # Bei stream=True ist der Body noch nicht gelesen - dann zählt record_transfer()
+        # die Bytes, sobald der Aufrufer fertig ist, und Sperrseiten muss der Aufrufer selbst
+        # erkennen (siehe seller_helper.fetch_seller_info).
+        streamed = kwargs.get("stream", False)
+        transferred = 0 if streamed else self._wire_bytes(response)
+        self._record(host, latency, transferred, error=False)
+        if limiter:
+            limiter.observe(response.status_code, latency, response.headers.get("Retry-After"),
+                            None if streamed else response.content)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def record_transfer(self, response: requests.Response):
+        """Für gestreamte Antworten: übertragene Bytes nachträglich verbuchen."""
+        with self._lock:
+            self._host_stats(host_of(response.url))["bytes"] += self._wire_bytes(response)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {host: dict(values) for host, values in self._stats.items()}
+
+    def format_stats(self) -> str:
+        lines = []
+        for host, values in sorted(self.stats().items()):
+            average = values["latency_total"] / values["requests"] if values["requests"] else 0
+            lines.append(f"🌐 {host}: {values['requests']} Requests, {values['errors']} Fehler, "
+                         f"{values['bytes'] / 1024:.0f} KB, Latenz Ø {average * 1000:.0f} ms / "
+                         f"max {values['latency_max'] * 1000:.0f} ms")
+        lines.extend(f"🚦 {limiter.describe()}" for limiter in all_limiters().values())
+        return "\n".join(lines)
+
+    @staticmethod
+    def _wire_bytes(response: requests.Response) -> int:
+        # tell() zählt die tatsächlich (ggf. komprimiert) übertragenen Bytes
+        raw = getattr(response, "raw", None)
+        try:
+            return int(raw.tell())
+        except Exception:
+            return len(response.content or b"")
+
+    def _host_stats(self, host: str) -> dict:
+        values = self._stats.get(host)
+        if values is None:
+            values = {"requests": 0, "errors": 0, "bytes": 0, "latency_total": 0.0, "latency_max": 0.0}
+            self._stats[host] = values
+        return values
+
+    def _record(self, host: str, latency: float, transferred: int, error: bool):
+        with self._lock:
+            values = self._host_stats(host)
+            values["requests"] += 1
+            values["errors"] += error
+            values["bytes"] += transferred
+            values["latency_total"] += latency
+            values["latency_max"] = max(values["latency_max"], latency)
+
+
+http_client = HttpClient()
@@ -0,0 +1,92 @@
+"""
+Aho-Corasick-Automat für alle Keyword-Listen. Statt für jede Liste jedes Keyword einzeln
+per `word in text` zu suchen (mehrere tausend Teilstring-Suchen pro Anzeige), wird aus
+allen Listen einmal ein Automat gebaut, der den Text in einem einzigen Durchlauf liest
+und alle Treffer aller Listen liefert.
+
+Standard ist die bisherige Teilstring-Semantik ("nas" trifft auch "nascar"). Für
+einzelne Listen kann stattdessen Wortgrenzen-Semantik eingeschaltet werden.
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    def __init__(self, lists: Mapping[str, Iterable[str]], word_boundary: Iterable[str] = ()):
+        self.list_names = list(lists)
+        self.word_boundary = set(word_boundary)
+        # (Liste, Position in der Liste, Keyword) pro Muster
+        self._patterns: List[Tuple[str, int, str]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for name, words in lists.items():
+            for position, word in enumerate(words):
+                if word:
+                    self._add(len(self._patterns), word)
+                    self._patterns.append((name, position, word))
+        self._build_fail_links()
+        self.scan = lru_cache(maxsize=512)(self._scan)
+
+    def _add(self, pattern_id: int, word: str):
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # Treffer des Fallback-Zustands gelten auch hier ("ddr5" endet auf "dr5")
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _scan(self, text: str) -> Dict[str, Tuple[str, ...]]:
+        """Alle Treffer im (kleingeschriebenen) Text: Listenname -> Keywords in Listenreihenfolge."""
+        text = (text or "").lower()
+        found = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                if pattern_id in found:
+                    continue
+                name, _, word = self._patterns[pattern_id]
+                if name in self.word_boundary:
+                    start = end - len(word) + 1
+                    if (start > 0 and _is_word_char(text[start - 1])) or \
+                            (end + 1 < len(text) and _is_word_char(text[end + 1])):
+                        continue
+                found.add(pattern_id)
+        matches: Dict[str, List[Tuple[int, str]]] = {}
+        for pattern_id in found:
+            name, position, word = self._patterns[pattern_id]
+            matches.setdefault(name, []).append((position, word))
+        # doppelte Listeneinträge nur einmal melden
+        return {name: tuple(dict.fromkeys(word for _, word in sorted(hits))) for name, hits in matches.items()}
+
+    def matches(self, text: str, list_name: str) -> Tuple[str, ...]:
+        return self.scan(text).get(list_name, ())
@@ -0,0 +1,178 @@
+"""
+Deklarative Filter-Pipeline für die Vorfilterung der gescrapten Anzeigen. Jede Stufe gibt
+ihre Kostenklasse an (CPU < lokales I/O < Netzwerk < bezahlte API); die Pipeline führt
+die billigen Stufen immer zuerst aus und bricht pro Anzeige ab, sobald eine Stufe sie
+verwirft. Stufen mit fetch-Funktion laden ihre Daten parallel über die Fetch-Engine, die
+nachfolgenden Prüfungen laufen pro Anzeige, sobald deren Daten da sind.
+
+Pro Lauf werden für jede Stufe Durchgelassene, Verworfene, Fehler und die verbrauchte
+Zeit gezählt - damit ist sichtbar, wo Zeit und Geld hingehen.
+"""
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ebAlert.core.fetch_engine import Job, host_of, iter_completed
+
+
+class Cost(IntEnum):
+    CPU = 0
+    LOCAL_IO = 1
+    NETWORK = 2
+    PAID_API = 3
+
+
+@dataclass
+class Candidate:
+    item: Any
+    order: int
+    # Zwischenergebnisse der Stufen (Preis, Whitelist-Treffer, Verkäuferdaten, ...)
+    ctx: Dict[str, Any] = field(default_factory=dict)
+    # Name der Stufe, die die Anzeige verworfen hat
+    dropped_by: Optional[str] = None
+    # True, wenn sie wegen eines Fehlers (Abruf/Prüfung) verworfen wurde statt per Urteil
+    failed: bool = False
+
+
+@dataclass
+class Stage:
+    name: str
+    cost: Cost
+    # True = Anzeige bleibt drin. Darf candidate.ctx ergänzen.
+    check: Callable[[Candidate], bool]
+    # Optional: lädt die Daten der Stufe (läuft parallel), Ergebnis landet in ctx[name]
+    fetch: Optional[Callable[[Candidate], Any]] = None
+    # Namen der Stufen, deren ctx-Daten diese Stufe braucht
+    requires: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageStats:
+    passed: int = 0
+    dropped: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+class FilterPipeline:
+    def __init__(self, stages: Sequence[Stage]):
+        self.stages = order_stages(stages)
+        self.stats: Dict[str, StageStats] = {}
+        self.dropped: List[Candidate] = []
+
+    def run(self, items: Iterable[Any]) -> List[Candidate]:
+        """Lässt alle Anzeigen durch die Stufen laufen und gibt die übrigen in der
+        ursprünglichen Reihenfolge zurück. Statistik und self.dropped gelten jeweils für
+        den letzten Lauf."""
+        self.stats = {stage.name: StageStats() for stage in self.stages}
+        self.dropped = []
+        survivors = [Candidate(item, order) for order, item in enumerate(items)]
+        for segment in self._segments():
+            head = segment[0]
+            if head.fetch is None:
+                survivors = [c for c in survivors if self._apply(segment, c)]
+                continue
+            jobs = [Job(key=index, func=_bind(head.fetch, candidate), host=_host_of_candidate(candidate))
+                    for index, candidate in enumerate(survivors)]
+            passed = []
+            for job_result in iter_completed(jobs):
+                candidate = survivors[job_result.key]
+                stats = self.stats[head.name]
+                stats.seconds += job_result.elapsed
+                if job_result.error is not None:
+                    stats.errors += 1
+                    print(f"⚠️ Fehler bei Vorfilterung Item {_item_id(candidate)}: {job_result.error}")
+                    candidate.failed = True
+                    self._drop(candidate, head)
+                    continue
+                candidate.ctx[head.name] = job_result.result
+                if self._apply(segment, candidate):
+                    passed.append(candidate)
+            survivors = sorted(passed, key=lambda c: c.order)
+        return survivors
+
+    def format_stats(self) -> str:
+        parts = []
+        for stage in self.stages:
+            stats = self.stats.get(stage.name)
+            if stats is None or not (stats.passed or stats.dropped):
+                continue
+            total = stats.passed + stats.dropped
+            errors = f", {stats.errors} Fehler" if stats.errors else ""
+            parts.append(f"{stage.name} [{stage.cost.name}] {total}→{stats.passed}"
+                         f" ({stats.seconds * 1000:.0f} ms{errors})")
+        return "🔬 Filter: " + " | ".join(parts) if parts else "🔬 Filter: keine Anzeigen"
+
+    def _segments(self) -> List[List[Stage]]:
+        """Jede fetch-Stufe beginnt ein neues Segment; die folgenden Prüfungen gehören dazu
+        und laufen pro Anzeige direkt nach deren Abruf."""
+        segments: List[List[Stage]] = []
+        for stage in self.stages:
+            if stage.fetch is not None or not segments:
+                segments.append([stage])
+            else:
+                segments[-1].append(stage)
+        return segments
+
+    def _apply(self, stages: Sequence[Stage], candidate: Candidate) -> bool:
+        for stage in stages:
+            stats = self.stats[stage.name]
+            started = time.perf_counter()
+            try:
+                keep = stage.check(candidate)
+            except Exception as e:
+                keep = False
+                candidate.failed = True
+                stats.errors += 1
+                print(f"⚠️ Fehler bei Vorfilterung Item {_item_id(candidate)}: {e}")
+            # bei fetch-Stufen ist die Abrufzeit schon verbucht, hier kommt nur die Prüfung dazu
+            stats.seconds += time.perf_counter() - started
+            if not keep:
+                self._drop(candidate, stage)
+                return False
+            stats.passed += 1
+        return True
+
+    def _drop(self, candidate: Candidate, stage: Stage):
+        candidate.dropped_by = stage.name
+        self.stats[stage.name].dropped += 1
+        self.dropped.append(candidate)
+
+
+def order_stages(stages: Sequence[Stage]) -> List[Stage]:
+    """Sortiert stabil nach Kostenklasse. Eine Stufe ist nie billiger als die Stufen, deren
+    Daten sie braucht, und läuft immer nach ihnen - die Prüfungen auf Verkäuferdaten sind
+    zwar reine CPU, kommen aber zwangsläufig erst nach dem Abruf der Detailseite."""
+    by_name = {stage.name: stage for stage in stages}
+    effective: Dict[str, Tuple[int, int]] = {}
+
+    def rank(stage: Stage, path=()) -> Tuple[int, int]:
+        if stage.name in effective:
+            return effective[stage.name]
+        if stage.name in path:
+            raise ValueError(f"Zyklische Abhängigkeit in Filterstufe '{stage.name}'")
+        cost, depth = int(stage.cost), 0
+        for name in stage.requires:
+            if name not in by_name:
+                raise ValueError(f"Filterstufe '{stage.name}' braucht unbekannte Stufe '{name}'")
+            required_cost, required_depth = rank(by_name[name], path + (stage.name,))
+            cost = max(cost, required_cost)
+            depth = max(depth, required_depth + 1)
+        effective[stage.name] = (cost, depth)
+        return cost, depth
+
+    return sorted(stages, key=rank)
+
+
+def _bind(fetch: Callable[[Candidate], Any], candidate: Candidate) -> Callable[[], Any]:
+    return lambda: fetch(candidate)
+
+
+def _host_of_candidate(candidate: Candidate) -> str:
+    link = getattr(candidate.item, "link", None)
+    return host_of(link) if link else ""
+
+
+def _item_id(candidate: Candidate):
+    return getattr(candidate.item, "id", candidate.order)
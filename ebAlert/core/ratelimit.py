@@ -0,0 +1,144 @@
+"""
+Rate-Limiter pro Ziel-Host: ein Token-Bucket, dessen Rate sich nach dem AIMD-Prinzip an
+das anpasst, was der Server toleriert. Jede erfolgreiche Antwort erhöht die Rate um einen
+kleinen festen Schritt (additiv), jedes Anzeichen von Ärger (429, 403, Sperrseite,
+Verbindungsfehler) halbiert sie (multiplikativ) und legt eine kurze Zwangspause ein.
+Sehr langsame Antworten bremsen leicht, bevor der Server überhaupt ablehnt.
+
+Alle Requests über core/http_client.py laufen automatisch hier durch - die festen
+sleep()-Aufrufe im Scan-Ablauf sind damit überflüssig.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from ebAlert.core.config import settings
+
+# Typische Inhalte einer Sperr-/Captcha-Seite, die trotzdem mit Status 200 ausgeliefert wird
+BLOCK_PAGE_MARKERS = (b"captcha", b"zugriff verweigert", b"access denied", b"ungew\xc3\xb6hnlich viele anfragen")
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, name: str, initial_rate: float, min_rate: float, max_rate: float, burst: float = 1.0,
+                 additive_step: float = 0.05, decrease_factor: float = 0.5, latency_threshold: float = 5.0,
+                 penalty_seconds: float = 10.0, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.additive_step = additive_step
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.penalty_seconds = penalty_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = burst
+        self._last_refill = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.throttle_events = 0
+
+    def acquire(self):
+        """Blockiert, bis ein Token frei ist."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            self._sleep(wait)
+
+    def on_success(self, latency: float = 0.0):
+        with self._lock:
+            if latency > self.latency_threshold:
+                # Server wird zäh - leicht bremsen statt weiter zu beschleunigen
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.additive_step)
+
+    def on_throttle(self, reason: str, retry_after: Optional[float] = None):
+        with self._lock:
+            self.throttle_events += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            pause = retry_after if retry_after is not None else self.penalty_seconds
+            self._blocked_until = max(self._blocked_until, self._clock() + pause)
+        print(f"🐢 Rate-Limit {self.name}: {reason} - neue Rate {self.rate:.2f}/s, Pause {pause:.0f}s")
+
+    def hold(self, seconds: float):
+        """Keine Requests vor Ablauf von `seconds` - ohne die Rate zu senken (die wurde
+        für dieselbe Antwort schon in observe() gesenkt)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def observe(self, status_code: int, latency: float, retry_after: Optional[str] = None,
+                content: Optional[bytes] = None):
+        if status_code in (429, 403):
+            self.on_throttle(f"Status {status_code}", parse_retry_after(retry_after))
+        elif content is not None and is_block_page(content):
+            self.on_throttle("Sperrseite erkannt")
+        elif status_code < 500:
+            self.on_success(latency)
+
+    def cooldown_remaining(self) -> float:
+        with self._lock:
+            return max(0.0, self._blocked_until - self._clock())
+
+    def describe(self) -> str:
+        return f"{self.name}: {self.rate:.2f} Requests/s, {self.throttle_events}x gebremst"
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_block_page(content: bytes) -> bool:
+    head = content[:20000].lower()
+    return any(marker in head for marker in BLOCK_PAGE_MARKERS)
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(host: str) -> Optional[AdaptiveRateLimiter]:
+    """Limiter für kleinanzeigen.de (alle Subdomains teilen sich einen) und die Telegram-API.
+    Andere Hosts (eBay-API, OpenAI) werden nicht gedrosselt."""
+    if host == "kleinanzeigen.de" or host.endswith(".kleinanzeigen.de"):
+        key = "kleinanzeigen.de"
+    elif host == "api.telegram.org":
+        key = host
+    else:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            if key == "kleinanzeigen.de":
+                limiter = AdaptiveRateLimiter(
+                    key,
+                    initial_rate=settings.RATE_LIMIT_INITIAL,
+                    min_rate=settings.RATE_LIMIT_MIN,
+                    max_rate=settings.RATE_LIMIT_MAX,
+                    burst=settings.RATE_LIMIT_BURST,
+                )
+            else:
+                # Telegram erlaubt ca. eine Nachricht pro Sekunde und Chat
+                limiter = AdaptiveRateLimiter(key, initial_rate=1.0, min_rate=0.1, max_rate=1.0, burst=3)
+            _limiters[key] = limiter
+        return limiter
+
+
+def all_limiters() -> Dict[str, AdaptiveRateLimiter]:
+    with _limiters_lock:
+        return dict(_limiters)
@@ -0,0 +1,128 @@
+"""
+Regeln und Schwellwerte aus der Regeldatei (standardmäßig ebAlert/rules.toml, per
+RULES_FILE änderbar). RulesWatcher prüft die Datei per mtime, validiert eine geänderte
+Fassung komplett und tauscht dann das RuleSet samt vorkompiliertem KeywordMatcher in
+einem Schritt aus - eine ungültige Datei lässt den alten Stand aktiv.
+"""
+import os
+import tomllib
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ebAlert.core.config import settings
+from ebAlert.core.keyword_matcher import KeywordMatcher
+
+KEYWORD_LISTS = ("whitelist", "p2", "score_boosters", "title_blacklist", "desc_blacklist", "excluded_keywords")
+# Whitelist, P2 und Booster wurden schon immer kleingeschrieben verglichen, die Blacklists so wie eingetragen
+LOWERCASED_LISTS = ("whitelist", "p2", "score_boosters")
+
+
+class RuleError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    version: int
+    minimum_score: float
+    minimum_margin_eur: float
+    max_item_price: float
+    min_item_price: float
+    whitelist: Tuple[str, ...]
+    p2: Tuple[str, ...]
+    score_boosters: Tuple[str, ...]
+    title_blacklist: Tuple[str, ...]
+    desc_blacklist: Tuple[str, ...]
+    excluded_keywords: Tuple[str, ...]
+    word_boundary: Tuple[str, ...]
+    matcher: KeywordMatcher
+
+
+def default_rules_path() -> str:
+    return settings.RULES_FILE or os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules.toml")
+
+
+def load_rules(path: str) -> RuleSet:
+    try:
+        with open(path, "rb") as file:
+            data = tomllib.load(file)
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        raise RuleError(f"Regeldatei {path} nicht lesbar: {e}") from e
+    return parse_rules(data)
+
+
+def parse_rules(data: dict) -> RuleSet:
+    version = data.get("version")
+    if not isinstance(version, int):
+        raise RuleError("'version' fehlt oder ist keine ganze Zahl")
+
+    thresholds = _table(data, "thresholds")
+    values = {}
+    for key in ("minimum_score", "minimum_margin_eur", "max_item_price", "min_item_price"):
+        value = thresholds.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RuleError(f"thresholds.{key} fehlt oder ist keine Zahl")
+        values[key] = value
+    if not 0 <= values["minimum_score"] <= 100:
+        raise RuleError("thresholds.minimum_score muss zwischen 0 und 100 liegen")
+    if not 0 <= values["min_item_price"] < values["max_item_price"]:
+        raise RuleError("thresholds: es muss 0 <= min_item_price < max_item_price gelten")
+
+    keywords = _table(data, "keywords")
+    lists = {}
+    for key in KEYWORD_LISTS:
+        words = keywords.get(key)
+        if not isinstance(words, list) or not all(isinstance(word, str) and word.strip() for word in words):
+            raise RuleError(f"keywords.{key} muss eine Liste nicht-leerer Strings sein")
+        lists[key] = tuple(word.lower() for word in words) if key in LOWERCASED_LISTS else tuple(words)
+    unknown = set(keywords) - set(KEYWORD_LISTS)
+    if unknown:
+        raise RuleError(f"Unbekannte Keyword-Listen: {', '.join(sorted(unknown))}")
+
+    word_boundary = _table(data, "matching", required=False).get("word_boundary", [])
+    if not isinstance(word_boundary, list) or not set(word_boundary) <= set(KEYWORD_LISTS):
+        raise RuleError(f"matching.word_boundary darf nur {', '.join(KEYWORD_LISTS)} enthalten")
+
+    return RuleSet(
+        version=version,
+        word_boundary=tuple(word_boundary),
+        matcher=KeywordMatcher(lists, word_boundary=word_boundary),
+        **values,
+        **lists,
+    )
+
+
+def _table(data: dict, name: str, required: bool = True) -> dict:
+    table = data.get(name)
+    if table is None and not required:
+        return {}
+    if not isinstance(table, dict):
+        raise RuleError(f"Abschnitt [{name}] fehlt")
+    return table
+
+
+class RulesWatcher:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_rules_path()
+        self._mtime = os.stat(self.path).st_mtime_ns
+        # beim Start muss die Datei gültig sein - ohne Regeln läuft der Bot nicht
+        self.current = load_rules(self.path)
+
+    def reload_if_changed(self) -> bool:
+        """Zwischen zwei Scans aufrufen. True, wenn ein neuer Regelstand aktiv ist."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            print(f"⚠️ Regeldatei nicht erreichbar, behalte Version {self.current.version}: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            rules = load_rules(self.path)
+        except RuleError as e:
+            print(f"⚠️ Regeldatei ungültig, behalte Version {self.current.version}: {e}")
+            return False
+        self.current = rules
+        print(f"📜 Regeln neu geladen: Version {rules.version}")
+        return True
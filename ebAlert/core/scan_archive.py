@@ -0,0 +1,90 @@
+"""
+Archiv aller ausgewerteten Anzeigen für Offline-Replays (ebAlert replay). Pro Tag eine
+gzip-komprimierte JSONL-Datei in ARCHIVE_DIR; jede Zeile enthält die Anzeige und alles,
+was der Bot dazu gesehen und entschieden hat: Verkäuferdaten, eBay-Median, GPT-Flags und
+das Urteil ("alert", "whitelist", "no_deal", "drop:<Filterstufe>" oder "pending").
+Alte Dateien werden nach ARCHIVE_RETENTION_DAYS gelöscht.
+"""
+import dataclasses
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from ebAlert.core.config import settings
+from ebAlert.ebayscrapping.ebayclass import ListingRecord
+
+FORMAT_VERSION = 1
+FILE_PREFIX = "scan-"
+FILE_SUFFIX = ".jsonl.gz"
+
+
+def archive_path(day: date, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or settings.ARCHIVE_DIR, f"{FILE_PREFIX}{day.isoformat()}{FILE_SUFFIX}")
+
+
+def append_records(records: Iterable[dict], directory: Optional[str] = None, now: Optional[datetime] = None):
+    records = list(records)
+    if not records:
+        return
+    directory = directory or settings.ARCHIVE_DIR
+    now = now or datetime.now()
+    os.makedirs(directory, exist_ok=True)
+    # gzip erlaubt Anhängen als weiteres Member - beim Lesen ergibt das eine durchgehende Datei
+    with gzip.open(archive_path(now.date(), directory), "at", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(dict(record, v=FORMAT_VERSION, ts=now.isoformat()), default=_json_default,
+                                  ensure_ascii=False))
+            file.write("\n")
+    prune(directory, now.date())
+
+
+def iter_records(days: int, directory: Optional[str] = None, today: Optional[date] = None) -> Iterator[dict]:
+    """Alle Einträge der letzten `days` Tage, älteste zuerst."""
+    directory = directory or settings.ARCHIVE_DIR
+    today = today or date.today()
+    for offset in range(days - 1, -1, -1):
+        path = archive_path(today - timedelta(days=offset), directory)
+        if not os.path.exists(path):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def prune(directory: str, today: date):
+    cutoff = (today - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)).isoformat()
+    for name in os.listdir(directory):
+        if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX) \
+                and name[len(FILE_PREFIX):-len(FILE_SUFFIX)] < cutoff:
+            os.remove(os.path.join(directory, name))
+
+
+def listing_to_dict(record: ListingRecord) -> dict:
+    return {field.name: getattr(record, field.name) for field in dataclasses.fields(ListingRecord)}
+
+
+def listing_from_dict(data: dict) -> ListingRecord:
+    values = {field.name: data.get(field.name) for field in dataclasses.fields(ListingRecord) if field.name in data}
+    if values.get("date"):
+        values["date"] = datetime.fromisoformat(values["date"])
+    return ListingRecord(**values)
+
+
+def seller_info_from_dict(data: Optional[dict]) -> Optional[dict]:
+    if data and data.get("active_since"):
+        data = dict(data, active_since=datetime.fromisoformat(data["active_since"]))
+    return data
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        return listing_to_dict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} ist nicht JSON-serialisierbar")
+
@@ -0,0 +1,101 @@
+"""
+Adaptiver Takt pro Such-Link. Statt alle Links gemeinsam alle 45-90 Sekunden abzufragen,
+merkt sich der Scheduler pro Link, wie viele neue Anzeigen pro Minute dort auftauchen
+(gleitender Mittelwert aus den Ergebnissen von add_items_to_db), und legt den nächsten
+Abruf-Zeitpunkt daraus fest: volle Links werden öfter, ruhige seltener abgefragt - immer
+innerhalb von [SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL] und so, dass alle Links
+zusammen das Budget SCHEDULER_MAX_POLLS_PER_HOUR nicht überschreiten.
+"""
+import time
+from dataclasses import dataclass
+from random import uniform
+from typing import Dict, Iterable, List, Optional
+
+from ebAlert.core.config import settings
+
+
+@dataclass
+class LinkSchedule:
+    # aus der beobachteten Rate abgeleitetes Wunsch-Intervall ...
+    desired_interval: float
+    # ... und das tatsächlich genutzte, ggf. wegen des Budgets gestreckte Intervall
+    interval: float
+    next_poll: float
+    last_poll: Optional[float] = None
+    # neue Anzeigen pro Minute, None solange noch nichts beobachtet wurde
+    rate: Optional[float] = None
+
+
+class LinkScheduler:
+    def __init__(self, min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 max_polls_per_hour: Optional[float] = None, target_new_per_poll: Optional[float] = None,
+                 smoothing: float = 0.3):
+        self.min_interval = min_interval or settings.SCHEDULER_MIN_INTERVAL
+        self.max_interval = max_interval or settings.SCHEDULER_MAX_INTERVAL
+        self.max_polls_per_hour = max_polls_per_hour or settings.SCHEDULER_MAX_POLLS_PER_HOUR
+        self.target_new_per_poll = target_new_per_poll or settings.SCHEDULER_TARGET_NEW_PER_POLL
+        self.smoothing = smoothing
+        self.links: Dict[int, LinkSchedule] = {}
+
+    def sync(self, link_ids: Iterable[int], now: Optional[float] = None):
+        """Neue Links sind sofort fällig, entfernte Links werden vergessen."""
+        now = time.time() if now is None else now
+        link_ids = set(link_ids)
+        for link_id in link_ids - self.links.keys():
+            initial = min(max(settings.SCHEDULER_INITIAL_INTERVAL, self.min_interval), self.max_interval)
+            self.links[link_id] = LinkSchedule(desired_interval=initial, interval=initial, next_poll=now)
+        for link_id in self.links.keys() - link_ids:
+            del self.links[link_id]
+        self._apply_budget()
+
+    def due(self, now: Optional[float] = None) -> List[int]:
+        now = time.time() if now is None else now
+        return [link_id for link_id, schedule in self.links.items() if schedule.next_poll <= now]
+
+    def record(self, link_id: int, new_items: Optional[int], now: Optional[float] = None):
+        """new_items=None heißt: Abruf fehlgeschlagen - keine Beobachtung, nur neu einplanen."""
+        now = time.time() if now is None else now
+        schedule = self.links.get(link_id)
+        if schedule is None:
+            return
+        # Der allererste Abruf zählt nicht: er enthält alles seit dem letzten Bot-Lauf.
+        if new_items is not None and schedule.last_poll is not None:
+            minutes = max((now - schedule.last_poll) / 60, 1 / 60)
+            observed = new_items / minutes
+            if schedule.rate is None:
+                schedule.rate = observed
+            else:
+                schedule.rate = self.smoothing * observed + (1 - self.smoothing) * schedule.rate
+        schedule.last_poll = now
+        if schedule.rate is not None:
+            schedule.desired_interval = self._interval_for(schedule.rate)
+        self._apply_budget()
+        # etwas Streuung, damit die Abrufe nicht im starren Takt kommen
+        schedule.next_poll = now + schedule.interval * uniform(0.85, 1.15)
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        if not self.links:
+            return self.max_interval
+        return max(0.0, min(schedule.next_poll for schedule in self.links.values()) - now)
+
+    def describe(self) -> str:
+        lines = []
+        for link_id, schedule in sorted(self.links.items()):
+            rate = f"{schedule.rate:.2f}/min" if schedule.rate is not None else "?"
+            lines.append(f"Link {link_id}: alle {schedule.interval:.0f}s (neu: {rate})")
+        return "\n".join(lines)
+
+    def _interval_for(self, rate: float) -> float:
+        if rate <= 0:
+            return self.max_interval
+        interval = self.target_new_per_poll / rate * 60
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _apply_budget(self):
+        """Wenn alle Links zusammen mehr Abrufe pro Stunde bräuchten als erlaubt, werden
+        alle Intervalle gleichmäßig gestreckt (nach oben durch max_interval begrenzt)."""
+        demand = sum(3600 / schedule.desired_interval for schedule in self.links.values())
+        factor = max(1.0, demand / self.max_polls_per_hour)
+        for schedule in self.links.values():
+            schedule.interval = min(schedule.desired_interval * factor, self.max_interval)
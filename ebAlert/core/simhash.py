@@ -0,0 +1,120 @@
+"""
+SimHash-Fingerprints, um neu eingestellte Anzeigen (gelöscht und mit neuer Anzeigen-ID
+wieder online gestellt) wiederzuerkennen. Ein Fingerprint ist ein 64-Bit-Wert über den
+normalisierten Text; fast gleiche Texte unterscheiden sich nur in wenigen Bits.
+
+Der Index teilt jeden Fingerprint in BANDS Blöcke zu 7-8 Bit. Zwei Fingerprints mit
+höchstens BANDS - 1 abweichenden Bits stimmen nach dem Schubfachprinzip in mindestens
+einem Block exakt überein - die Suche braucht also nur BANDS Dict-Zugriffe und vergleicht
+nur die Einträge in diesen Blöcken (~1/15 des Index) statt aller gespeicherten Fingerprints.
+
+Gemessen an den Anzeigen aus test/test.html (siehe test_simhash.py): zwei eingefügte
+Wörter verschieben einen Anzeigentext in ~90% der Fälle um höchstens MAX_DISTANCE Bit,
+fremde Texte liegen bei ~32, Anzeigen nach derselben Vorlage eines Händlers (anderes
+Spiel, sonst gleicher Text) ab 9.
+"""
+import hashlib
+import math
+import re
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+BITS = 64
+BANDS = 9
+MAX_DISTANCE = 8
+# (Verschiebung, Maske) je Block - 64 Bit lassen sich nicht gleichmäßig auf 9 Blöcke
+# verteilen, die ersten BITS % BANDS Blöcke bekommen ein Bit mehr
+_BAND_LAYOUT = [(band * (BITS // BANDS) + min(band, BITS % BANDS),
+                 (1 << (BITS // BANDS + (band < BITS % BANDS))) - 1) for band in range(BANDS)]
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_tokens(text: str) -> List[str]:
+    return _WORD_PATTERN.findall((text or "").casefold())
+
+
+def simhash(text: str) -> int:
+    """Wörter als Merkmale, gewichtet mit ihrer Häufigkeit. Wortpaare kämen als Merkmale
+    dazu, würden aber bei jedem eingefügten Wort gleich drei Merkmale ändern - bei den
+    kurzen Anzeigentexten verschiebt das den Fingerprint zu stark."""
+    features = normalize_tokens(text)
+    if not features:
+        return 0
+    weights = [0] * BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def price_band(price: Optional[float]) -> int:
+    """Logarithmische Preisstufen von je ~15%: 100 € und 110 € liegen in derselben Stufe."""
+    if not price or price <= 0:
+        return 0
+    return int(math.floor(math.log(price) / math.log(1.15)))
+
+
+def to_signed(value: int) -> int:
+    """SQLite-Integer sind vorzeichenbehaftet - für die DB umrechnen."""
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << BITS) if value < 0 else value
+
+
+def _bands(fingerprint: int) -> Iterable[Tuple[int, int]]:
+    for band, (shift, mask) in enumerate(_BAND_LAYOUT):
+        yield band, (fingerprint >> shift) & mask
+
+
+class SimHashIndex:
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance muss kleiner als {BANDS} sein")
+        self.max_distance = max_distance
+        self.entries: Dict[Hashable, Tuple[int, int, str]] = {}
+        self._buckets: List[Dict[int, Set[Hashable]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key: Hashable, fingerprint: int, band: int, verdict: str):
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (fingerprint, band, verdict)
+        for band_index, value in _bands(fingerprint):
+            self._buckets[band_index].setdefault(value, set()).add(key)
+
+    def remove(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for band_index, value in _bands(entry[0]):
+            bucket = self._buckets[band_index].get(value)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_index][value]
+
+    def find(self, fingerprint: int, band: int) -> Optional[Tuple[Hashable, str, int]]:
+        """Ähnlichster gespeicherter Eintrag (Schlüssel, Urteil, Bit-Abstand), der nicht in einer
+        niedrigeren Preisstufe liegt - eine deutlich billigere Neueinstellung wird neu bewertet."""
+        candidates = set()
+        for band_index, value in _bands(fingerprint):
+            bucket = self._buckets[band_index].get(value)
+            if bucket:
+                candidates.update(bucket)
+        best = None
+        best_distance = self.max_distance + 1
+        entries = self.entries
+        for key in candidates:
+            stored_fingerprint, stored_band, verdict = entries[key]
+            distance = (fingerprint ^ stored_fingerprint).bit_count()
+            if distance < best_distance and band >= stored_band:
+                best, best_distance = (key, verdict, distance), distance
+        return best
@@ -0,0 +1,38 @@
+"""
+Single-Flight: laufen mehrere Threads gleichzeitig in dieselbe teure Abfrage (gleicher
+Key), führt nur der erste sie aus - alle anderen warten auf sein Ergebnis bzw. seinen
+Fehler, statt die Abfrage ein zweites Mal zu starten.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.merged = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.merged += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
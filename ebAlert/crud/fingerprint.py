@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ebAlert.core.config import settings
+from ebAlert.core.simhash import SimHashIndex, to_signed, to_unsigned
+from ebAlert.crud.base import CRUBBase
+from ebAlert.models.sqlmodel import ListingFingerprint
+
+
+class CRUDFingerprint(CRUBBase):
+    """Fingerprints bewerteter Anzeigen: in der DB für den Neustart, im Speicher als
+    SimHashIndex für die Suche. Neue Urteile werden gesammelt und mit flush() geschrieben."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.index: Optional[SimHashIndex] = None
+        self._pending: List[Tuple[int, int, int, str]] = []
+        self._last_prune = 0.0
+
+    def load_index(self, db: Session, exclude_verdicts: Iterable[str] = ()) -> SimHashIndex:
+        """exclude_verdicts: Urteile, die nicht (mehr) wiederverwendet werden dürfen - solche
+        Einträge werden beim Laden aus der DB gelöscht."""
+        if self.index is None or time.time() - self._last_prune > 24 * 3600:
+            self.prune(db)
+            exclude_verdicts = list(exclude_verdicts)
+            if exclude_verdicts:
+                db.execute(delete(self.model).where(self.model.verdict.in_(exclude_verdicts)))
+                db.commit()
+            index = SimHashIndex()
+            for row in db.execute(select(self.model).order_by(self.model.id)).scalars():
+                index.add(row.post_id, to_unsigned(row.fingerprint), row.price_band, row.verdict)
+            self.index = index
+        return self.index
+
+    def find_repost(self, fingerprint: int, band: int) -> Optional[Tuple[int, str, int]]:
+        if self.index is None:
+            return None
+        return self.index.find(fingerprint, band)
+
+    def remember(self, post_id: int, fingerprint: int, band: int, verdict: str):
+        if self.index is None:
+            return
+        self.index.add(post_id, fingerprint, band, verdict)
+        self._pending.append((post_id, fingerprint, band, verdict))
+
+    def flush(self, db: Session):
+        if not self._pending:
+            return
+        for post_id, fingerprint, band, verdict in self._pending:
+            db.add(self.model(post_id=post_id, fingerprint=to_signed(fingerprint), price_band=band, verdict=verdict))
+        db.commit()
+        self._pending = []
+
+    def prune(self, db: Session):
+        # server_default=func.now() schreibt in SQLite UTC ohne Zeitzone
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=settings.REPOST_RETENTION_DAYS)
+        db.execute(delete(self.model).where(self.model.date < cutoff))
+        db.commit()
+        self._last_prune = time.time()
+
+
+crud_fingerprint = CRUDFingerprint(ListingFingerprint)
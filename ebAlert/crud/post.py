@@ -1,15 +1,19 @@
-from typing import List
+from typing import FrozenSet, List
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ebAlert.crud.base import CRUBBase
-from ebAlert.ebayscrapping.ebayclass import EbayItem
+from ebAlert.ebayscrapping.ebayclass import ListingRecord
 from ebAlert.models.sqlmodel import EbayPost
 
 
 class CRUDPost(CRUBBase):
 
-    def add_items_to_db(self, items: List[EbayItem], db: Session):
+    def get_known_ids(self, db: Session) -> FrozenSet[int]:
+        return frozenset(db.execute(select(self.model.post_id)).scalars().all())
+
+    def add_items_to_db(self, items: List[ListingRecord], db: Session):
         add_items = []
         for item in items:
             if not self.get_by_key({"post_id": str(item.id)}, db):
@@ -0,0 +1,94 @@
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ebAlert.core.config import settings
+from ebAlert.core.rules import KEYWORD_LISTS, RuleSet
+from ebAlert.crud.base import CRUBBase
+from ebAlert.models.sqlmodel import DecisionTrace, RuleHit
+
+
+class RuleReportRow(NamedTuple):
+    rule_list: str
+    keyword: str
+    hits: int
+    last_hit: Optional[datetime]
+    # wie oft das Keyword in der Liste steht (> 1 = Duplikat)
+    occurrences: int
+
+
+class CRUDRuleHits(CRUBBase):
+    """Treffer werden während eines Scans im Speicher gesammelt und mit flush() in einem
+    Rutsch geschrieben: Zähler pro Regel in rule_hit, jede Entscheidung in decision_trace."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._pending: List[Tuple[int, str, str]] = []
+        self._last_prune = 0.0
+
+    def record(self, post_id, rule_list: str, keywords: Iterable[str] = ("",)):
+        for keyword in keywords:
+            self._pending.append((int(post_id), rule_list, keyword))
+
+    def flush(self, db: Session):
+        if time.time() - self._last_prune > 24 * 3600:
+            self.prune(db)
+        if not self._pending:
+            return
+        now = _utcnow()
+        counts = Counter((rule_list, keyword) for _, rule_list, keyword in self._pending)
+        existing = {
+            (row.rule_list, row.keyword): row
+            for row in db.execute(select(self.model).where(self.model.rule_list.in_({key[0] for key in counts}))).scalars()
+        }
+        for (rule_list, keyword), count in counts.items():
+            row = existing.get((rule_list, keyword))
+            if row is None:
+                db.add(self.model(rule_list=rule_list, keyword=keyword, hits=count, last_hit=now))
+            else:
+                row.hits += count
+                row.last_hit = now
+        for post_id, rule_list, keyword in self._pending:
+            db.add(DecisionTrace(post_id=post_id, rule_list=rule_list, keyword=keyword, date=now))
+        db.commit()
+        self._pending = []
+
+    def prune(self, db: Session):
+        cutoff = _utcnow() - timedelta(days=settings.DECISION_TRACE_DAYS)
+        db.execute(delete(DecisionTrace).where(DecisionTrace.date < cutoff))
+        db.commit()
+        self._last_prune = time.time()
+
+    def report(self, db: Session, rules: RuleSet) -> List[RuleReportRow]:
+        """Alle Keywords des aktuellen Regelstands mit ihren Treffern, dazu Zähler für
+        Stufen und Entscheidungen, die keine Keyword-Regeln sind."""
+        stored: Dict[Tuple[str, str], RuleHit] = {
+            (row.rule_list, row.keyword): row for row in db.execute(select(self.model)).scalars()
+        }
+        rows = []
+        for rule_list in KEYWORD_LISTS:
+            occurrences = Counter(getattr(rules, rule_list))
+            for keyword, count in occurrences.items():
+                row = stored.pop((rule_list, keyword), None)
+                rows.append(RuleReportRow(rule_list, keyword, row.hits if row else 0,
+                                          row.last_hit if row else None, count))
+        # Stufen, Entscheidungen und Keywords, die inzwischen aus der Regeldatei entfernt wurden
+        for (rule_list, keyword), row in sorted(stored.items()):
+            rows.append(RuleReportRow(rule_list, keyword, row.hits, row.last_hit, 0))
+        return rows
+
+    def trace(self, db: Session, post_id: int) -> List[DecisionTrace]:
+        query = select(DecisionTrace).where(DecisionTrace.post_id == post_id).order_by(DecisionTrace.id)
+        return list(db.execute(query).scalars())
+
+
+def _utcnow() -> datetime:
+    # server_default=func.now() schreibt in SQLite UTC ohne Zeitzone - hier genauso
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+crud_rule_hits = CRUDRuleHits(RuleHit)
@@ -1,106 +1,82 @@
-import statistics
-import requests
-import json
 import os
-import shutil
+import statistics
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
+from ebAlert.core.cache_store import cache_store
 from ebAlert.core.config import settings
+from ebAlert.core.fetch_engine import Job, iter_completed
+from ebAlert.core.http_client import http_client
+from ebAlert.core.single_flight import SingleFlight
+from ebAlert.ebayscrapping.ebay_token import get_ebay_oauth_token
+from ebAlert.ebayscrapping.price_estimators import PriceEstimate, compare, estimate, estimate_batch
+from ebAlert.ebayscrapping.price_history import PriceHistory, PricePoint, fresh_seconds, trend_factor
 
-EBAY_OAUTH_URL = "https://api.ebay.com/identity/v1/oauth2/token"
 EBAY_BROWSE_SEARCH_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+EBAY_API_HOST = "api.ebay.com"
+# Ohne jeden Preis rechnet der Scan mit diesem Median (Marge künstlich hoch, um die Anzeige
+# nicht zu verpassen). Die Funktionen hier liefern dann None, damit der Aufrufer den
+# Fallback von einem echten Marktwert unterscheiden kann (z.B. fürs Scan-Archiv).
+FALLBACK_MEDIAN = 1000
 
 # --- CACHE KONFIGURATION ---
-# Prüft, ob CACHE_DIR in den Umgebungsvariablen existiert (Railway)
-# Falls nicht (lokal), wird der aktuelle Ordner (.) verwendet
+# Pro Query liegt die rohe, gefilterte Stichprobe der eBay-Angebotspreise (samt
+# Zustands-ID) im gemeinsamen SQLite-Cache (siehe core/cache_store.py). Korridor,
+# Clustering und Median werden daraus für jeden Angebotspreis lokal berechnet - ein
+# Eintrag passt damit für jede Anzeige mit dieser Query, ohne neue API-Abfrage.
 CACHE_DIR = os.getenv("CACHE_DIR", ".")
 CACHE_FILE = os.path.join(CACHE_DIR, "ebay_price_cache.json")
 
-# Stelle sicher, dass das Verzeichnis existiert (verhindert Fehler beim ersten Start)
-if CACHE_DIR != "." and not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
-    
-# 8 Wochen in Sekunden: 8 * 7 * 24 * 60 * 60
-CACHE_EXPIRY = 4838400
+# Ab diesem Alter gilt ein Preis als veraltet (Standard 8 Wochen, EBAY_PRICE_FRESH_SECONDS)
+CACHE_EXPIRY = settings.EBAY_PRICE_FRESH_SECONDS
+
+# Stichproben hängen vom Marktplatz und vom Zustandsfilter der Suche ab - ändert sich
+# einer davon, gelten die alten Stichproben nicht mehr.
+SAMPLE_CACHE_VERSION = f"s1:{settings.EBAY_MARKETPLACE_ID}:{settings.EBAY_CONDITION_IDS}"
 
 CACHE_VERSION = "v6"  # v5: Umstellung von Scraping auf die offizielle eBay Browse API
 # (Angebotspreis statt versuchtem Verkaufspreis, mit Zustandsfilter) - alte v4-Einträge
 # sind ein anderes Preissignal und sollen nicht mehr als Fallback verwendet werden.
+# Die v6-Mediane (ein Wert pro Query, berechnet für den Angebotspreis der ersten Anzeige)
+# werden nur noch gelesen: als Übergangswert, bis die Stichprobe der Query geladen ist.
 
-# In deinen Funktionen nutzt du jetzt einfach CACHE_FILE
-def load_cache():
-    """Gibt {} zurück, wenn (noch) keine Datei existiert, aber None, wenn die Datei
-    existiert und trotzdem nicht lesbar ist (z.B. beschädigt). Diese Unterscheidung
-    ist wichtig: {} darf gefahrlos später überschrieben werden, None NICHT - sonst
-    würde eine kaputte/nicht lesbare Datei beim nächsten save_cache() versehentlich
-    mit einem leeren Cache überschrieben und die gesamte Historie ginge verloren."""
-    if not os.path.exists(CACHE_FILE):
-        print("ebay scrap load_cache Error: Keine Cachedatei gefunden!")
-        return {}
-    try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-    except Exception as e:
-        print(f"❌ ebay scrap load_cache Error: Cache-Datei beschädigt/nicht lesbar ({e}) - Datei bleibt unangetastet!")
-        return None
-
-    # Einträge mit abweichender CACHE_VERSION aussortieren - die werden wegen des
-    # Versions-Checks in get_ebay_median_price ohnehin nie wieder benutzt, würden aber
-    # bei jedem Speichern unnötig mitgeschrieben (Datei wird über Zeit immer größer).
-    filtered = {k: v for k, v in raw.items() if isinstance(v, dict) and v.get("version") == CACHE_VERSION}
-    dropped = len(raw) - len(filtered)
-    if dropped:
-        print(f"🧹 {dropped} veraltete Cache-Einträge (andere Version) beim Laden verworfen.")
-    return filtered
-
-def save_cache(cache_data):
-    # Backup der bisherigen Datei anlegen, bevor überschrieben wird - falls doch mal
-    # ein fehlerhafter Wert reingeschrieben wird, lässt sich der vorherige Stand
-    # wiederherstellen (einfach ebay_price_cache.json.bak zurückkopieren).
-    if os.path.exists(CACHE_FILE):
-        try:
-            shutil.copyfile(CACHE_FILE, CACHE_FILE + ".bak")
-        except Exception as e:
-            print(f"⚠️ Konnte kein Cache-Backup anlegen: {e}")
+_sample_cache = cache_store.namespace("ebay_samples", SAMPLE_CACHE_VERSION, max_entries=settings.CACHE_MAX_ENTRIES)
+_price_cache = cache_store.namespace("ebay_price", CACHE_VERSION, max_entries=settings.CACHE_MAX_ENTRIES)
+_legacy_imported = False
+_price_history = PriceHistory(cache_store)
 
-    print(f"💾 Speichere ebay scrap-Cache ({len(cache_data)} Einträge) in: {CACHE_FILE}")
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache_data, f, indent=4)
 
-def clear_cache():
-    files = ["ebay_price_cache.json"]
-    base = os.environ.get("CACHE_DIR", os.path.expanduser("~"))
-    for f in files:
-        path = os.path.join(base, f)
-        if os.path.exists(path):
-            os.remove(path)
-            print(f"🗑️ Cache gelöscht: {path}")
+def _legacy_price_entry(key, raw):
+    # Einträge mit abweichender CACHE_VERSION würden ohnehin nie benutzt
+    if isinstance(raw, dict) and raw.get("version") == CACHE_VERSION and "price" in raw:
+        return raw["price"], raw.get("timestamp")
+    return None
 
-# In-Memory-Cache für den OAuth-Token (Client-Credentials-Token ist ~2h gültig,
-# es lohnt sich nicht, ihn bei jeder Preisabfrage neu zu holen).
-_token_cache = {"access_token": None, "expires_at": 0}
 
+def price_cache():
+    """Alte Mediane pro Query (nur noch lesend, siehe CACHE_VERSION)."""
+    global _legacy_imported
+    if not _legacy_imported:
+        _legacy_imported = True
+        _price_cache.import_json_once(CACHE_FILE, _legacy_price_entry)
+    return _price_cache
 
-def get_ebay_oauth_token() -> str:
-    now = time.time()
-    # 60s Sicherheitsmarge vor dem tatsächlichen Ablauf
-    if _token_cache["access_token"] and now < _token_cache["expires_at"] - 60:
-        return _token_cache["access_token"]
-
-    res = requests.post(
-        EBAY_OAUTH_URL,
-        auth=(settings.EBAY_CLIENT_ID, settings.EBAY_CLIENT_SECRET),
-        data={
-            "grant_type": "client_credentials",
-            "scope": "https://api.ebay.com/oauth/api_scope",
-        },
-        timeout=15,
-    )
-    res.raise_for_status()
-    payload = res.json()
-    _token_cache["access_token"] = payload["access_token"]
-    _token_cache["expires_at"] = now + payload["expires_in"]
-    return _token_cache["access_token"]
+
+def sample_cache():
+    return _sample_cache
+
+
+def price_history() -> PriceHistory:
+    return _price_history
+
+
+def clear_cache():
+    count = sample_cache().clear() + price_cache().clear()
+    print(f"🗑️ Preis-Cache gelöscht: {count} Einträge")
 
 
 def search_ebay_listings(query: str) -> list:
@@ -115,122 +91,313 @@ def search_ebay_listings(query: str) -> list:
     if settings.EBAY_CONDITION_IDS:
         params["filter"] = f"conditionIds:{{{settings.EBAY_CONDITION_IDS}}}"
 
-    res = requests.get(
+    res = http_client.get(
         EBAY_BROWSE_SEARCH_URL,
         headers=headers,
         params=params,
-        timeout=20,
     )
     if res.status_code != 200:
         raise RuntimeError(f"eBay Browse API Status {res.status_code}: {res.text[:300]}")
     return res.json().get("itemSummaries", [])
 
 
-def get_ebay_median_price(query: str, offer_price: float):
-    # 1. Cache laden und prüfen
-    cache = load_cache()
-    # Wenn die Datei beschädigt war (None statt {}), arbeiten wir für diesen Lauf
-    # mit einem leeren Dict weiter, merken uns aber, dass NICHT gespeichert werden
-    # darf - sonst würden wir die (potenziell noch reparierbare) Datei überschreiben.
-    cache_is_writable = cache is not None
-    if cache is None:
-        cache = {}
+def median_cache_key(query: str) -> str:
+    # Normalisiere die Query für den Cache-Key (Kleinschreibung, ohne unnötige Leerzeichen)
+    return query.lower().strip()
+
+
+class PriceLookup(NamedTuple):
+    query: str
+    # Stichprobe {"p": Preise, "c": Zustands-IDs, "n": Angebote insgesamt} oder None
+    samples: Optional[dict]
+    # alter Median aus dem v6-Cache, falls vorhanden
+    legacy: Optional[float]
+    # wann die Stichprobe geholt wurde (für die Trend-Korrektur)
+    stored_at: Optional[float] = None
+
+
+# Gleiche Query gleichzeitig aus mehreren Threads -> nur eine Live-Abfrage
+_sample_flight = SingleFlight()
+
+
+def get_ebay_median_prices(lookups: Iterable[Tuple[str, float]]) -> Dict[Tuple[str, float], Optional[float]]:
+    """Median-Preise für alle (Query, Angebotspreis)-Paare eines Scans. Jede Query
+    (nach Normalisierung) wird höchstens einmal abgefragt, verschiedene Queries laufen
+    parallel (höchstens EBAY_LOOKUP_CONCURRENCY gleichzeitig) - der Schritt dauert damit
+    so lange wie die langsamste Abfrage statt wie die Summe. Der Median selbst wird dann
+    pro Anzeige aus der Stichprobe der Query berechnet. None = kein Preis bekannt."""
+    lookups = list(lookups)
+    unique = {}
+    for query, _ in lookups:
+        unique.setdefault(median_cache_key(query), query)
+    # Altdaten-Import einmal hier im Haupt-Thread, nicht in den Workern
+    price_cache()
+
+    jobs = [Job(key, partial(resolve_samples, query), host=EBAY_API_HOST) for key, query in unique.items()]
+    resolved = {}
+    started = time.perf_counter()
+    for job_result in iter_completed(jobs, per_host_limit=settings.EBAY_LOOKUP_CONCURRENCY):
+        if job_result.error is None:
+            resolved[job_result.key] = job_result.result
+            continue
+        # resolve_samples fängt seine Fehler selbst - hier landen nur Timeouts der Engine
+        print(f"❌ eBay-Preis für '{job_result.key}' fehlgeschlagen ({job_result.error}) - nutze Cache-Werte")
+        resolved[job_result.key] = cached_lookup(unique[job_result.key])
+    if len(lookups) > 1:
+        print(f"📊 eBay-Preise: {len(lookups)} Anzeigen, {len(unique)} verschiedene Queries "
+              f"in {time.perf_counter() - started:.1f}s")
+    pairs = list(dict.fromkeys(lookups))
+    medians = medians_for_offers([(resolved[median_cache_key(query)], offer_price) for query, offer_price in pairs])
+    return dict(zip(pairs, medians))
+
+
+def get_ebay_median_price(query: str, offer_price: float) -> Optional[float]:
+    return median_for_offer(resolve_samples(query), offer_price)
+
+
+def resolve_samples(query: str) -> PriceLookup:
+    """Holt die Stichprobe einer Query - aus dem Cache, wenn möglich. Das ist der einzige
+    Schritt mit Netzwerkzugriff; der Angebotspreis spielt hier keine Rolle."""
+    # 1. Cache prüfen
     current_time = time.time()
+    cache_key = median_cache_key(query)
+    entry = sample_cache().get_entry(cache_key)
+    has_api_key = bool(settings.EBAY_CLIENT_ID and settings.EBAY_CLIENT_SECRET)
+
+    if entry is not None:
+        age = entry.age(current_time)
+        expiry = cache_expiry(cache_key)
+        # 1a. Frischer Cache-Treffer -> direkt verwenden, kein Request nötig
+        if age < expiry:
+            price_stats["fresh"] += 1
+            print(f"📦 Cache-Hit für '{query}': {len(entry.value['p'])} Preise (Alter: {int(age/3600)}h)")
+            return PriceLookup(query, entry.value, None, entry.stored_at)
+        # 1b. Abgelaufen, aber noch im Stale-Fenster -> sofort die alte Stichprobe fürs
+        # Scoring nehmen und im Hintergrund erneuern; spätere Anzeigen bekommen die neue.
+        if has_api_key and age < expiry + settings.EBAY_PRICE_STALE_SECONDS:
+            price_stats["stale"] += 1
+            queued = schedule_revalidation(query)
+            print(f"♻️ Stale-Cache für '{query}': {len(entry.value['p'])} Preise (Alter: {int(age/86400)}d)"
+                  f"{' - Aktualisierung im Hintergrund' if queued else ''}")
+            return PriceLookup(query, entry.value, None, entry.stored_at)
+        print(f"💾 Ebay scrap-Cache vorhanden ist aber abgelaufen! Aktuelles Datum: {current_time}, Entrydatum: {entry.stored_at}")
+    else:
+        # 1c. Übergang: noch keine Stichprobe, aber ein alter Median -> den nehmen und die
+        # Stichprobe im Hintergrund laden (statt nach dem Update alles live im Scan).
+        legacy = price_cache().get_entry(cache_key)
+        if has_api_key and legacy is not None and legacy.value > 15 \
+                and legacy.age(current_time) < CACHE_EXPIRY + settings.EBAY_PRICE_STALE_SECONDS:
+            price_stats["stale"] += 1
+            queued = schedule_revalidation(query)
+            print(f"♻️ Alter Median für '{query}': {legacy.value}€{' - Stichprobe wird im Hintergrund geladen' if queued else ''}")
+            return PriceLookup(query, None, legacy.value)
+
+    # 2. Kein eBay-API-Key konfiguriert -> Live-Abfrage überspringen. Lieber abgelaufene
+    # Cache-Werte weiterverwenden als eine Anzeige mangels Preisdaten komplett zu verpassen.
+    if not has_api_key:
+        price_stats["fallback"] += 1
+        print(f"⚠️ Kein EBAY_CLIENT_ID/EBAY_CLIENT_SECRET konfiguriert - nur Cache-Werte für '{query}'")
+        return cached_lookup(query)
 
-    # Normalisiere die Query für den Cache-Key (Kleinschreibung, ohne unnötige Leerzeichen)
-    cache_key = query.lower().strip()
+    # 3. Live-Abfrage über die offizielle eBay Browse API
+    try:
+        samples = _sample_flight.do(cache_key, partial(fetch_live_samples, query))
+        price_stats["live"] += 1
+        return PriceLookup(query, samples, None, current_time)
+    except Exception as e:
+        price_stats["fallback"] += 1
+        print(f"❌ Fehler bei eBay Browse API-Abfrage für '{query}': {e}")
+        # 4. Live-Abfrage fehlgeschlagen -> genau wie bei fehlendem Key: lieber abgelaufene
+        # Cache-Werte nehmen als die Anzeige komplett zu verpassen.
+        return cached_lookup(query)
+
+
+def cached_lookup(query: str) -> PriceLookup:
+    """Alles, was der Cache zu einer Query hat, egal wie alt."""
+    cache_key = median_cache_key(query)
+    entry = sample_cache().get_entry(cache_key)
+    legacy = price_cache().get(cache_key)
+    return PriceLookup(query, entry.value if entry is not None else None,
+                       legacy if legacy is not None and legacy > 15 else None,
+                       entry.stored_at if entry is not None else None)
+
+
+def cache_expiry(cache_key: str) -> float:
+    """Ab welchem Alter die Stichprobe einer Query als veraltet gilt - fest CACHE_EXPIRY
+    oder, mit EBAY_PRICE_ADAPTIVE_EXPIRY, nach dem Preisverlauf der Query."""
+    if not settings.EBAY_PRICE_ADAPTIVE_EXPIRY:
+        return CACHE_EXPIRY
+    try:
+        series = price_history().series(cache_key)
+    except Exception as e:
+        print(f"⚠️ Preisverlauf für '{cache_key}' nicht lesbar: {e}")
+        return CACHE_EXPIRY
+    return fresh_seconds(series, CACHE_EXPIRY, settings.EBAY_PRICE_MIN_FRESH_SECONDS,
+                         settings.EBAY_PRICE_MAX_FRESH_SECONDS, settings.PRICE_VOLATILITY_TARGET,
+                         settings.PRICE_TREND_DAYS, settings.PRICE_VOLATILITY_DAYS)
 
-    cached_entry = cache.get(cache_key)
-    has_usable_cache = (
-        cached_entry is not None
-        and cached_entry.get('version') == CACHE_VERSION
-        and cached_entry.get('price', 0) > 15
-    )
 
-    # 1a. Frischer Cache-Treffer -> direkt verwenden, kein Request nötig
-    if has_usable_cache and current_time - cached_entry['timestamp'] < CACHE_EXPIRY:
-        print(f"📦 Cache-Hit für '{query}': {cached_entry['price']}€ (Alter: {int((current_time - cached_entry['timestamp'])/3600)}h)")
-        return cached_entry['price']
+def median_for_offer(lookup: PriceLookup, offer_price: float) -> Optional[float]:
+    return medians_for_offers([(lookup, offer_price)])[0]
 
-    if has_usable_cache:
-        print(f"💾 Ebay scrap-Cache vorhanden ist aber abgelaufen! Aktuelles Datum: {current_time}, Entrydatum: {cached_entry['timestamp']}")
 
-    # 2. Kein eBay-API-Key konfiguriert -> Live-Abfrage überspringen. Lieber einen
-    # abgelaufenen Cache-Wert weiterverwenden als eine Anzeige mangels Preisdaten
-    # komplett zu verpassen.
-    if not settings.EBAY_CLIENT_ID or not settings.EBAY_CLIENT_SECRET:
-        if has_usable_cache:
-            print(f"⚠️ Kein EBAY_CLIENT_ID/EBAY_CLIENT_SECRET konfiguriert - nutze abgelaufenen Cache-Wert für '{query}': {cached_entry['price']}€")
-            return cached_entry['price']
-        print(f"⚠️ Kein EBAY_CLIENT_ID/EBAY_CLIENT_SECRET konfiguriert und kein Cache-Eintrag für '{query}' - Fallback auf 1000€ (Marge künstlich hoch, um die Anzeige nicht zu verpassen)")
-        return 1000
+def medians_for_offers(pairs: List[Tuple[PriceLookup, float]]) -> List[Optional[float]]:
+    """Mediane für viele (Stichprobe, Angebotspreis)-Paare - alle Paare mit Stichprobe in
+    einem vektorisierten Aufruf (siehe price_estimators.py, Schätzer PRICE_ESTIMATOR)."""
+    with_samples = [index for index, (lookup, _) in enumerate(pairs) if lookup.samples is not None]
+    estimates = estimate_batch([pairs[index][0].samples["p"] for index in with_samples],
+                               [pairs[index][1] for index in with_samples], settings.PRICE_ESTIMATOR)
+    by_index = dict(zip(with_samples, estimates))
+    now = time.time()
+    return [_pick_median(lookup, offer_price, by_index.get(index), _trend_factor(lookup, now))
+            for index, (lookup, offer_price) in enumerate(pairs)]
 
-    # 3. Live-Abfrage über die offizielle eBay Browse API
-    print(f"💾 Ebay Browse API Suche: '{query}'")
 
+def _trend_factor(lookup: PriceLookup, now: float) -> float:
+    if not settings.PRICE_TREND_ADJUST or lookup.samples is None or lookup.stored_at is None:
+        return 1.0
     try:
-        items = search_ebay_listings(query)
-
-        all_prices = []
-        min_gate = offer_price * 0.5
-        max_gate = offer_price * 3.0
-        for item in items:
-            price_info = item.get("price")
-            if not price_info or price_info.get("currency") != "EUR":
-                continue
-            try:
-                val = float(price_info["value"])
-            except (KeyError, TypeError, ValueError):
-                continue
-            if val <= 15:
-                continue
-            if min_gate <= val <= max_gate:
-                all_prices.append(val)
-
-        if len(all_prices) < 2:
-            print(f"⚠️ Zu wenige Preise im Korridor ({min_gate:.2f}€ - {max_gate:.2f}€) für '{query}' gefunden ({len(items)} Angebote insgesamt).")
-            raise RuntimeError("zu wenige Preise im Korridor gefunden")
-
-        # Clustering Logik
-        bucket_size = 20 if offer_price < 150 else 50
-        buckets = {}
-        for p in all_prices:
-            lower_bound = int(p // bucket_size) * bucket_size
-            buckets[lower_bound] = buckets.get(lower_bound, []) + [p]
-
-        sorted_buckets = sorted(buckets.items(), key=lambda x: len(x[1]), reverse=True)
-        main_cluster_prices = sorted_buckets[0][1]
-        market_median = round(statistics.median(main_cluster_prices), 2)
-
-        print(f"📊 Analyse für '{query}':")
-        print(f"   - Gefundene Preise im Korridor: {len(all_prices)}")
-        print(f"   - Berechneter Marktwert: {market_median}€")
-
-        # Ergebnis in Cache speichern - außer wir befinden uns im Read-Only-Testmodus
-        # oder die Cache-Datei war beim Laden beschädigt. In beiden Fällen wird der
-        # frische Wert trotzdem für DIESEN Lauf zurückgegeben (Scoring profitiert
-        # sofort), nur eben nicht dauerhaft persistiert.
-        if not cache_is_writable:
-            print(f"   - ⚠️ NICHT gespeichert: Cache-Datei war beim Laden beschädigt.")
-        elif settings.EBAY_PRICE_CACHE_READONLY:
-            print(f"   - 🔒 NICHT gespeichert: EBAY_PRICE_CACHE_READONLY ist aktiv (Testmodus).")
-        else:
-            cache[cache_key] = {
-                "price": market_median,
-                "timestamp": current_time,
-                "version": CACHE_VERSION
-            }
-            save_cache(cache)
-            print(f"   - Gespeichert.")
-
-        return market_median
+        series = price_history().series(median_cache_key(lookup.query))
+    except Exception as e:
+        print(f"⚠️ Preisverlauf für '{lookup.query}' nicht lesbar: {e}")
+        return 1.0
+    return trend_factor(series, lookup.stored_at, now, settings.PRICE_TREND_DAYS, settings.PRICE_TREND_MAX_ADJUST)
+
+
+def _pick_median(lookup: PriceLookup, offer_price: float, estimate: Optional[PriceEstimate],
+                 trend: float = 1.0) -> Optional[float]:
+    if estimate is not None:
+        if estimate.median is not None:
+            print(f"📊 '{lookup.query}' bei {offer_price}€: Marktwert {estimate.median}€ "
+                  f"({estimate.n_used}/{estimate.n_corridor} Preise im Korridor, Streuung {estimate.dispersion:.0%})")
+            if trend != 1.0:
+                adjusted = round(estimate.median * trend, 2)
+                print(f"📈 Trend seit der Stichprobe: {trend - 1:+.1%} -> {adjusted}€")
+                return adjusted
+            return estimate.median
+        print(f"⚠️ Zu wenige Preise im Korridor ({offer_price * 0.5:.2f}€ - {offer_price * 3.0:.2f}€) für "
+              f"'{lookup.query}' gefunden ({lookup.samples.get('n', estimate.n_samples)} Angebote insgesamt).")
+    if lookup.legacy is not None:
+        print(f"↩️ Nutze alten Cache-Wert für '{lookup.query}': {lookup.legacy}€")
+        return lookup.legacy
+    print(f"↩️ Kein Cache-Wert für '{lookup.query}' vorhanden - Fallback auf {FALLBACK_MEDIAN}€ (Marge künstlich hoch, um die Anzeige nicht zu verpassen)")
+    return None
+
+
+def compare_estimators(records: Iterable[dict]) -> Tuple[int, dict]:
+    """Alle Schätzer auf den (Query, Angebotspreis)-Paaren archivierter Scans (siehe
+    core/scan_archive.py) mit den Stichproben aus dem Cache. Liefert (Anzahl Paare ohne
+    Stichprobe, {Schätzer: [PriceEstimate, ...]}), die Listen in derselben Reihenfolge."""
+    pairs = {}
+    for record in records:
+        if record.get("query") and record.get("price") is not None:
+            pairs[(median_cache_key(record["query"]), float(record["price"]))] = None
+    samples, offers, missing = [], [], 0
+    for key, offer_price in pairs:
+        entry = sample_cache().get_entry(key)
+        if entry is None:
+            missing += 1
+            continue
+        samples.append(entry.value["p"])
+        offers.append(offer_price)
+    return missing, compare(samples, offers)
+
+
+def fetch_live_samples(query: str) -> dict:
+    """Live-Abfrage; speichert die gefilterte Stichprobe im Cache. Wirft bei Fehlern."""
+    print(f"💾 Ebay Browse API Suche: '{query}'")
+    current_time = time.time()
+    items = search_ebay_listings(query)
 
+    prices, conditions = [], []
+    for item in items:
+        price_info = item.get("price")
+        if not price_info or price_info.get("currency") != "EUR":
+            continue
+        try:
+            val = float(price_info["value"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if val <= 15:
+            continue
+        prices.append(round(val, 2))
+        try:
+            conditions.append(int(item.get("conditionId") or 0))
+        except ValueError:
+            conditions.append(0)
+    samples = {"p": prices, "c": conditions, "n": len(items)}
+    print(f"   - {len(prices)} Preise von {len(items)} Angeboten")
+
+    # Stichprobe in Cache speichern - außer wir befinden uns im Read-Only-Testmodus.
+    # Die frischen Werte werden in jedem Fall für DIESEN Lauf genutzt (Scoring
+    # profitiert sofort), nur eben nicht dauerhaft persistiert.
+    if settings.EBAY_PRICE_CACHE_READONLY:
+        print(f"   - 🔒 NICHT gespeichert: EBAY_PRICE_CACHE_READONLY ist aktiv (Testmodus).")
+    else:
+        try:
+            sample_cache().set(median_cache_key(query), samples, stored_at=current_time)
+            print(f"   - Gespeichert.")
+        except Exception as e:
+            print(f"   - ⚠️ NICHT gespeichert: {e}")
+        record_history(query, samples, current_time)
+    return samples
+
+
+def record_history(query: str, samples: dict, timestamp: float):
+    """Hängt den Marktwert der ganzen Stichprobe an den Preisverlauf der Query an. Als
+    Angebotspreis für den Korridor dient der rohe Median der Stichprobe."""
+    prices = samples["p"]
+    if not prices:
+        return
+    offer_price = statistics.median(prices)
+    result = estimate(prices, offer_price, settings.PRICE_ESTIMATOR)
+    if result.median is None:
+        return
+    try:
+        price_history().record(median_cache_key(query),
+                               PricePoint(timestamp, result.median, result.n_used, result.dispersion))
     except Exception as e:
-        print(f"❌ Fehler bei eBay Browse API-Abfrage für '{query}': {e}")
-        # 4. Live-Abfrage fehlgeschlagen -> genau wie bei fehlendem Key: lieber einen
-        # abgelaufenen Cache-Wert nehmen als die Anzeige komplett zu verpassen.
-        if has_usable_cache:
-            print(f"↩️ Nutze abgelaufenen Cache-Wert für '{query}': {cached_entry['price']}€")
-            return cached_entry['price']
-        print(f"↩️ Kein Cache-Wert für '{query}' vorhanden - Fallback auf 1000€")
-        return 1000
+        print(f"   - ⚠️ Preisverlauf nicht gespeichert: {e}")
+
+
+# --- STALE-WHILE-REVALIDATE ---
+# Zähler seit Prozessstart: frische Treffer, ausgelieferte Stale-Werte, im Hintergrund
+# erneuerte Einträge, Live-Abfragen im Scan und Fallbacks (Fehler/kein Key)
+price_stats = Counter()
+_revalidating = set()
+_revalidate_lock = threading.Lock()
+_revalidate_executor = None
+
+
+def schedule_revalidation(query: str) -> bool:
+    """Stellt eine Hintergrund-Aktualisierung ein; pro Query höchstens eine gleichzeitig."""
+    global _revalidate_executor
+    key = median_cache_key(query)
+    with _revalidate_lock:
+        if key in _revalidating:
+            return False
+        _revalidating.add(key)
+        if _revalidate_executor is None:
+            _revalidate_executor = ThreadPoolExecutor(max_workers=settings.EBAY_LOOKUP_CONCURRENCY,
+                                                      thread_name_prefix="ebay-revalidate")
+    _revalidate_executor.submit(_revalidate, key, query)
+    return True
+
+
+def _revalidate(key: str, query: str):
+    try:
+        _sample_flight.do(key, partial(fetch_live_samples, query))
+        price_stats["revalidated"] += 1
+    except Exception as e:
+        # der alte Wert bleibt im Cache und wird beim nächsten Mal erneut versucht
+        price_stats["revalidate_failed"] += 1
+        print(f"⚠️ Hintergrund-Aktualisierung für '{query}' fehlgeschlagen: {e}")
+    finally:
+        with _revalidate_lock:
+            _revalidating.discard(key)
+
+
+def format_price_stats() -> str:
+    return (f"💶 eBay-Preise: {price_stats['fresh']} frisch, {price_stats['stale']} stale "
+            f"({price_stats['revalidated']} im Hintergrund erneuert, {price_stats['revalidate_failed']} fehlgeschlagen), "
+            f"{price_stats['live']} live, {price_stats['fallback']} Fallback")
@@ -0,0 +1,131 @@
+"""
+OAuth-Token (Client Credentials) für die eBay Browse API. Der Token liegt im gemeinsamen
+Cache (core/cache_store.py, Datei nur für den eigenen Benutzer lesbar), damit Neustarts
+und parallel laufende Prozesse ihn weiterverwenden. Ein Hintergrund-Thread erneuert ihn
+EBAY_TOKEN_REFRESH_MARGIN Sekunden vor Ablauf; über eine Lease im Cache macht das immer
+nur ein Prozess, die anderen lesen einfach den neuen Token. Preisabfragen warten damit
+nur noch dann auf eine Token-Anfrage, wenn es überhaupt noch keinen gültigen Token gibt.
+"""
+import os
+import socket
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from ebAlert.core.cache_store import CacheNamespace, cache_store
+from ebAlert.core.config import settings
+from ebAlert.core.http_client import http_client
+from ebAlert.core.single_flight import SingleFlight
+
+EBAY_OAUTH_URL = "https://api.ebay.com/identity/v1/oauth2/token"
+TOKEN_KEY = "client_credentials"
+LEASE_NAME = "ebay_token_refresh"
+LEASE_SECONDS = 60
+# Unter dieser Restlaufzeit wird ein Token nicht mehr ausgegeben
+MIN_REMAINING = 60
+
+
+def request_token() -> Tuple[str, float]:
+    """Holt einen neuen Token bei eBay: (access_token, expires_at)."""
+    now = time.time()
+    res = http_client.post(
+        EBAY_OAUTH_URL,
+        auth=(settings.EBAY_CLIENT_ID, settings.EBAY_CLIENT_SECRET),
+        data={
+            "grant_type": "client_credentials",
+            "scope": "https://api.ebay.com/oauth/api_scope",
+        },
+    )
+    res.raise_for_status()
+    payload = res.json()
+    return payload["access_token"], now + payload["expires_in"]
+
+
+class EbayTokenManager:
+    def __init__(self, namespace: CacheNamespace, fetch: Callable[[], Tuple[str, float]] = request_token,
+                 refresh_margin: Optional[float] = None, clock: Callable[[], float] = time.time):
+        self.namespace = namespace
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin if refresh_margin is not None else settings.EBAY_TOKEN_REFRESH_MARGIN
+        self._clock = clock
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._flight = SingleFlight()
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.refreshes = 0
+
+    def get(self) -> str:
+        """Gültiger Token für eine Abfrage - aus dem Speicher, sonst aus dem gemeinsamen
+        Cache. Nur wenn beides nichts Gültiges hat, wird blockierend ein neuer geholt."""
+        token = self._valid_token() or self._load_shared()
+        if token:
+            return token
+        return self._flight.do("token", self._refresh)
+
+    def refresh_if_due(self) -> float:
+        """Erneuert den Token, wenn er bald abläuft. Liefert die Sekunden bis zur nächsten Prüfung."""
+        self._load_shared()
+        remaining = self._expires_at - self._clock()
+        if self._token and remaining > self.refresh_margin:
+            return remaining - self.refresh_margin
+        if not self.namespace.store.acquire_lease(LEASE_NAME, self._owner, LEASE_SECONDS):
+            # ein anderer Prozess erneuert gerade - gleich im Cache nachsehen
+            return 5.0
+        try:
+            self._flight.do("token", self._refresh)
+        finally:
+            self.namespace.store.release_lease(LEASE_NAME, self._owner)
+        return max(self._expires_at - self._clock() - self.refresh_margin, 5.0)
+
+    def start_background(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ebay-token", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.refresh_if_due()
+            except Exception as e:
+                print(f"⚠️ eBay-Token konnte nicht erneuert werden: {e} - neuer Versuch in 30s")
+                wait = 30.0
+            self._stop.wait(wait)
+
+    def _valid_token(self) -> Optional[str]:
+        if self._token and self._clock() < self._expires_at - MIN_REMAINING:
+            return self._token
+        return None
+
+    def _load_shared(self) -> Optional[str]:
+        entry = self.namespace.get_entry(TOKEN_KEY, use_memory=False)
+        if entry is not None and entry.value["expires_at"] > self._expires_at:
+            self._token = entry.value["access_token"]
+            self._expires_at = entry.value["expires_at"]
+        return self._valid_token()
+
+    def _refresh(self) -> str:
+        token, expires_at = self._fetch()
+        self._token, self._expires_at = token, expires_at
+        self.refreshes += 1
+        try:
+            self.namespace.set(TOKEN_KEY, {"access_token": token, "expires_at": expires_at},
+                               ttl=max(expires_at - self._clock(), 1))
+        except Exception as e:
+            # der Token funktioniert trotzdem, nur andere Prozesse müssen sich selbst einen holen
+            print(f"⚠️ eBay-Token nicht im Cache gespeichert: {e}")
+        print(f"🔑 eBay-Token erneuert, gültig bis {time.strftime('%H:%M:%S', time.localtime(expires_at))}")
+        return token
+
+
+token_manager = EbayTokenManager(cache_store.namespace("ebay_oauth", "v1"))
+
+
+def get_ebay_oauth_token() -> str:
+    return token_manager.get()
@@ -1,16 +1,107 @@
+import hashlib
+import html
 import re
-from typing import Generator
+from dataclasses import dataclass
+from typing import AbstractSet, Generator, List, Optional, Tuple
 
-import requests
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ebAlert import create_logger
 from ebAlert.core.config import settings
+from ebAlert.core.http_client import http_client
 from datetime import datetime, timedelta
 
 log = create_logger(__name__)
 
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+    log.warning("lxml is not installed, falling back to the BeautifulSoup parser\npip install lxml")
+
+NEXT_PAGE_PATTERN = re.compile(rb'<a[^>]*class="pagination-next"[^>]*>')
+HREF_PATTERN = re.compile(rb'href="([^"]+)"')
+AD_ID_PATTERN = re.compile(rb'data-adid="(\d+)"')
+# Platzhalter, wenn die Ergebnisliste keinen Anzeigentext zeigt
+NO_DESCRIPTION = "No Description"
+AD_TABLE_MARKER = b'id="srchrslt-adtable"'
+PAGINATION_MARKER = b'class="pagination'
+PRICE_PATTERN = re.compile(r"(\d{1,3}(?:[.,]\d{3})*(?:[.,]\d+)?)")
+
+
+def parse_price_value(raw_price) -> Optional[float]:
+    """Zahl aus einem Preistext wie "1.234 € VB" - None bei "Zu verschenken", "VB" ohne Zahl usw."""
+    if not raw_price:
+        return None
+
+    text = str(raw_price).lower()
+
+    # Zu verschenken / VB ohne Zahl
+    if "verschenk" in text or text.strip() in ["vb", "verhandlungsbasis"]:
+        return None
+
+    match = PRICE_PATTERN.search(text)
+    if not match:
+        return None
+
+    # Tausenderpunkte entfernen
+    number = match.group(1).replace(".", "").replace(",", ".")
+
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_listing_date(raw: str, now: datetime) -> Optional[datetime]:
+    raw = raw.lower().strip()
+    if not raw:
+        return None
+
+    try:
+        if "heute" in raw:
+            time_part = raw.split(",")[1].strip()
+            hour, minute = map(int, time_part.split(":"))
+            return now.replace(hour=hour, minute=minute, second=0)
+
+        if "gestern" in raw:
+            time_part = raw.split(",")[1].strip()
+            hour, minute = map(int, time_part.split(":"))
+            d = now - timedelta(days=1)
+            return d.replace(hour=hour, minute=minute, second=0)
+
+        # Format: 15.09.2025
+        return datetime.strptime(raw, "%d.%m.%Y")
+
+    except Exception:
+        return None
+
+
+@dataclass(slots=True)
+class ListingRecord:
+    """Kompakte, einmalig extrahierte Anzeige. Hält keine Referenz auf den Parse-Baum,
+    alle Felder werden beim Anlegen genau einmal berechnet."""
+    id: int
+    link: str
+    title: str
+    title_lower: str
+    price: str
+    price_value: Optional[float]
+    city: str
+    distance: Optional[str]
+    date_raw: str
+    date: Optional[datetime]
+    description: str
+    is_topad: bool = False
+    # werden nach dem Abruf der Detailseite gesetzt
+    seller_name: Optional[str] = None
+    seller_agedays: Optional[int] = None
+
+    def __repr__(self):
+        return '{}; {}; {}'.format(self.title, self.city, self.distance)
+
 
 class EbayItem:
     """Class ebay item"""
@@ -41,11 +132,26 @@ class EbayItem:
         if description:
             return description.replace("\n", " ")
         else:
-            return "No Description"
+            return NO_DESCRIPTION
 
     @property
     def id(self) -> int:
-        return int(self.contents.get('data-adid')) or 0
+        return self.article_id(self.contents)
+
+    @property
+    def is_topad(self) -> bool:
+        return self.article_is_topad(self.contents)
+
+    @staticmethod
+    def article_id(article) -> int:
+        """ID direkt aus dem Artikel-Element, ohne ein Item zu bauen."""
+        return int(article.get('data-adid') or 0)
+
+    @staticmethod
+    def article_is_topad(article) -> bool:
+        # Top-Anzeigen stehen unabhängig von ihrem Alter oben auf jeder Seite
+        listitem = article.parent
+        return bool(listitem and "is-topad" in (listitem.get("class") or []))
 
     @property
     def city(self):
@@ -61,30 +167,27 @@ class EbayItem:
 
     @property
     def date(self):
-        raw = self.date_raw.lower().strip()
-        now = datetime.now()
-    
-        if not raw:
-            return None
-    
-        try:
-            if "heute" in raw:
-                time_part = raw.split(",")[1].strip()
-                hour, minute = map(int, time_part.split(":"))
-                return now.replace(hour=hour, minute=minute, second=0)
-    
-            if "gestern" in raw:
-                time_part = raw.split(",")[1].strip()
-                hour, minute = map(int, time_part.split(":"))
-                d = now - timedelta(days=1)
-                return d.replace(hour=hour, minute=minute, second=0)
-    
-            # Format: 15.09.2025
-            return datetime.strptime(raw, "%d.%m.%Y")
-    
-        except Exception:
-            return None
+        return parse_listing_date(self.date_raw, datetime.now())
 
+    def to_record(self, now: Optional[datetime] = None) -> ListingRecord:
+        """Liest jedes Feld genau einmal aus dem Baum."""
+        title = self.title
+        price = self.price
+        date_raw = self.date_raw
+        return ListingRecord(
+            id=self.id,
+            link=self.link,
+            title=title,
+            title_lower=title.lower(),
+            price=price,
+            price_value=parse_price_value(price),
+            city=self.city,
+            distance=self.distance,
+            date_raw=date_raw,
+            date=parse_listing_date(date_raw, now or datetime.now()),
+            description=self.description,
+            is_topad=self.is_topad,
+        )
 
     def __repr__(self):
         return '{}; {}; {}'.format(self.title, self.city, self.distance)
@@ -106,32 +209,214 @@ class EbayItem:
                 self._distance = split_detail[1]
 
 
+class LxmlEbayItem(EbayItem):
+    """EbayItem auf Basis eines lxml-Elements (siehe EbayItemFactory.extract_item_from_bytes).
+    Liefert dieselben Werte wie die BeautifulSoup-Variante, nur die Zugriffe auf den Baum
+    sind andere."""
+    _class_xpaths = {}
+
+    @property
+    def link(self) -> str:
+        anchor = self.contents.find(".//a")
+        if anchor is not None and anchor.get('href'):
+            return settings.URL_BASE + anchor.get('href')
+        else:
+            return "No url found."
+
+    @staticmethod
+    def article_is_topad(article) -> bool:
+        listitem = article.getparent()
+        return listitem is not None and "is-topad" in (listitem.get("class") or "").split()
+
+    def _find_text_in_class(self, class_name: str):
+        xpath = self._class_xpaths.get(class_name)
+        if xpath is None:
+            xpath = lxml.etree.XPath(
+                f"descendant::*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')][1]"
+            )
+            self._class_xpaths[class_name] = xpath
+        found = xpath(self.contents)
+        if found:
+            return found[0].text_content().strip()
+
+
 class EbayItemFactory:
-    def __init__(self, link):
+    """Lädt die Ergebnisseiten eines Such-Links. Mit watermark (höchste bereits gesehene
+    Anzeigen-ID des Links) wird so lange weitergeblättert, bis eine Seite eine Anzeige
+    mit ID <= watermark enthält - ruhige Links kosten so eine Seite, volle nur so viele
+    wie nötig. Ohne watermark (erster Lauf) wird nur die erste Seite gelesen.
+
+    validators sind die beim letzten Abruf gemerkten Werte (etag, last_modified,
+    fingerprint) der ersten Seite. Antwortet der Server mit 304 oder ergibt die
+    Reihenfolge der Anzeigen-IDs denselben Fingerprint, ist unchanged True und es wird
+    weder geparst noch weitergeblättert. Die neuen Werte stehen danach in self.validators."""
+    def __init__(self, link, timeout: Optional[float] = None, watermark: Optional[int] = None,
+                 max_pages: Optional[int] = None, validators: Optional[dict] = None,
+                 known_ids: Optional[AbstractSet[int]] = None):
         self.link = link
-        web_pages = self.get_webpage()
-        if web_pages:
-            articles = self.extract_item_from_page(self.get_webpage())
-            self.item_list = [EbayItem(article) for article in articles]
+        self.timeout = timeout or settings.FETCH_TIMEOUT
+        self.watermark = watermark
+        self.max_pages = max_pages or settings.MAX_PAGES_PER_LINK
+        self.validators = dict(validators or {})
+        # Bereits bekannte Anzeigen-IDs werden gar nicht erst zu ListingRecords ausgelesen
+        self.known_ids = known_ids or frozenset()
+        self.encoding = "utf-8"
+        self.item_list: List[ListingRecord] = []
+        self.max_id: Optional[int] = None
+        self.pages_fetched = 0
+        self.known_skipped = 0
+        self.unchanged = False
+        self.stopped_early = False
+        self.hit_page_limit = False
+        # False, wenn eine Folgeseite nicht geladen werden konnte - dann darf der
+        # Wasserstand nicht vorrücken, sonst wären die übersprungenen Anzeigen verloren.
+        self.complete = True
+        self._crawl()
+
+    def _crawl(self):
+        seen_ids = set()
+        page_url = self.link
+        while page_url:
+            web_page = self.get_webpage(page_url, conditional=self.pages_fetched == 0)
+            if self.unchanged:
+                return
+            if not web_page:
+                self.complete = False
+                return
+            self.pages_fetched += 1
+            records, regular_ids = self.extract_records(web_page, seen_ids)
+            self.item_list.extend(records)
+            if regular_ids:
+                self.max_id = max(self.max_id or 0, max(regular_ids))
+
+            if self.watermark is None:
+                return
+            if any(ad_id <= self.watermark for ad_id in regular_ids):
+                self.stopped_early = True
+                return
+            if self.pages_fetched >= self.max_pages:
+                self.hit_page_limit = True
+                return
+            page_url = self.extract_next_page_url(web_page)
+
+    def extract_records(self, content: bytes, seen_ids: set) -> Tuple[List[ListingRecord], List[int]]:
+        """Parst eine Ergebnisseite und gibt die neuen ListingRecords sowie die IDs aller
+        regulären (Nicht-Top-)Anzeigen der Seite zurück. Für bekannte und bereits auf einer
+        vorherigen Seite gesehene Anzeigen wird nur die ID gelesen - aus dem rohen
+        Artikel-Element, ohne ein Item zu bauen. Der Parse-Baum wird direkt danach freigegeben."""
+        soup = None
+        if settings.PARSER_BACKEND == "lxml" and lxml is not None:
+            item_class = LxmlEbayItem
+            articles = self.extract_item_from_bytes(content, self.encoding)
         else:
-            self.item_list = []
+            item_class = EbayItem
+            soup = self.make_soup(content.decode(self.encoding, errors="replace"))
+            articles = list(self.find_articles(soup))
+
+        now = datetime.now()
+        records = []
+        regular_ids = []
+        for article in articles:
+            ad_id = item_class.article_id(article)
+            if not item_class.article_is_topad(article):
+                regular_ids.append(ad_id)
+            # Zwischen zwei Seitenabrufen rutschen Anzeigen nach hinten - Dubletten raus
+            if ad_id in seen_ids:
+                continue
+            seen_ids.add(ad_id)
+            if ad_id in self.known_ids:
+                self.known_skipped += 1
+                continue
+            records.append(item_class(article).to_record(now))
+
+        if soup is not None:
+            # BeautifulSoup-Bäume sind zyklisch verlinkt und würden sonst erst vom GC geräumt
+            soup.decompose()
+        return records, regular_ids
 
-    def get_webpage(self) -> str:
+    def get_webpage(self, url: Optional[str] = None, conditional: bool = False) -> bytes:
+        url = url or self.link
         custom_header = {
             "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:77.0) Gecko/20100101 Firefox/77.0"
         }
-        response = requests.get(self.link, headers=custom_header)
+        if conditional:
+            if self.validators.get("etag"):
+                custom_header["if-none-match"] = self.validators["etag"]
+            if self.validators.get("last_modified"):
+                custom_header["if-modified-since"] = self.validators["last_modified"]
+        response = http_client.get(url, headers=custom_header, timeout=(settings.HTTP_CONNECT_TIMEOUT, self.timeout))
+        if conditional and response.status_code == 304:
+            self.pages_fetched += 1
+            self.unchanged = True
+            return None
         if response and response.status_code == 200:
-            return response.text
+            if conditional:
+                fingerprint = self.page_fingerprint(response.content)
+                self.unchanged = bool(fingerprint) and fingerprint == self.validators.get("fingerprint")
+                self.validators = {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                    "fingerprint": fingerprint,
+                }
+                if self.unchanged:
+                    self.pages_fetched += 1
+                    return None
+            self.encoding = response.encoding or "utf-8"
+            return response.content
         else:
-            print(f"<< webpage fetching error for url: {self.link}")
+            print(f"<< webpage fetching error for url: {url}")
+
+    @staticmethod
+    def page_fingerprint(content: bytes) -> Optional[str]:
+        """Billiger Fingerprint der Seite: die Anzeigen-IDs in Seitenreihenfolge, ohne zu parsen."""
+        ad_ids = AD_ID_PATTERN.findall(content)
+        if ad_ids:
+            return hashlib.sha1(b",".join(ad_ids)).hexdigest()
 
     @staticmethod
-    def extract_item_from_page(text: str) -> Generator:
+    def extract_next_page_url(content: bytes) -> Optional[str]:
+        next_link = NEXT_PAGE_PATTERN.search(content)
+        if next_link:
+            href = HREF_PATTERN.search(next_link.group(0))
+            if href:
+                return settings.URL_BASE + html.unescape(href.group(1).decode("utf-8", errors="replace"))
+
+    @staticmethod
+    def extract_item_from_bytes(content: bytes, encoding: str = "utf-8") -> list:
+        """Schneller Parser: schneidet nur die Ergebnisliste (#srchrslt-adtable bis zur
+        Paginierung) aus den Roh-Bytes und parst diesen Ausschnitt mit lxml - Kopf, Skripte
+        und Footer der Seite werden gar nicht erst angefasst."""
+        start = content.find(AD_TABLE_MARKER)
+        if start == -1:
+            return []
+        start = content.rfind(b"<", 0, start)
+        end = content.find(PAGINATION_MARKER, start)
+        fragment = content[start:end if end != -1 else len(content)].replace(b"&#8203", b"")
+        parser = lxml.html.HTMLParser(encoding=encoding)
+        root = lxml.html.fromstring(fragment, parser=parser)
+        result = root if root.get("id") == "srchrslt-adtable" else root.find(".//*[@id='srchrslt-adtable']")
+        if result is None:
+            return []
+        articles = []
+        for item in result.xpath(".//*[contains(@class, 'ad-listitem')]"):
+            article = item.find(".//article")
+            if article is not None:
+                articles.append(article)
+        return articles
+
+    @staticmethod
+    def make_soup(text: str) -> BeautifulSoup:
         cleaned_response = text.replace("&#8203", "")
-        soup = BeautifulSoup(cleaned_response, "html.parser")
+        return BeautifulSoup(cleaned_response, "html.parser")
+
+    @staticmethod
+    def find_articles(soup: BeautifulSoup) -> Generator:
         result = soup.find(attrs={"id": "srchrslt-adtable"})
         if result:
             for item in result.find_all(attrs={"class": re.compile("ad-listitem.*")}):
                 if item.article:
                     yield item.article
+
+    @classmethod
+    def extract_item_from_page(cls, text: str) -> Generator:
+        return cls.find_articles(cls.make_soup(text))
@@ -0,0 +1,187 @@
+"""
+Preisschätzung aus den eBay-Stichproben (siehe ebay_market.py) - für eine Query oder
+viele (Query, Angebotspreis)-Paare in einem vektorisierten Aufruf. Die Stichproben
+werden dafür in eine mit NaN aufgefüllte Matrix gelegt, jede Zeile ist ein Paar.
+
+Schätzer (PRICE_ESTIMATOR):
+- "robust":  Korridor um den Angebotspreis, Ausreißer raus per MAD (mehr als
+             MAD_CUTOFF robuste Standardabweichungen vom Median), dann der Median
+- "legacy":  das bisherige Verfahren - Korridor, feste Buckets (20€ unter 150€
+             Angebotspreis, sonst 50€), Median des am stärksten besetzten Buckets.
+             Liefert exakt die Werte der alten Implementierung.
+
+Zu jedem Ergebnis gibt es Metadaten zur Verlässlichkeit: Stichprobengröße vor und nach
+den Filtern, MAD, IQR, relative Streuung (IQR/Median) und den Modus (Mitte des am
+stärksten besetzten Histogramm-Bins, Bin-Breite nach Freedman-Diaconis).
+"""
+import warnings
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+ESTIMATORS = ("robust", "legacy")
+MIN_PRICES = 2
+# 1.4826 * MAD schätzt bei normalverteilten Preisen die Standardabweichung
+MAD_SCALE = 1.4826
+MAD_CUTOFF = 3.0
+
+
+class PriceEstimate(NamedTuple):
+    median: Optional[float]
+    estimator: str
+    n_samples: int
+    n_corridor: int
+    n_used: int
+    mad: Optional[float]
+    iqr: Optional[float]
+    dispersion: Optional[float]
+    mode: Optional[float]
+
+
+def pad(samples: Sequence[Sequence[float]]) -> np.ndarray:
+    width = max((len(prices) for prices in samples), default=0)
+    matrix = np.full((len(samples), max(width, 1)), np.nan)
+    for row, prices in enumerate(samples):
+        matrix[row, :len(prices)] = prices
+    return matrix
+
+
+def estimate(prices: Sequence[float], offer_price: float, estimator: str = "robust") -> PriceEstimate:
+    return estimate_batch([prices], [offer_price], estimator)[0]
+
+
+def estimate_batch(samples: Sequence[Sequence[float]], offer_prices: Sequence[float],
+                   estimator: str = "robust") -> List[PriceEstimate]:
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unbekannter Schätzer '{estimator}' (erlaubt: {', '.join(ESTIMATORS)})")
+    if not len(samples):
+        return []
+    prices = pad(samples)
+    offers = np.asarray(offer_prices, dtype=np.float64)[:, None]
+    present = ~np.isnan(prices)
+    corridor = present & (prices >= offers * 0.5) & (prices <= offers * 3.0)
+    in_corridor = np.where(corridor, prices, np.nan)
+
+    if estimator == "legacy":
+        used = corridor & _legacy_cluster(prices, corridor, offers[:, 0])
+    else:
+        used = corridor & _mad_inliers(in_corridor)
+    used_prices = np.where(used, prices, np.nan)
+
+    n_corridor = corridor.sum(axis=1)
+    n_used = used.sum(axis=1)
+    valid = n_corridor >= MIN_PRICES
+    with np.errstate(all="ignore"), _quiet_nan_warnings():
+        medians = np.nanmedian(used_prices, axis=1)
+        center = np.nanmedian(in_corridor, axis=1)
+        mad = np.nanmedian(np.abs(in_corridor - center[:, None]), axis=1)
+        q1, q3 = np.nanpercentile(in_corridor, [25, 75], axis=1)
+        iqr = q3 - q1
+        dispersion = iqr / center
+        modes = _histogram_mode(in_corridor, corridor, iqr, n_corridor, center)
+
+    results = []
+    for row in range(len(samples)):
+        ok = bool(valid[row]) and n_used[row] > 0
+        results.append(PriceEstimate(
+            # round() wie bisher (Python-Rundung, nicht np.round)
+            median=round(float(medians[row]), 2) if ok else None,
+            estimator=estimator,
+            n_samples=int(present[row].sum()),
+            n_corridor=int(n_corridor[row]),
+            n_used=int(n_used[row]),
+            mad=_value(mad[row], ok),
+            iqr=_value(iqr[row], ok),
+            dispersion=_value(dispersion[row], ok),
+            mode=_value(modes[row], ok),
+        ))
+    return results
+
+
+def _legacy_cluster(prices: np.ndarray, corridor: np.ndarray, offers: np.ndarray) -> np.ndarray:
+    """Maske des Buckets, den das alte Verfahren gewählt hätte: der mit den meisten
+    Preisen, bei Gleichstand der, dessen erster Preis in der Stichprobe zuerst kommt."""
+    rows, width = prices.shape
+    bucket_size = np.where(offers < 150, 20, 50)[:, None]
+    with np.errstate(invalid="ignore"):
+        buckets = np.where(corridor, np.floor_divide(prices, bucket_size), -1).astype(np.int64)
+    # (Zeile, Bucket) als ein Schlüssel, damit alle Zeilen in einem np.unique-Aufruf zählen
+    keys = np.arange(rows)[:, None] * (buckets.max(initial=0) + 2) + buckets + 1
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    per_price = np.where(corridor, counts[inverse.reshape(keys.shape)], 0)
+    # höchste Anzahl gewinnt, bei Gleichstand die frühere Position
+    score = per_price * (width + 1) - np.arange(width)[None, :]
+    score = np.where(corridor, score, np.iinfo(np.int64).min)
+    winner = buckets[np.arange(rows), np.argmax(score, axis=1)]
+    return buckets == winner[:, None]
+
+
+def _mad_inliers(in_corridor: np.ndarray) -> np.ndarray:
+    with np.errstate(all="ignore"), _quiet_nan_warnings():
+        center = np.nanmedian(in_corridor, axis=1)[:, None]
+        deviation = np.abs(in_corridor - center)
+        mad = np.nanmedian(deviation, axis=1)[:, None]
+        # MAD 0 (mehr als die Hälfte gleich): nichts verwerfen statt alles außer dem Median
+        limit = np.where(mad > 0, MAD_CUTOFF * MAD_SCALE * mad, np.inf)
+        return deviation <= limit
+
+
+def _histogram_mode(in_corridor: np.ndarray, corridor: np.ndarray, iqr: np.ndarray, n: np.ndarray,
+                    center: np.ndarray) -> np.ndarray:
+    # Freedman-Diaconis, aber nie feiner als 2% des Medians bzw. 1€
+    width = np.fmax(2 * iqr / np.cbrt(np.maximum(n, 1)), np.fmax(0.02 * center, 1.0))
+    width = np.where(np.isnan(width), 1.0, width)[:, None]
+    bins = np.where(corridor, np.floor(np.nan_to_num(in_corridor) / width), -1).astype(np.int64)
+    rows = np.arange(len(bins))
+    keys = rows[:, None] * (bins.max(initial=0) + 2) + bins + 1
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    per_price = np.where(corridor, counts[inverse.reshape(keys.shape)], 0)
+    best = bins[rows, np.argmax(per_price, axis=1)]
+    return (best + 0.5) * width[:, 0]
+
+
+def _value(value, ok: bool) -> Optional[float]:
+    return float(value) if ok and not np.isnan(value) else None
+
+
+@contextmanager
+def _quiet_nan_warnings():
+    """Zeilen ohne einen einzigen Preis liefern NaN - die RuntimeWarning dazu ist hier gewollt."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
+
+
+def compare(samples: Sequence[Sequence[float]], offer_prices: Sequence[float],
+            estimators: Sequence[str] = ESTIMATORS) -> dict:
+    """Alle Schätzer auf denselben Paaren - {Schätzer: [PriceEstimate, ...]}."""
+    return {name: estimate_batch(samples, offer_prices, name) for name in estimators}
+
+
+def print_comparison(results: dict, missing: int = 0, show: int = 10, baseline: str = "legacy"):
+    reference = results[baseline]
+    print(f"{len(reference)} Paare (Query, Angebotspreis) mit Stichprobe, {missing} ohne")
+    for name, estimates in results.items():
+        covered = [estimate for estimate in estimates if estimate.median is not None]
+        dispersion = [estimate.dispersion for estimate in covered if estimate.dispersion is not None]
+        line = f"{name:<8} Median gefunden: {len(covered)}/{len(estimates)}"
+        if dispersion:
+            line += f", mittlere Streuung {np.mean(dispersion):.0%}"
+        if name != baseline:
+            diffs = [abs(estimate.median - base.median) / base.median
+                     for estimate, base in zip(estimates, reference)
+                     if estimate.median is not None and base.median is not None]
+            if diffs:
+                line += (f", Abweichung zu {baseline}: Median {np.median(diffs):.1%}, "
+                         f"{sum(diff > 0.1 for diff in diffs)} Paare über 10%")
+        print(line)
+        if name == baseline or not show:
+            continue
+        ranked = sorted(((abs(estimate.median - base.median), base, estimate)
+                         for estimate, base in zip(estimates, reference)
+                         if estimate.median is not None and base.median is not None),
+                        key=lambda entry: entry[0], reverse=True)[:show]
+        for _, base, estimate in ranked:
+            print(f"   {baseline} {base.median:>8.2f}€ ({base.n_used:>2} Preise)  ->  {name} {estimate.median:>8.2f}€ "
+                  f"({estimate.n_used:>2}/{estimate.n_corridor:>2} Preise, Streuung {estimate.dispersion or 0:.0%})")
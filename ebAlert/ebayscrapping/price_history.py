@@ -0,0 +1,177 @@
+"""
+Preisverlauf pro Query: jede Live-Abfrage (siehe ebay_market.fetch_live_samples) hängt
+einen Punkt (Zeitpunkt, Marktwert, Stichprobengröße, Streuung) an, statt wie der
+Stichproben-Cache nur den alten Eintrag zu überschreiben. Die Punkte liegen in der
+Tabelle price_history der gemeinsamen Cache-Datei (core/cache_store.py).
+
+Im Speicher hält PriceSeries die Punkte einer Query zeitlich sortiert, dazu Präfixsummen
+über Zeit und Wert (t, v, t², t·v, v²). Aktueller Wert, Trend (Steigung der
+Regressionsgeraden) und Volatilität (Variationskoeffizient) über ein Zeitfenster kosten
+damit zwei Binärsuchen - O(log n), egal wie lang der Verlauf ist.
+
+Daraus abgeleitet:
+- trend_factor: schreibt einen Marktwert aus einer älteren Stichprobe entlang des Trends
+  bis heute fort (PRICE_TREND_ADJUST)
+- fresh_seconds: Cache-Laufzeit pro Query - lang bei stabilen Preisen, kurz bei Produkten,
+  deren Preis sich gerade schnell bewegt (z.B. Grafikkarten rund um einen Launch)
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ebAlert.core.cache_store import CacheStore
+
+DAY = 86400.0
+
+
+class PricePoint(NamedTuple):
+    timestamp: float
+    median: float
+    n_samples: int
+    dispersion: Optional[float]
+
+
+class PriceSeries:
+    def __init__(self, points: Iterable[PricePoint] = ()):
+        self.points: List[PricePoint] = []
+        self._times: List[float] = []
+        # Präfixsummen: Index i = Summe über die ersten i Punkte. Zeiten in Tagen ab dem
+        # ersten Punkt, damit die Quadrate nicht an der float-Genauigkeit scheitern.
+        self._sums: List[Tuple[float, float, float, float, float]] = [(0.0, 0.0, 0.0, 0.0, 0.0)]
+        for point in points:
+            self.append(point)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self._times[-1] if self._times else None
+
+    def append(self, point: PricePoint):
+        if self._times and point.timestamp < self._times[-1]:
+            raise ValueError(f"Preisverlauf ist nur anhängbar: {point.timestamp} liegt vor {self._times[-1]}")
+        t = (point.timestamp - (self._times[0] if self._times else point.timestamp)) / DAY
+        v = point.median
+        st, sv, stt, stv, svv = self._sums[-1]
+        self._sums.append((st + t, sv + v, stt + t * t, stv + t * v, svv + v * v))
+        self.points.append(point)
+        self._times.append(point.timestamp)
+
+    def current(self, at: Optional[float] = None) -> Optional[PricePoint]:
+        """Letzter Punkt bis einschließlich `at` (ohne `at`: der neueste)."""
+        index = len(self.points) if at is None else bisect_right(self._times, at)
+        return self.points[index - 1] if index else None
+
+    def window(self, days: float, at: Optional[float] = None) -> Tuple[int, int]:
+        """Indexbereich [start, end) der Punkte in den `days` Tagen bis `at` (ohne `at`: bis zum neuesten Punkt)."""
+        if not self._times:
+            return 0, 0
+        end = self._times[-1] if at is None else at
+        return bisect_left(self._times, end - days * DAY), bisect_right(self._times, end)
+
+    def _window_sums(self, days: float, at: Optional[float]) -> Tuple[int, float, float, float, float, float]:
+        start, end = self.window(days, at)
+        low, high = self._sums[start], self._sums[end]
+        return (end - start, *(b - a for a, b in zip(low, high)))
+
+    def mean(self, days: float, at: Optional[float] = None) -> Optional[float]:
+        n, _, sv, _, _, _ = self._window_sums(days, at)
+        return sv / n if n else None
+
+    def trend(self, days: float = 7, at: Optional[float] = None) -> Optional[float]:
+        """Relative Preisänderung pro Tag im Fenster: Steigung der Regressionsgeraden durch
+        die Marktwerte, geteilt durch deren Mittelwert. None bei weniger als zwei Zeitpunkten."""
+        n, st, sv, stt, stv, _ = self._window_sums(days, at)
+        if n < 2:
+            return None
+        spread = n * stt - st * st
+        if spread <= 1e-9 * n * n or sv <= 0:
+            return None
+        return (n * stv - st * sv) / spread / (sv / n)
+
+    def volatility(self, days: float, at: Optional[float] = None) -> Optional[float]:
+        """Variationskoeffizient (Standardabweichung / Mittelwert) der Marktwerte im Fenster."""
+        n, _, sv, _, _, svv = self._window_sums(days, at)
+        if n < 2 or sv <= 0:
+            return None
+        variance = max(svv - sv * sv / n, 0.0) / (n - 1)
+        return math.sqrt(variance) / (sv / n)
+
+
+class PriceHistory:
+    """Verlauf aller Queries. Eine Query wird beim ersten series() einmal aus der DB geladen
+    und danach nur noch im Speicher gehalten - record() hängt neue Punkte dort mit an.
+    Punkte, die ein anderer Prozess schreibt, sieht erst refresh()."""
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self._series: Dict[str, PriceSeries] = {}
+        self._lock = threading.Lock()
+
+    def record(self, query: str, point: PricePoint):
+        self.store.connection().execute(
+            "INSERT OR REPLACE INTO price_history (query, ts, median, n_samples, dispersion) VALUES (?, ?, ?, ?, ?)",
+            (query, point.timestamp, point.median, point.n_samples, point.dispersion))
+        with self._lock:
+            series = self._series.get(query)
+            if series is None:
+                return
+            last = series.last_timestamp
+            if last is None or point.timestamp > last:
+                series.append(point)
+            else:
+                # ersetzt oder liegt vor dem letzten Punkt - beim nächsten Zugriff neu laden
+                del self._series[query]
+
+    def series(self, query: str) -> PriceSeries:
+        with self._lock:
+            series = self._series.get(query)
+            if series is None:
+                rows = self.store.connection().execute(
+                    "SELECT ts, median, n_samples, dispersion FROM price_history WHERE query = ? ORDER BY ts",
+                    (query,)).fetchall()
+                series = self._series[query] = PriceSeries(PricePoint(*row) for row in rows)
+            return series
+
+    def refresh(self, query: Optional[str] = None):
+        """Verwirft den Speicherstand (einer Query oder aller) - der nächste Zugriff liest neu aus der DB."""
+        with self._lock:
+            if query is None:
+                self._series.clear()
+            else:
+                self._series.pop(query, None)
+
+    def queries(self) -> List[str]:
+        return [row[0] for row in self.store.connection().execute("SELECT DISTINCT query FROM price_history ORDER BY query")]
+
+
+def trend_factor(series: PriceSeries, sampled_at: float, now: float, days: float, max_adjust: float) -> float:
+    """Faktor, der einen Marktwert von `sampled_at` mit dem aktuellen Trend auf `now`
+    fortschreibt - höchstens ±max_adjust, ohne Trend 1.0."""
+    trend = series.trend(days)
+    if trend is None or now <= sampled_at:
+        return 1.0
+    return min(max(1.0 + trend * (now - sampled_at) / DAY, 1.0 - max_adjust), 1.0 + max_adjust)
+
+
+def fresh_seconds(series: PriceSeries, default: float, minimum: float, maximum: float,
+                  target: float, trend_days: float, volatility_days: float) -> float:
+    """Cache-Laufzeit für eine Query: so lange, bis sich der Preis voraussichtlich um mehr
+    als `target` (relativ) bewegt hat. Maßstab sind die Volatilität (bei Volatilität =
+    target bleibt es bei `default`) und der aktuelle Trend. Mit weniger als drei Punkten
+    im Fenster ist die Schätzung zu wackelig - dann gilt `default`."""
+    start, end = series.window(volatility_days)
+    if end - start < 3:
+        return default
+    candidates = []
+    volatility = series.volatility(volatility_days)
+    if volatility is not None:
+        candidates.append(default * target / volatility if volatility > 0 else maximum)
+    trend = series.trend(trend_days)
+    if trend:
+        candidates.append(target / abs(trend) * DAY)
+    if not candidates:
+        return default
+    return min(max(min(candidates), minimum), maximum)
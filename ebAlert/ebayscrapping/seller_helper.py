@@ -1,14 +1,37 @@
-import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
+from itertools import chain
+from typing import Iterable, Iterator, Optional
 import re
 
+from ebAlert.core.fetch_engine import host_of
+from ebAlert.core.http_client import http_client
+from ebAlert.core.ratelimit import is_block_page, limiter_for
+
+try:
+    import lxml.etree
+except ImportError:
+    lxml = None
+
 HEADERS = {
    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36","User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
 }
 
 DATE_PATTERN = re.compile(r"(\d{2}\.\d{2}\.\d{4})")
 
+CHUNK_SIZE = 16 * 1024
+# Nach dem Parsen wird der Rest der Seite noch gelesen (ohne ihn zu parsen), damit die
+# Keep-Alive-Verbindung zurück in den Pool geht. Ein neuer TCP+TLS-Handshake kostet mehr
+# als die paar hundert KB einer Detailseite; nur bei ungewöhnlich großen Resten wird die
+# Verbindung stattdessen verworfen.
+MAX_DRAIN_BYTES = 1024 * 1024
+SELLER_BOX_CLASSES = {"text-body-regular-strong", "text-force-linebreak", "userprofile-vip"}
+DETAILS_CLASS = "userprofile-vip-details-text"
+DESCRIPTION_ID = "viewad-description-text"
+# Inhalte, die für keins der Felder gebraucht werden und nur Speicher kosten
+SKIPPED_TAGS = {"script", "style", "svg", "noscript"}
+
+
 def fetch_seller_info(ad_url: str) -> dict | None:
     """
     Lädt eine Detailseite der Anzeige und extrahiert:
@@ -17,74 +40,182 @@ def fetch_seller_info(ad_url: str) -> dict | None:
     - active_since (datetime)
     - seller_age_days (Tage seit Aktivität)
     - description (vollständiger Anzeigentext)
+
+    Die Seite wird gestreamt und mit dem lxml-Pull-Parser gelesen; sobald alle Felder
+    gefunden sind, wird der Rest nur noch bis zum Ende gelesen und nicht mehr geparst.
+    Eine Sperr-/Captcha-Seite bremst den Limiter des Hosts und liefert None.
     """
 
     try:
-        response = requests.get(ad_url, headers=HEADERS, timeout=10)
-        if response.status_code != 200:
-            return None
+        if lxml is None:
+            response = http_client.get(ad_url, headers=HEADERS)
+            if response.status_code != 200:
+                return None
+            return parse_seller_info_soup(response.text)
+
+        response = http_client.get(ad_url, headers=HEADERS, stream=True)
+        chunks = response.iter_content(CHUNK_SIZE)
+        try:
+            if response.status_code != 200:
+                return None
+            # bei stream=True sieht der Limiter den Body nicht - die Sperrseite hier erkennen
+            first = next(chunks, b"")
+            if is_block_page(first):
+                limiter = limiter_for(host_of(ad_url))
+                if limiter:
+                    limiter.on_throttle("Sperrseite erkannt")
+                return None
+            fields = extract_seller_fields(chain([first], chunks), response.encoding or "utf-8")
+        finally:
+            _drain(chunks)
+            http_client.record_transfer(response)
+            response.close()
+        return build_seller_info(**fields)
+
+    except Exception as e:
+        print(f"fetch_seller_info error: {e}")
+        return None
+
+
+def _drain(chunks: Iterator[bytes]):
+    """Liest den Rest der Antwort bis EOF, damit urllib3 die Verbindung wiederverwendet."""
+    drained = 0
+    try:
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > MAX_DRAIN_BYTES:
+                return
+    except Exception:
+        # abgebrochene Übertragung - close() verwirft die Verbindung dann ohnehin
+        pass
+
+
+def extract_seller_fields(chunks: Iterable[bytes], encoding: str = "utf-8") -> dict:
+    """Liest die Detailseite Stück für Stück und hört auf, sobald Verkäufername, -typ,
+    "aktiv seit"-Datum und Beschreibung gefunden sind. Liefert dieselben Werte wie die
+    BeautifulSoup-Selektoren in parse_seller_info_soup."""
+    parser = lxml.etree.HTMLPullParser(events=("end",), encoding=encoding)
+    fields = {"seller_name": None, "seller_type": "UNKNOWN", "active_since": None, "description": None}
+    # seller_type kommt aus dem ersten Details-Span, auch wenn der keinen Typ enthält
+    type_checked = False
+    description_found = False
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ""
+            if tag in SKIPPED_TAGS:
+                element.clear(keep_tail=True)
+                continue
+            classes = set((element.get("class") or "").split())
+
+            if tag == "a" and fields["seller_name"] is None:
+                for ancestor in element.iterancestors():
+                    if SELLER_BOX_CLASSES <= set((ancestor.get("class") or "").split()):
+                        fields["seller_name"] = _text(element)
+                        break
+
+            if DETAILS_CLASS in classes:
+                text = _text(element)
+                if tag == "span" and not type_checked:
+                    type_checked = True
+                    fields["seller_type"] = _seller_type(text)
+                if fields["active_since"] is None:
+                    fields["active_since"] = _active_since(text)
+
+            if not description_found and element.get("id") == DESCRIPTION_ID:
+                description_found = True
+                fields["description"] = "\n".join(
+                    part.strip() for part in element.itertext() if part.strip()
+                )
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        if fields["seller_name"] and type_checked and fields["active_since"] and description_found:
+            break
+    else:
+        parser.close()
+    return fields
 
-        # ===== Verkäufername =====
-        seller_name = None
+
+def parse_seller_info_soup(html: str) -> dict | None:
+    """Bisheriger Weg über einen vollständigen BeautifulSoup-Baum (Fallback ohne lxml)."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # ===== Verkäufername =====
+    seller_name = None
+    seller_tag = soup.select_one(
+        ".text-body-regular-strong.text-force-linebreak.userprofile-vip a"
+    )
+
+    if not seller_tag:
         seller_tag = soup.select_one(
-            ".text-body-regular-strong.text-force-linebreak.userprofile-vip a"
+           ".text-body-regular-strong text-force-linebreak userprofile-vip a"
         )
 
-        if not seller_tag:
-            seller_tag = soup.select_one(
-               ".text-body-regular-strong text-force-linebreak userprofile-vip a"
-            )
-       
-        if seller_tag:
-            seller_name = seller_tag.get_text(strip=True)
-
-        # ===== Verkäufer-Typ (COMMERCIAL oder PRIVATE) =====
-        seller_type = "UNKNOWN"
-        # In der Nähe der Verkäuferinfos steht meist z.B. "Privater Nutzer" oder "Gewerblicher Anbieter"
-        seller_type_tag = soup.find(
-            "span", class_="userprofile-vip-details-text"
-        )
-        if seller_type_tag:
-            text = seller_type_tag.get_text(strip=True).lower()
-            if "privat" in text:
-                seller_type = "PRIVATE"
-            elif "gewerblich" in text or "commercial" in text:
-                seller_type = "COMMERCIAL"
-
-        # ===== Aktiv seit Datum =====
-        active_since = None
-        for span in soup.select(".userprofile-vip-details-text"):
-            match = DATE_PATTERN.search(span.get_text(strip=True))
-            if match:
-                try:
-                    active_since = datetime.strptime(match.group(1), "%d.%m.%Y")
-                    break
-                except:
-                    pass
-
-        # ===== Anzeigenbeschreibung =====
-        description = None
-        desc_tag = soup.select_one("#viewad-description-text")
-        if desc_tag:
-            description = desc_tag.get_text(separator="\n", strip=True)
-
-        if not seller_name:
-            return None
-
-        seller_age_days = None
+    if seller_tag:
+        seller_name = seller_tag.get_text(strip=True)
+
+    # ===== Verkäufer-Typ (COMMERCIAL oder PRIVATE) =====
+    # In der Nähe der Verkäuferinfos steht meist z.B. "Privater Nutzer" oder "Gewerblicher Anbieter"
+    seller_type = "UNKNOWN"
+    seller_type_tag = soup.find(
+        "span", class_="userprofile-vip-details-text"
+    )
+    if seller_type_tag:
+        seller_type = _seller_type(seller_type_tag.get_text(strip=True))
+
+    # ===== Aktiv seit Datum =====
+    active_since = None
+    for span in soup.select(".userprofile-vip-details-text"):
+        active_since = _active_since(span.get_text(strip=True))
         if active_since:
-            seller_age_days = (datetime.now() - active_since).days
+            break
 
-        return {
-            "seller_name": seller_name,
-            "seller_type": seller_type,
-            "active_since": active_since,
-            "seller_age_days": seller_age_days,
-            "description": description
-        }
+    # ===== Anzeigenbeschreibung =====
+    description = None
+    desc_tag = soup.select_one("#viewad-description-text")
+    if desc_tag:
+        description = desc_tag.get_text(separator="\n", strip=True)
 
-    except Exception as e:
-        print(f"fetch_seller_info error: {e}")
+    return build_seller_info(seller_name, seller_type, active_since, description)
+
+
+def build_seller_info(seller_name: Optional[str], seller_type: str, active_since: Optional[datetime],
+                      description: Optional[str]) -> dict | None:
+    if not seller_name:
         return None
+
+    seller_age_days = None
+    if active_since:
+        seller_age_days = (datetime.now() - active_since).days
+
+    return {
+        "seller_name": seller_name,
+        "seller_type": seller_type,
+        "active_since": active_since,
+        "seller_age_days": seller_age_days,
+        "description": description
+    }
+
+
+def _text(element) -> str:
+    # entspricht BeautifulSoup get_text(strip=True)
+    return "".join(part.strip() for part in element.itertext())
+
+
+def _seller_type(text: str) -> str:
+    text = text.lower()
+    if "privat" in text:
+        return "PRIVATE"
+    elif "gewerblich" in text or "commercial" in text:
+        return "COMMERCIAL"
+    return "UNKNOWN"
+
+
+def _active_since(text: str) -> Optional[datetime]:
+    match = DATE_PATTERN.search(text)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), "%d.%m.%Y")
+        except ValueError:
+            pass
+    return None
@@ -1,13 +1,20 @@
 import os
 import re
 import json
+import time
+from functools import partial
+from typing import Any, Callable, List, Optional
+
 from openai import OpenAI
+from ebAlert.core.cache_store import cache_store
 from ebAlert.core.config import settings
+from ebAlert.core.fetch_engine import Job, iter_completed
 
 client = OpenAI(api_key=settings.OPEN_API_KEY)
 
 MODEL = "gpt-4.1-mini"
 MODEL_SEARCH_QUERY = "gpt-4.1-mini"
+OPENAI_HOST = "api.openai.com"
 
 SYSTEM_PROMPT_SCORING = """
 ROLE: Professional Electronics Reseller.
@@ -72,37 +79,29 @@ SYSTEM_PROMPT_QUERY_SEARCH= """
 Du bist ein Daten-Parser. Extrahiere nur Markennamen und Modell.
 """
 
-# Sicherstellen, dass CACHE_DIR definiert ist (aus Umgebungsvariable oder lokal)
+# Suchbegriffe liegen im gemeinsamen SQLite-Cache (siehe core/cache_store.py); die
+# frühere gpt_query_cache.json wird beim ersten Zugriff einmalig übernommen.
 BASE_DIR = os.getenv("CACHE_DIR", os.path.expanduser("~"))
 GPT_CACHE_FILE = os.path.join(BASE_DIR, "gpt_query_cache.json")
+GPT_CACHE_VERSION = "v1"
 
-def load_gpt_cache():
-    if os.path.exists(GPT_CACHE_FILE):
-        try:
-            with open(GPT_CACHE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print("GPT load_gpt_cache Error:", e)
-            return {}
+_gpt_cache = cache_store.namespace("gpt_query", GPT_CACHE_VERSION, max_entries=settings.CACHE_MAX_ENTRIES)
+_legacy_imported = False
 
-    print("GPT load_gpt_cache Error: Keine Cachedatei gefunden!")
-    return {}
 
-def save_gpt_cache(cache):
-    try:
-        # Debug: Zeige wo gespeichert wird
-        print(f"💾 Speichere GPT-Cache ({len(cache)} Einträge) in: {GPT_CACHE_FILE}")
-        with open(GPT_CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cache, f, indent=4)
-    except Exception as e:
-        print(f"❌ Fehler beim Speichern des Caches: {e}")
+def gpt_query_cache():
+    global _legacy_imported
+    if not _legacy_imported:
+        _legacy_imported = True
+        _gpt_cache.import_json_once(GPT_CACHE_FILE, lambda key, query: (query, None) if isinstance(query, str) else None)
+    return _gpt_cache
 
 def generate_search_queries_batch(items: list):
     """Wandelt Titel in präzise eBay-Suchbegriffe um mit Caching."""
     if not items:
         return []
 
-    gpt_cache = load_gpt_cache()
+    gpt_cache = gpt_query_cache()
     results = []
     to_request_gpt = []
 
@@ -113,107 +112,123 @@ def generate_search_queries_batch(items: list):
         clean_key = " ".join(raw_title.split()).lower()
         item_id = str(item.get('id'))
         
-        if clean_key in gpt_cache:
+        cached_query = gpt_cache.get(clean_key)
+        if cached_query is not None:
             print(f"✅ Cache-Hit: {clean_key}")
-            results.append({'id': item_id, 'query': gpt_cache[clean_key]})
+            results.append({'id': item_id, 'query': cached_query})
         else:
             to_request_gpt.append(item)
 
-    if not to_request_gpt:
-        return results
-
     # Wenn alles im Cache war, können wir hier schon aufhören
     if not to_request_gpt:
         print(f"✅ GPT-Cache: Alle {len(items)} Suchbegriffe aus Cache geladen.")
         return results
 
-    # 2. Schritt: Nur die neuen Items an GPT senden
+    # 2. Schritt: Nur die neuen Items an GPT senden - in Chunks, die parallel laufen.
+    # Jeder fertige Chunk wird sofort gecacht; schlägt einer fehl, bleiben die anderen.
     print(f"🤖 GPT-Anfrage für {len(to_request_gpt)} neue Titel...")
+    for chunk_results, new_entries in run_chunks(chunked(to_request_gpt, settings.GPT_QUERY_CHUNK_SIZE),
+                                                 request_search_queries, "Suchbegriffe"):
+        results.extend(chunk_results)
+        if new_entries:
+            try:
+                gpt_cache.set_many(new_entries)
+                print(f"💾 GPT-Cache: {len(new_entries)} neue Suchbegriffe gespeichert.")
+            except Exception as e:
+                print(f"❌ Fehler beim Speichern des Caches: {e}")
+    return results
+
+
+def request_search_queries(chunk: list):
+    """Ein GPT-Aufruf für einen Chunk: ([{'id', 'query'}, ...], {Cache-Key: Suchbegriff})."""
     prompt = "Extrahiere für jede Anzeige den präzisesten Suchbegriff für eBay (Modellname, Kapazität, etc.). Keine Farben oder Zustandsbeschreibungen. Antworte als JSON-Objekt: {'queries': [{'id': '...', 'query': '...'}]}"
-    input_data = [{"id": str(i.get('id')), "title": i.get('title')} for i in to_request_gpt]
-    
-    try:
-        response = client.chat.completions.create(
-            model=MODEL_SEARCH_QUERY,
-            temperature=0.1,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": "Du bist ein Daten-Parser. Extrahiere nur Markennamen und Modell."},
-                {"role": "user", "content": f"{prompt}\nAnzeigen: {json.dumps(input_data)}"}
-            ]
-        )
-        
-        gpt_results = json.loads(response.choices[0].message.content).get('queries', [])
-        
-        # 3. Schritt: Neue Ergebnisse cachen und zur Liste hinzufügen
-        new_entries = 0
-        for q_data in gpt_results:
-            q_id = str(q_data.get('id')) # Sicherstellen, dass ID ein String ist
-            q_text = q_data.get('query')
-
-            if not q_text: continue
-            
-            # Suche das Item anhand der ID
-            orig_item = next((x for x in to_request_gpt if str(x.get('id')) == q_id), None)
-            
-            if orig_item:
-                # Nutze den exakt gleichen clean_key wie oben!
-                clean_key = " ".join(orig_item.get('title', '').split()).lower()
-                gpt_cache[clean_key] = q_text
-                new_entries += 1
-            
-            results.append({'id': q_id, 'query': q_text})
-
-        if new_entries > 0:
-            save_gpt_cache(gpt_cache)
-            
-        return results
-
-    except Exception as e:
-        print("GPT search_queries_batch Error:", e)
-        # Im Fehlerfall geben wir zumindest die Cache-Ergebnisse zurück
-        return results
-
-def evaluate_listings_batch(listings: list, chunk_size: int = 8):
+    input_data = [{"id": str(i.get('id')), "title": i.get('title')} for i in chunk]
+    response = client.chat.completions.create(
+        model=MODEL_SEARCH_QUERY,
+        temperature=0.1,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT_QUERY_SEARCH.strip()},
+            {"role": "user", "content": f"{prompt}\nAnzeigen: {json.dumps(input_data)}"}
+        ],
+        timeout=settings.GPT_CHUNK_TIMEOUT,
+    )
+    gpt_results = json.loads(response.choices[0].message.content).get('queries', [])
+
+    # 3. Schritt: Neue Ergebnisse für den Cache vormerken und zur Liste hinzufügen
+    results, new_entries = [], {}
+    for q_data in gpt_results:
+        q_id = str(q_data.get('id')) # Sicherstellen, dass ID ein String ist
+        q_text = q_data.get('query')
+
+        if not q_text: continue
+
+        # Suche das Item anhand der ID
+        orig_item = next((x for x in chunk if str(x.get('id')) == q_id), None)
+
+        if orig_item:
+            # Nutze den exakt gleichen clean_key wie oben!
+            clean_key = " ".join(orig_item.get('title', '').split()).lower()
+            new_entries[clean_key] = q_text
+
+        results.append({'id': q_id, 'query': q_text})
+    return results, new_entries
+
+
+def evaluate_listings_batch(listings: list, chunk_size: Optional[int] = None):
     """
     Unterteilt die Liste der Artikel in kleinere Blöcke (Chunks),
     um die Genauigkeit der KI zu erhöhen und Fehler zu vermeiden.
+    Die Chunks laufen parallel; fehlt ein Chunk (Fehler/Timeout),
+    kommen die übrigen Ergebnisse trotzdem zurück.
     """
     if not listings:
         return []
 
     all_results = []
+    for batch_results in run_chunks(chunked(listings, chunk_size or settings.GPT_EVAL_CHUNK_SIZE),
+                                    request_evaluation, "Evaluation"):
+        all_results.extend(batch_results)
+    return all_results
 
-    # Unterteilen der Gesamtliste in Teil-Listen (z.B. jeweils 12 Artikel)
-    for i in range(0, len(listings), chunk_size):
-        current_chunk = listings[i:i + chunk_size]
-        
-        try:
-            print(f"--- 🧠 GPT Evaluation: Verarbeite Batch {i // chunk_size + 1} ({len(current_chunk)} Items) ---")
-            
-            response = client.chat.completions.create(
-                model=MODEL,
-                temperature=0.0,
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT_SCORING},
-                    {"role": "user", "content": json.dumps(current_chunk)}
-                ]
-            )
-
-            content = json.loads(response.choices[0].message.content)
-            batch_results = content.get("result", [])
-            
-            # Die Ergebnisse des aktuellen Chunks an die Gesamtliste anhängen
-            all_results.extend(batch_results)
-
-        except Exception as e:
-            print(f"❌ GPT Batch Error bei Index {i}: {e}")
-            # Wir machen trotz Fehlers beim nächsten Chunk weiter, 
-            # damit nicht alle Ergebnisse verloren gehen.
-            continue
 
-    return all_results
+def request_evaluation(chunk: list) -> list:
+    response = client.chat.completions.create(
+        model=MODEL,
+        temperature=0.0,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT_SCORING},
+            {"role": "user", "content": json.dumps(chunk)}
+        ],
+        timeout=settings.GPT_CHUNK_TIMEOUT,
+    )
+    content = json.loads(response.choices[0].message.content)
+    return content.get("result", [])
+
+
+def chunked(items: list, size: int) -> List[list]:
+    return [items[i:i + size] for i in range(0, len(items), max(size, 1))]
+
+
+def run_chunks(chunks: List[list], request: Callable[[list], Any], label: str) -> List[Any]:
+    """Schickt die Chunks parallel an GPT (höchstens GPT_CONCURRENCY gleichzeitig, jeder
+    höchstens GPT_CHUNK_TIMEOUT Sekunden) und liefert die Ergebnisse der erfolgreichen
+    Chunks in der ursprünglichen Reihenfolge. Die Dauer entspricht damit etwa der des
+    langsamsten Aufrufs statt der Summe aller."""
+    jobs = [Job(index, partial(request, chunk), host=OPENAI_HOST, timeout=settings.GPT_CHUNK_TIMEOUT)
+            for index, chunk in enumerate(chunks)]
+    print(f"--- 🧠 GPT {label}: {len(chunks)} Batches ({sum(len(chunk) for chunk in chunks)} Items) ---")
+    started = time.perf_counter()
+    done = {}
+    for job_result in iter_completed(jobs, per_host_limit=settings.GPT_CONCURRENCY):
+        if job_result.error is not None:
+            # Die anderen Chunks laufen weiter, damit nicht alle Ergebnisse verloren gehen.
+            print(f"❌ GPT {label}: Batch {job_result.key + 1} fehlgeschlagen: {job_result.error}")
+            continue
+        done[job_result.key] = job_result.result
+    print(f"--- 🧠 GPT {label}: {len(done)}/{len(chunks)} Batches in {time.perf_counter() - started:.1f}s ---")
+    return [done[index] for index in sorted(done)]
 
 def extract_json(text: str):
     # Hilfsfunktion bleibt für Notfälle, wird aber durch response_format seltener gebraucht
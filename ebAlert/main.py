@@ -1,61 +1,35 @@
 import sys
-import re
+from contextlib import contextmanager
+from functools import partial
 from random import randint
-from time import sleep
+from time import perf_counter, sleep
+from typing import Dict, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
 from ebAlert import create_logger
+from ebAlert.core.config import settings
+from ebAlert.core.fetch_engine import Job, host_of, iter_completed
+from ebAlert.core.http_client import http_client
+from ebAlert.core.pipeline import Candidate, Cost, FilterPipeline, Stage
+from ebAlert.core.ratelimit import limiter_for
+from ebAlert.core.rules import KEYWORD_LISTS, RuleSet, RulesWatcher, load_rules
+from ebAlert.core.scan_archive import append_records
+from ebAlert.core.scheduler import LinkScheduler
+from ebAlert.core.simhash import normalize_tokens, price_band, simhash
 from ebAlert.crud.base import crud_link, get_session
+from ebAlert.crud.fingerprint import crud_fingerprint
+from ebAlert.crud.rule_hits import crud_rule_hits
 from ebAlert.crud.post import crud_post
 from ebAlert.ebayscrapping import ebayclass
 from ebAlert.telegram.telegramclass import telegram
 from ebAlert.gpt_evaluator import generate_search_queries_batch, evaluate_listings_batch
-from ebAlert.ebayscrapping.ebay_market import get_ebay_median_price
+from ebAlert.ebayscrapping.ebay_market import FALLBACK_MEDIAN, format_price_stats, get_ebay_median_prices
+from ebAlert.ebayscrapping.ebay_token import token_manager
 from datetime import datetime, timedelta
 from ebAlert.models.sqlmodel import EbayPost  # Importiere dein Modell
 from ebAlert.ebayscrapping.seller_helper import fetch_seller_info
 
-WHITELIST = [
-    "5800x3d",
-    "5700x3d",
-    "3060",
-    "3090",
-    "4090",
-    "4060ti",
-    "4060 ti",
-    "4070 ti super",
-    "4070 super",
-    "4070 ti",
-    "4070ti",
-    "4080",
-    "4080 super",
-    "5080",
-    "5090",
-    "7900xtx",
-    "7900 xtx",
-    "7900xt",
-    "7900 xt",
-    "rx 6800",
-    "rx6800",
-    "a2000",
-    "a4000",
-    "a5000", 
-    "rtx 6000",
-    "blackwell"
-]
-P2_LIST = [
-    "s23",
-    "s24",
-    "s25",
-    "ipad a16",
-    "iphone 14 pro",
-    "iphone 15"
-]
-MINIMUM_SCORE = 60
-MINIMUM_MARGIN_EUR = 35
-MAX_ITEM_PRICE = 800
-MIN_ITEM_PRICE = 60
 NONE_PRICE = 50
 # ebay_median kommt aus der eBay Browse API und ist ein Angebotspreis (was Verkäufer
 # verlangen), kein bestätigter Verkaufspreis - eBay's Sold-Preis-API ist separat
@@ -67,413 +41,26 @@ NONE_PRICE = 50
 # Werte in der Praxis immer noch zu hoch wirkten). Kumulativ ca. -34% ggü. dem rohen
 # eBay-Median - bei weiteren Anpassungen im Blick behalten, nicht überkorrigieren.
 EBAY_ASKING_TO_SALE_FACTOR = 0.82 * 0.9 * 0.9  # = 0.6642
-SCORE_BOOSTERS = [
-    "ddr4 64gb",
-    "64gb ddr4",
-    "ddr5"
-]
-TITLE_BLACKLIST = [
-    "tausche",
-    "suche",
-    "nas",
-    "3060ti",
-    "3060 ti",
-    "rtx 2070",
-    "beschädigt",
-    "konvolut",
-    "nothing",
-    "a35",
-    "a40",
-    "1060",
-    "displayriss",
-    "telefonanlage",
-    "microsoft surface",
-    "altes telefon",
-    "amd phenom",
-    "sp connect",
-    "dma bundle",
-    "macintosh",
-    "fujitsu",
-    "z390",
-    "avm",
-    "ecc",
-    "blackberry",
-    "hp",
-    "vergessen",
-    "zte"
-]
-DESC_BLACKLIST = [
-    "ist zersprungen",
-    "bildschirm beschädigt",
-    "glas gesprungen",
-    "starke beschädigung",
-    "schwarzer fleck",
-    "feiner riss",
-    "ist beschädigt",
-    "muss getauscht werden",
-    "ist gesplittert",
-    "einen riss",
-    "ein riss",
-    "kamera beschädigt",
-    "rückseite defekt",
-    "haben risse",
-    "riss hinten",
-    "riss vorne",
-    "bruch auf",
-    "ist zersplittert",
-    "rechts gesprungen",
-    "minimalen riss",
-    "ausschließlich per banküberweisung",
-    "nur überweisung",
-    "dhl express",
-    "suche ein",
-    "kleinere sprünge",
-    "links gesprungen",
-    "paar risse",
-    "reparieren lassen",
-    "leider defekt",
-    "leider risse",
-    "kein original",
-    "nicht original",
-    "muss repariert werden",
-    "komplett zersprungen",
-    "helle streifen",
-    "rückseite ist defekt",
-    "leider sprünge",
-    "hinten beschädigt",
-    "vorne beschädigt",
-    "ladeanschluss beschädigt",
-    "kleiner defekt",
-    "bildschirmfleck",
-    "stark beschädigt",
-    "leider funktioniert",
-    "backcover beschädigt",
-    "rückseite beschädigt",
-    "hinten kaputt",
-    "deutlicher sprung",
-    "deutlich gesprungen",
-    "rückseite gesplittert",
-    "gerissen",
-    "bastler",
-    "funktioniert nicht",
-    "funktioniert leider nicht",
-    "riss auf der rückseite",
-    "stark gesprungen",
-    "einen riss",
-    "rückseite hat risse",
-    "ist gesprungen",
-    "einen glasschaden",
-    "gebrochen",
-    "displayriss",
-    "rückseite gesprungen",
-    "kleiner riss",
-    "kleiner sprung",
-    "hat defekte",
-    "mit riss",
-    "defekte rückseite",
-    "einige risse",
-    "einen sprung",
-    "pixelfehler",
-    "wackelkontakt",
-    "wasserschaden",
-    "haarriss",
-    "funktioniert leider",
-    "glas kaputt",
-    "leider beschädigt",
-    "leider gesprungen",
-    "deutliche schäden",
-    "glas beschädigt",
-    "deutliche gebrauchsspuren",
-    "starke gebrauchsspuren",
-    "bin auf der suche"
-]
-EXCLUDED_KEYWORDS = [
-    "ddr3",
-    "ddr2",
-    "thinclient",
-    "defektgerät",
-    "hp desktop",
-    "cubot",
-    "ulefone",
-    "mini-pc",
-    "acer nitro",
-    "tastentelefon",
-    "kinder smartphone",
-    "gerissen",
-    "core 2 duo",
-    "stark gebraucht",
-    "wasserschaden",
-    "grafikfehler",
-    "alienware",
-    "blackview",
-    "skyline",
-    "mifcom",
-    "schnurlos",
-    "ip-telefon",
-    "a13",
-    "glasschaden",
-    "jbl",
-    "wählscheibentelefon",
-    "zeichentablett",
-    "galaxy note",
-    "powerbank",
-    "commodore",
-    "externe festplatte",
-    "airfly",
-    "toner",
-    "gaming mikrofon",
-    "handyhalterung",
-    "gamesir",
-    "ideal of sweden",
-    "steelseries",
-    "tongenerator",
-    "so-dimm",
-    "docking-station",
-    "kartenlesegerät",
-    "sattelitentelefon",
-    "synology",
-    "xplora",
-    "unify",
-    "fritz fon",
-    "lightning dock",
-    "b150m",
-    "supermicro",
-    "gmktec",
-    "lga",
-    "radeon pro",
-    "hdd bay",
-    "mikrofon arm",
-    "elagto",
-    "fifine",
-    "servergehäuse",
-    "server mainboard",
-    "tablet tastatur",
-    "samsung young",
-    "gt630",
-    "traxxas",
-    "wildkamera",
-    "zeichenpad",
-    "artisan",
-    "monitor-halterung",
-    "monitor halterung",
-    "yamaha",
-    "mikrofonarm",
-    "realpower",
-    "floppy",
-    "mobistel",
-    "icue link",
-    "lumia",
-    "pencil",
-    "iphone 6",
-    "nexvoo",
-    "apple magic",
-    "speaker set",
-    "t-phone",
-    "systemtelefon",
-    "disketten",
-    "apple tv",
-    "doppelmonitorarm",
-    "chipkartenleser",
-    "opteron",
-    "sinclair",
-    "wileyfox",
-    "turbokarte",
-    "dvd",
-    "beyerdynamic",
-    "belkin",
-    "dogfish",
-    "elgato",
-    "valve",
-    "2020",
-    "hdmi kabel",
-    "atari",
-    "voodoo",
-    "decmate",
-    "samsung gt",
-    "scythe",
-    "trackir",
-    "tintenpatronen",
-    "tinte",
-    "egpu",
-    "sodimm",
-    "grafiktablet",
-    "brother",
-    "sicherheitsrelais",
-    "standfuß",
-    "beamer",
-    "tablet halterung",
-    "uleway",
-    "a36",
-    "emporia",
-    "creative",
-    "soundkarte",
-    "doogee",
-    "unihertz",
-    "t phone",
-    "hp thunderbolt",
-    "joystick",
-    "displayschaden",
-    "display schaden",
-    "fairphone",
-    "medion",
-    "rx560",
-    "rx570",
-    "rx580",
-    "galaxy tab",
-    "note 20",
-    "note 10",
-    "s22",
-    "s21",
-    "s10",
-    "s9",
-    "s7",
-    "s8",
-    "j5",
-    "j7",
-    "a7",
-    "sd-ram",
-    "sd ram",
-    "displayfehler",
-    "display-fehler",
-    "display fehler",
-    "funktioniert nicht",
-    "imac",
-    "oukitel",
-    "s20",
-    "macbook",
-    "phillips",
-    "senioren handy",
-    "kinderhandy",
-    "senioren",
-    "alcatel",
-    "retro",
-    "thrust",
-    "sound card",
-    "display beschädigt",
-    "webcam",
-    "gigaset",
-    "klapphandy",
-    "festnetz",
-    "yealink",
-    "htc",
-    "amd fx",
-    "monitorarm",
-    "a14",
-    "a17",
-    "mikrocontroller",
-    "j3",
-    "fritz!fon",
-    "gtx 760",
-    "gtx 970",
-    "gtx 1050",
-    "torras",
-    "bitbox",
-    "magnetkartenleser",
-    "gigastone",
-    "game capture",
-    "fritzfon",
-    "oldi",
-    "captian dma",
-    "oppo",
-    "ericsson",
-    "omen",
-    "mac book",
-    "moza",
-    "seniorenhandy",
-    "klapphandy",
-    "am2",
-    "am3",
-    "anrufbeantworter",
-    "brille",
-    "nokia",
-    "poco",
-    "sandisk",
-    "xcover",
-    "lenovo",
-    "displayschaden",
-    "telekom",
-    "aldi",
-    "pedale",
-    "siemens",
-    "wiko",
-    "headset",
-    "scanner",
-    "satelliten",
-    "bastler",
-    "fanatec",
-    "beelink",
-    "handycam",
-    "panasonic",
-    "xperia",
-    "thinkpad",
-    "ideapad",
-    "intel",
-    "i5",
-    "i7",
-    "i9",
-    "honor",
-    "xiaomi",
-    "realme",
-    "huawei",
-    "redmi",
-    "großhandel",
-    "raspberry",
-    "mini pc",
-    "motorola",
-    "iphone xs",
-    "iphone x",
-    "iphone xr",
-    "iphone 6",
-    "iphone 7",
-    "iphone 8",
-    "laptop",
-    "amplifier",
-    "pico",
-    "drucker",
-    "air pod",
-    "docking station",
-    "gesucht",
-    "lcd",
-    "oppo",
-    "ersatz",
-    "logitech",
-    "seat",
-    "racing",
-    "ally",
-    "handheld",
-    "buds",
-    "ladestation",
-    "lenkrad",
-    "stuhl",
-    "dockingstation",
-    "mobile",
-    "macbook",
-    "fernbedienung",
-    "ipad",
-    "ich suche",
-    "watch",
-    "a16",
-    "kein versand",
-    "airpods",
-    "huawei",
-    "notebook",
-    "pentium",
-    "defekt",
-    "athlon",
-    "ich tausch",
-    "wackelkontakt",
-    "2400",
-    "AM3",
-    "2133",
-    "gebrochen",
-    "gesprungen",
-    "gesplittert",
-    "kaputt",
-    "schrott"
-]
 
-# Vorbereitung: Wandle deine Liste einmalig in ein Set um (global)
-EXCLUDED_SET = set(word.lower() for word in EXCLUDED_KEYWORDS)
+# Keyword-Listen und Schwellwerte kommen aus der Regeldatei (siehe core/rules.py) und
+# werden im start-Loop zwischen zwei Scans neu geladen, wenn sich die Datei ändert.
+rules_watcher = RulesWatcher()
+
+
+def current_rules() -> RuleSet:
+    return rules_watcher.current
+
+
+@contextmanager
+def use_rules(rules: RuleSet):
+    """Für Replays: vorübergehend mit einem anderen Regelstand auswerten."""
+    previous = rules_watcher.current
+    rules_watcher.current = rules
+    try:
+        yield rules
+    finally:
+        rules_watcher.current = previous
+
 
 def delete_old_items(db: Session):
     """Löscht alle Anzeigen aus der Datenbank, die älter als 24 Stunden sind."""
@@ -512,31 +99,54 @@ def start():
     # Timer für den stündlichen Cleanup initialisieren
     last_cleanup = datetime.now() - timedelta(hours=1)
     last_status_sent = datetime.now() - timedelta(minutes=15)
+    scheduler = LinkScheduler()
+    consecutive_errors = 0
+    # eBay-Token im Hintergrund aktuell halten, damit keine Preisabfrage darauf wartet
+    if settings.EBAY_CLIENT_ID and settings.EBAY_CLIENT_SECRET:
+        token_manager.start_background()
 
     while True:
         try:
+            # Geänderte Regeldatei übernehmen - nur hier zwischen zwei Scans
+            rules_watcher.reload_if_changed()
             now = datetime.now()
             current_hour = now.hour
-            print(f"\n--- 🛰️ Scan gestartet: {now.strftime('%H:%M:%S')} ---")
-            
+            # Nachtmodus: 02:00 bis 07:00 Uhr
+            night_mode = 2 <= current_hour < 7
+            scanned = False
+
             with get_session() as db:
                 # 1. Stündlicher Cleanup
                 if now - last_cleanup > timedelta(minutes=60):
                     delete_old_items(db)
                     last_cleanup = now
-                
-                # 2. Die eigentliche Arbeit (Anzeigen holen)
-                get_all_post(db=db, telegram_message=True)
-            
+
+                link_ids = [link_model.id for link_model in crud_link.get_all(db) or []]
+                scheduler.sync(link_ids)
+                # Nachts alle Links gemeinsam, tagsüber nur die fälligen (siehe core/scheduler.py)
+                due_ids = link_ids if night_mode else scheduler.due()
+
+                if due_ids:
+                    print(f"\n--- 🛰️ Scan gestartet: {now.strftime('%H:%M:%S')} ({len(due_ids)}/{len(link_ids)} Links) ---")
+                    # 2. Die eigentliche Arbeit (Anzeigen holen)
+                    new_per_link = get_all_post(db=db, telegram_message=True, link_ids=due_ids)
+                    for link_id in due_ids:
+                        # Nachts keine Rate lernen, sonst startet der Morgen mit zu langen Intervallen
+                        scheduler.record(link_id, None if night_mode else new_per_link.get(link_id))
+                    scanned = True
+
+            if scanned:
+                print(http_client.format_stats())
+                print(format_price_stats())
+
             # 3. Dynamische Pausenzeit berechnen
-            # Nachtmodus: 02:00 bis 07:00 Uhr
-            if 2 <= current_hour < 7:
+            if night_mode:
                 # Lange Pause in der Nacht
                 wait_time = randint(1500, 3600)
                 mode_text = "🌙 Nachtmodus"
             else:
-                # Standard-Pause am Tag
-                wait_time = randint(45, 90)
+                # Tagsüber bis zum nächsten fälligen Link
+                wait_time = int(scheduler.seconds_until_next()) + 1
                 mode_text = "☀️ Tagmodus"
 
 
@@ -548,21 +158,28 @@ def start():
                status_text = f"🤖 **Bot-Status**\n" \
                              f"Letzter Scan: {datetime.now().strftime('%H:%M:%S')}\n" \
                              f"Nächster Scan: ca. {next_scan_time}\n" \
-                             f"Modus: {mode_text}"
+                             f"Modus: {mode_text}\n" \
+                             f"Intervalle:\n{scheduler.describe()}"
         
                telegram.send_message(status_text,disable_notfication=True) # Du müsstest eine send_message Methode haben
                last_status_sent = now
-                
-            print(f"--- ✅ Scan fertig ({mode_text}). Pause: {wait_time // 60}m {wait_time % 60}s ---")
+
+            consecutive_errors = 0
+            if scanned:
+                print(f"--- ✅ Scan fertig ({mode_text}). Pause: {wait_time // 60}m {wait_time % 60}s ---")
+                print(scheduler.describe())
             sleep(wait_time)
 
         except KeyboardInterrupt:
             print("\n<< Bot manuell beendet.")
             sys.exit(0)
         except Exception as e:
-            print(f"⚠️ Loop-Fehler: {e}")
-            # Bei Fehlern (z.B. Internet weg) 30 Sek warten und neu versuchen
-            sleep(30)
+            # Bei Fehlern (z.B. Internet weg) mit wachsender Pause neu versuchen -
+            # mindestens so lange, wie der Rate-Limiter kleinanzeigen.de ohnehin sperrt.
+            consecutive_errors += 1
+            error_wait = max(min(5 * 2 ** consecutive_errors, 300), limiter_for("kleinanzeigen.de").cooldown_remaining())
+            print(f"⚠️ Loop-Fehler: {e} - neuer Versuch in {error_wait:.0f}s")
+            sleep(error_wait)
 
 @cli.command(options_metavar="<options>", help="Add/Show/Remove URL from database.")
 @click.option("-r", "--remove_link", 'remove', metavar="<link id>", help="Remove link from database.")
@@ -630,92 +247,431 @@ def links(show, remove, clear, url, init, sync_urls):
             print("<< Database initialized")
 
 
-def get_all_post(db: Session, telegram_message=False):
-    links = crud_link.get_all(db=db)
-    if not links:
-        return
+@cli.command(name="rules", options_metavar="<options>", help="Show how often each filter rule matched.")
+@click.option("-u", "--unused", is_flag=True, help="Only show keyword rules that never matched.")
+@click.option("-t", "--trace", 'post_id', type=int, metavar="<ad id>", help="Show every recorded filter decision for an ad.")
+def rules_report(unused, post_id):
+    """
+    cli für die Regel-Statistik: Treffer pro Keyword/Stufe oder die Entscheidungen zu einer Anzeige
+    """
+    with get_session() as db:
+        if post_id:
+            print(f">> Decisions for ad {post_id}")
+            for entry in crud_rule_hits.trace(db, post_id):
+                print(f"{entry.date:%d.%m.%Y %H:%M}  {entry.rule_list:<18}{entry.keyword}")
+            print("<< Decisions")
+            return
+        print(">> Rule report")
+        rows = crud_rule_hits.report(db, current_rules())
+        never = [row for row in rows if row.occurrences and not row.hits]
+        for row in never if unused else rows:
+            last_hit = f"{row.last_hit:%d.%m.%Y %H:%M}" if row.last_hit else "-"
+            notes = []
+            if row.occurrences > 1:
+                notes.append(f"{row.occurrences}x in der Liste")
+            if not row.occurrences and row.rule_list in KEYWORD_LISTS:
+                notes.append("nicht mehr in der Regeldatei")
+            note = f"  ({', '.join(notes)})" if notes else ""
+            print(f"{row.rule_list:<18}{row.keyword:<30}{row.hits:>7}  {last_hit}{note}")
+        print(f"<< {len(never)} von {sum(1 for row in rows if row.occurrences)} Keyword-Regeln haben nie getroffen")
+
+
+@cli.command(options_metavar="<options>", help="Replay archived scans offline and show which alerts would change.")
+@click.option("-d", "--days", type=int, default=7, show_default=True, help="Replay the archive of the last <days> days.")
+@click.option("--rules", 'rules_file', metavar="<file>", help="Rules file to test (default: the active one).")
+@click.option("--factor", type=float, metavar="<factor>", help="EBAY_ASKING_TO_SALE_FACTOR to test.")
+def replay(days, rules_file, factor):
+    """
+    cli für den Backtest: alle archivierten Anzeigen ohne Netzwerk neu bewerten
+    """
+    from ebAlert.replay import print_diff, replay_archive
+    print(">> Replaying archived scans")
+    rules = load_rules(rules_file) if rules_file else current_rules()
+    result = replay_archive(days, rules, factor)
+    print_diff(result)
+    print("<< Replay finished")
+
+
+@cli.command(options_metavar="<options>", help="Sweep sale factor x minimum score x minimum margin over archived candidates.")
+@click.option("-d", "--days", type=int, default=30, show_default=True, help="Use the candidates of the last <days> days.")
+@click.option("--factors", metavar="<range>", default="0.55:0.75:0.01", show_default=True,
+              help="EBAY_ASKING_TO_SALE_FACTOR values as start:stop:step or comma list (the current one is always added).")
+@click.option("--scores", metavar="<range>", default="40:80:5", show_default=True, help="MINIMUM_SCORE values.")
+@click.option("--margins", metavar="<range>", default="20:60:5", show_default=True, help="MINIMUM_MARGIN_EUR values.")
+@click.option("--labels", 'labels_file', metavar="<file>", help="CSV with <ad id>,<1|0> (good/bad deal) for precision.")
+@click.option("--top", type=int, metavar="<n>", help="Only show the <n> most precise cells (needs labels).")
+@click.option("--rules", 'rules_file', metavar="<file>", help="Rules file for the score boosters (default: the active one).")
+def sweep(days, factors, scores, margins, labels_file, top, rules_file):
+    """
+    cli für den Parameter-Sweep: Alarmvolumen und Präzision je Kombination
+    """
+    from ebAlert.batch_score import parse_range, print_sweep, run_sweep
+    print(">> Sweeping archived candidates")
+    rules = load_rules(rules_file) if rules_file else current_rules()
+    started = perf_counter()
+    sale_factors = sorted({*parse_range(factors), EBAY_ASKING_TO_SALE_FACTOR})
+    batch, cells = run_sweep(days, rules, sale_factors, parse_range(scores), parse_range(margins), labels_file)
+    print_sweep(batch, cells, days, rules, top)
+    print(f"<< {len(cells)} Kombinationen in {perf_counter() - started:.2f}s")
+
+
+@cli.command(options_metavar="<options>", help="Compare the eBay price estimators on archived scans and cached samples.")
+@click.option("-d", "--days", type=int, default=30, show_default=True, help="Use the (query, price) pairs of the last <days> days.")
+@click.option("--show", type=int, default=10, show_default=True, metavar="<n>", help="Show the <n> largest differences.")
+def estimators(days, show):
+    """
+    cli zum Vergleich der Preisschätzer auf echten Stichproben
+    """
+    from ebAlert.core.scan_archive import iter_records
+    from ebAlert.ebayscrapping.ebay_market import compare_estimators
+    from ebAlert.ebayscrapping.price_estimators import print_comparison
+    print(">> Comparing price estimators")
+    missing, results = compare_estimators(iter_records(days))
+    print_comparison(results, missing, show)
+    print(f"<< Aktiv: {settings.PRICE_ESTIMATOR}")
+
+
+@cli.command(options_metavar="<options>", help="Show the recorded eBay price history per query with trend and volatility.")
+@click.argument("queries", nargs=-1, metavar="<query>")
+def history(queries):
+    """
+    cli für den Preisverlauf (ebayscrapping/price_history.py)
+    """
+    from ebAlert.ebayscrapping.ebay_market import cache_expiry, median_cache_key, price_history
+    keys = [median_cache_key(query) for query in queries] or price_history().queries()
+    if not keys:
+        print("Noch kein Preisverlauf aufgezeichnet.")
+    for key in keys:
+        series = price_history().series(key)
+        point = series.current()
+        if point is None:
+            print(f"{key}: kein Verlauf")
+            continue
+        trend = series.trend(settings.PRICE_TREND_DAYS)
+        volatility = series.volatility(settings.PRICE_VOLATILITY_DAYS)
+        print(f"{key}: {point.median}€ am {datetime.fromtimestamp(point.timestamp):%d.%m.%Y} ({len(series)} Punkte), "
+              f"Trend {f'{trend:+.2%}/Tag' if trend is not None else '-'}, "
+              f"Volatilität {f'{volatility:.1%}' if volatility is not None else '-'}, "
+              f"Cache-Laufzeit {cache_expiry(key) / 86400:.0f}d")
+
+
+# Laufende Crawl-Statistik pro Link-ID über alle Scans dieses Prozesses
+crawl_stats = {}
+
+
+def store_validators(db: Session, link_model, validators: dict):
+    link_model.etag = validators.get("etag")
+    link_model.last_modified = validators.get("last_modified")
+    link_model.fingerprint = validators.get("fingerprint")
+    db.commit()
+
+
+def collect_new_items(db: Session, links) -> Tuple[list, Dict[int, Optional[int]]]:
+    """Lädt alle Suchseiten gleichzeitig (siehe core/fetch_engine.py) und übernimmt die
+    Anzeigen jeder Seite in die DB, sobald sie ankommt. Gibt nur die wirklich NEUEN Items
+    zurück, dazu pro Link-ID die Anzahl neuer Items (None, wenn der Abruf fehlschlug)."""
+    link_by_id = {link_model.id: link_model for link_model in links}
+    known_ids = crud_post.get_known_ids(db)
+    jobs = [
+        Job(key=link_model.id,
+            func=partial(ebayclass.EbayItemFactory, link_model.link, watermark=link_model.last_seen_id,
+                         validators={"etag": link_model.etag, "last_modified": link_model.last_modified,
+                                     "fingerprint": link_model.fingerprint},
+                         known_ids=known_ids),
+            host=host_of(link_model.link),
+            timeout=settings.FETCH_TIMEOUT * settings.MAX_PAGES_PER_LINK)
+        for link_model in links
+    ]
 
     all_scraped_items = []
-
-    # SCHRITT 1: Sammeln aller neuen Items von allen Links
-    for link_model in links:
+    new_per_link = {}
+    for job_result in iter_completed(jobs):
+        link_model = link_by_id[job_result.key]
+        new_per_link[link_model.id] = None
+        if job_result.error:
+            print(f"❌ Fehler beim Scraping von Link {link_model.id}: {job_result.error}")
+            continue
         try:
-            print(f"Processing link - id: {link_model.id} - link: {link_model.link}")
-            post_factory = ebayclass.EbayItemFactory(link_model.link)
+            post_factory = job_result.result
+            stats = crawl_stats.setdefault(link_model.id, {"scans": 0, "pages": 0, "unchanged": 0, "early_stops": 0, "page_limit_hits": 0})
+            stats["scans"] += 1
+            stats["pages"] += post_factory.pages_fetched
+            if post_factory.unchanged:
+                # Seite unverändert seit dem letzten Scan: kein Parsen, keine DB-Abfragen
+                stats["unchanged"] += 1
+                store_validators(db, link_model, post_factory.validators)
+                new_per_link[link_model.id] = 0
+                print(f"Processing link - id: {link_model.id} - unverändert ({job_result.elapsed:.1f}s)")
+                continue
+            stats["early_stops"] += post_factory.stopped_early
+            stats["page_limit_hits"] += post_factory.hit_page_limit
+            print(f"Processing link - id: {link_model.id} - link: {link_model.link} "
+                  f"({len(post_factory.item_list)} neue / {post_factory.known_skipped} bekannte Anzeigen, "
+                  f"{post_factory.pages_fetched} Seite(n), "
+                  f"{'Wasserstand erreicht' if post_factory.stopped_early else 'kein Early-Stop'}, "
+                  f"{job_result.elapsed:.1f}s)")
+            if post_factory.hit_page_limit:
+                print(f"⚠️ Link {link_model.id}: Seitenlimit ({settings.MAX_PAGES_PER_LINK}) erreicht, "
+                      f"ohne auf bekannte Anzeigen zu stoßen - evtl. wurden Anzeigen verpasst.")
             # add_items_to_db gibt nur die wirklich NEUEN Items zurück
             new_items = crud_post.add_items_to_db(db=db, items=post_factory.item_list)
             if new_items:
                 all_scraped_items.extend(new_items)
+            new_per_link[link_model.id] = len(new_items)
+
+            if post_factory.complete:
+                max_id = post_factory.max_id
+                if max_id and max_id > (link_model.last_seen_id or 0):
+                    link_model.last_seen_id = max_id
+                # Validatoren erst nach erfolgreicher Übernahme und nur nach einem vollständigen
+                # Durchlauf speichern - sonst gilt Seite 1 beim nächsten Scan als "unverändert"
+                # und die fehlgeschlagenen Folgeseiten werden nie nachgeholt.
+                store_validators(db, link_model, post_factory.validators)
+            else:
+                print(f"⚠️ Link {link_model.id}: Folgeseite nicht geladen - Wasserstand und Validatoren "
+                      f"bleiben, der nächste Scan blättert erneut.")
+                db.commit()
         except Exception as e:
+            db.rollback()
             print(f"❌ Fehler beim Scraping von Link {link_model.id}: {e}")
 
-    if not telegram_message or not all_scraped_items:
+    for link_id, stats in sorted(crawl_stats.items()):
+        print(f"📄 Link {link_id}: {stats['pages']} Seiten in {stats['scans']} Scans, {stats['unchanged']}x unverändert, "
+              f"{stats['early_stops']} Early-Stops, {stats['page_limit_hits']}x Seitenlimit")
+    return all_scraped_items, new_per_link
+
+
+def get_all_post(db: Session, telegram_message=False, link_ids=None) -> Dict[int, Optional[int]]:
+    """Scannt alle Links (oder nur link_ids) und gibt pro Link-ID die Anzahl neuer Anzeigen zurück."""
+    links = crud_link.get_all(db=db)
+    if link_ids is not None:
+        links = [link_model for link_model in links if link_model.id in link_ids]
+    if not links:
+        return {}
+
+    # SCHRITT 1: Sammeln aller neuen Items von allen Links (parallel)
+    all_scraped_items, new_per_link = collect_new_items(db, links)
+
+    if telegram_message and all_scraped_items:
+        crud_fingerprint.load_index(db, exclude_verdicts=[f"drop:{stage}" for stage in SELLER_DEPENDENT_STAGES])
+        try:
+            evaluate_new_items(all_scraped_items)
+        finally:
+            crud_fingerprint.flush(db)
+            crud_rule_hits.flush(db)
+    return new_per_link
+
+
+# --- Stufen der Vorfilterung (Reihenfolge ergibt sich aus der Kostenklasse) ---
+
+def stage_title_blacklist(candidate: Candidate) -> bool:
+    item = candidate.item
+    hits = matched_excluded_title_keywords(item.title)
+    if hits:
+        candidate.ctx["rule_hits"] = ("title_blacklist", hits)
+        print(f"Backlist title Word! title: {item.title} - id: {item.id}→ Skip")
+        return False
+    return True
+
+
+def stage_whitelist(candidate: Candidate) -> bool:
+    # filtert nichts, merkt sich nur den Treffer für Preisprüfung und Sofort-Benachrichtigung
+    candidate.ctx["whitelist"] = list(current_rules().matcher.matches(candidate.item.title_lower, "whitelist"))
+    return True
+
+
+def stage_price_range(candidate: Candidate) -> bool:
+    p = item_offer_price(candidate.item)
+    if not p or p <= 0:
+        p = NONE_PRICE
+    elif not candidate.ctx["whitelist"]:
+        rules = current_rules()
+        if p > rules.max_item_price or p < rules.min_item_price:
+            return False
+    candidate.ctx["price"] = p
+    return True
+
+
+def stage_excluded_keywords(candidate: Candidate) -> bool:
+    hits = matched_excluded_keywords(candidate.item.title, candidate.item.description)
+    if hits:
+        candidate.ctx["rule_hits"] = ("excluded_keywords", hits)
+        return False
+    return True
+
+
+# Urteile dieser Stufen hängen am Verkäufer bzw. an einem Abruf der Detailseite - die
+# Repost-Erkennung kennt den Verkäufer noch nicht, also werden sie nicht wiederverwendet.
+SELLER_DEPENDENT_STAGES = frozenset({"seller_info", "private_seller", "seller_age"})
+# Kürzere Texte (z.B. nur "iPhone 13" ohne Beschreibung) sind zu unspezifisch - zwei
+# fremde Anzeigen hätten denselben Fingerprint.
+REPOST_MIN_TOKENS = 6
+
+
+def repost_text(item) -> str:
+    description = item.description if item.description != ebayclass.NO_DESCRIPTION else ""
+    return f"{item.title} {description or ''}"
+
+
+def stage_repost(candidate: Candidate) -> bool:
+    """Gelöscht und neu eingestellt? Dann gilt das Urteil der ursprünglichen Anzeige."""
+    item = candidate.item
+    text = repost_text(item)
+    if len(normalize_tokens(text)) < REPOST_MIN_TOKENS:
+        return True
+    fingerprint = simhash(text)
+    band = price_band(candidate.ctx["price"])
+    candidate.ctx["fingerprint"] = (fingerprint, band)
+    match = crud_fingerprint.find_repost(fingerprint, band)
+    if match:
+        original_id, verdict, distance = match
+        print(f"♻️ Repost von {original_id} ({verdict}, Abstand {distance}): {item.title} - id: {item.id} → Skip")
+        # Auch den Repost merken, damit die nächste Neueinstellung wieder erkannt wird
+        crud_fingerprint.remember(int(item.id), fingerprint, band, verdict)
+        return False
+    return True
+
+
+def remember_drop(candidate: Candidate):
+    """Merkt das Urteil einer verworfenen Anzeige für die Repost-Erkennung - nur wenn es
+    allein am Anzeigentext hängt, nie nach einem Fehler oder einer Verkäufer-Prüfung."""
+    if "fingerprint" not in candidate.ctx or candidate.failed:
+        return
+    if candidate.dropped_by == "repost" or candidate.dropped_by in SELLER_DEPENDENT_STAGES:
         return
+    crud_fingerprint.remember(int(candidate.item.id), *candidate.ctx["fingerprint"], f"drop:{candidate.dropped_by}")
+
+
+def remember_verdict(item, fingerprints: dict, verdict: str):
+    entry = fingerprints.get(str(item.id))
+    if entry:
+        crud_fingerprint.remember(int(item.id), entry[0], entry[1], verdict)
+
+
+def fetch_candidate_seller(candidate: Candidate):
+    return fetch_seller_info(candidate.item.link)
+
+
+def stage_seller_info(candidate: Candidate) -> bool:
+    item, seller_info = candidate.item, candidate.ctx["seller_info"]
+    if not seller_info:
+        print(f"Item - title: {item.title} - price: {candidate.ctx['price']} - id: {item.id} hat keine seller_info! → Skip")
+        return False
+    print(f"Processing Item - title: {item.title} - price: {candidate.ctx['price']} - id: {item.id} - Seller: {seller_info['seller_name']}, Sellertype: {seller_info['seller_type']}")
+    return True
+
+
+def stage_private_seller(candidate: Candidate) -> bool:
+    seller_info = candidate.ctx["seller_info"]
+    if seller_info["seller_type"] == "COMMERCIAL":
+        print(f"🔎 Überspringe gewerblichen Verkäufer: {seller_info['seller_name']}")
+        return False
+    return True
+
+
+def stage_seller_age(candidate: Candidate) -> bool:
+    # ❌ Neue Accounts rausfiltern
+    seller_info = candidate.ctx["seller_info"]
+    if seller_info["seller_age_days"] < 7:
+        print(f"⛔ Neuer Verkäufer ({seller_info['seller_name']}, "f"{seller_info['seller_age_days']} Tage) → Skip")
+        return False
+    return True
+
+
+def stage_description_blacklist(candidate: Candidate) -> bool:
+    item, seller_info = candidate.item, candidate.ctx["seller_info"]
+    hits = matched_excluded_desc_keywords(seller_info["description"])
+    if hits:
+        candidate.ctx["rule_hits"] = ("desc_blacklist", hits)
+        print(f"Backlist DESC Word! title: {item.title} - price: {candidate.ctx['price']} - id: {item.id} - description: {seller_info['description']} → Skip")
+        return False
+    return True
+
+
+PREFILTER_STAGES = [
+    Stage("title_blacklist", Cost.CPU, stage_title_blacklist),
+    Stage("whitelist", Cost.CPU, stage_whitelist),
+    Stage("price_range", Cost.CPU, stage_price_range, requires=("whitelist",)),
+    Stage("excluded_keywords", Cost.CPU, stage_excluded_keywords),
+    # letzte CPU-Stufe: braucht den Preis und läuft vor jedem Netzwerk-Abruf
+    Stage("repost", Cost.CPU, stage_repost, requires=("price_range", "excluded_keywords")),
+    Stage("seller_info", Cost.NETWORK, stage_seller_info, fetch=fetch_candidate_seller, requires=("repost",)),
+    Stage("private_seller", Cost.CPU, stage_private_seller, requires=("seller_info",)),
+    Stage("seller_age", Cost.CPU, stage_seller_age, requires=("seller_info",)),
+    Stage("description_blacklist", Cost.CPU, stage_description_blacklist, requires=("seller_info",)),
+]
+prefilter_pipeline = FilterPipeline(PREFILTER_STAGES)
+
+
+def evaluate_new_items(all_scraped_items: list):
+    """Schritte 2-6: Filter, Verkäufer-Check, GPT, eBay-Preis, Scoring und Telegram.
+    Alles, was dabei über die Anzeigen bekannt wird, landet anschließend im Scan-Archiv."""
+    trail = {
+        str(item.id): {"listing": item, "seller_info": None, "price": None, "query": None, "ebay_median": None,
+                       "gpt_flags": None, "verdict": "pending", "rules_version": current_rules().version,
+                       "sale_factor": EBAY_ASKING_TO_SALE_FACTOR}
+        for item in all_scraped_items
+    }
+    try:
+        _evaluate_new_items(all_scraped_items, trail)
+    finally:
+        if settings.SCAN_ARCHIVE:
+            try:
+                append_records(trail.values())
+            except Exception as e:
+                print(f"⚠️ Scan-Archiv nicht geschrieben: {e}")
+
+
+def _evaluate_new_items(all_scraped_items: list, trail: dict):
+    # Ein Regelstand für den ganzen Scan, auch wenn zwischendurch neu geladen wird
+    rules = current_rules()
+    # SCHRITT 2: Vorfilterung & Vorbereitung (Filter-Pipeline, billige Stufen zuerst)
+    survivors = prefilter_pipeline.run(all_scraped_items)
+    print(prefilter_pipeline.format_stats())
+
+    # Fingerprints für die Repost-Erkennung: Urteile werden pro Anzeige gemerkt, sobald sie feststehen
+    fingerprints = {str(c.item.id): c.ctx["fingerprint"] for c in survivors if "fingerprint" in c.ctx}
+    for candidate in survivors + prefilter_pipeline.dropped:
+        entry = trail[str(candidate.item.id)]
+        entry["seller_info"] = candidate.ctx.get("seller_info")
+        entry["price"] = candidate.ctx.get("price")
+        if candidate.dropped_by:
+            entry["verdict"] = f"drop:{candidate.dropped_by}"
+    for candidate in prefilter_pipeline.dropped:
+        remember_drop(candidate)
+        # Entscheidungsspur: welche Keywords bzw. welche Stufe die Anzeige verworfen hat
+        if "rule_hits" in candidate.ctx:
+            crud_rule_hits.record(candidate.item.id, *candidate.ctx["rule_hits"])
+        else:
+            crud_rule_hits.record(candidate.item.id, "stage", [candidate.dropped_by])
 
-    # SCHRITT 2: Vorfilterung & Vorbereitung (Python-Logik)
     potential_items = []
-    for item in all_scraped_items:
-        try: 
-            if contains_excluded_title_keywords(item.title):
-                print(f"Backlist title Word! title: {item.title} - id: {item.id}→ Skip")
-                continue 
-
-            title_lower = item.title.lower()
-            isWhitelistMatch =  [word for word in WHITELIST if word.lower() in title_lower]
-          
-            p = parse_price(item.price)
-            
-            if not p or p <= 0:
-                p = NONE_PRICE
-            elif not isWhitelistMatch:
-                if p > MAX_ITEM_PRICE:
-                    continue
-            
-                if p < MIN_ITEM_PRICE:
-                    continue
+    for candidate in survivors:
+        item, ctx = candidate.item, candidate.ctx
+        try:
+            seller_info = ctx["seller_info"]
+            p = ctx["price"]
+            item.seller_name = seller_info['seller_name']
+            item.seller_agedays = seller_info['seller_age_days']
             
-            if not contains_excluded_keywords(item.title, item.description):               
-                seller_info = fetch_seller_info(item.link)
-                sleep(0.3)
+            # --- WHITELIST CHECK (Sofort-Benachrichtigung) ---
+            if ctx["whitelist"]:
+                telegram.send_formated_message(item, is_whitelist=True)           
+                remember_verdict(item, fingerprints, "whitelist")
+                crud_rule_hits.record(item.id, "whitelist", ctx["whitelist"])
+                trail[str(item.id)]["verdict"] = "whitelist"
+                # Wichtig: Mit 'continue' springen wir zum nächsten Artikel in der Schleife.
+                # So wird für diesen Artikel kein eBay-Preis gesucht und kein GPT genutzt.
+                continue
 
-                if not seller_info:
-                    print(f"Item - title: {item.title} - price: {p} - id: {item.id} hat keine seller_info! → Skip")
-                    continue
-                
-                print(f"Processing Item - title: {item.title} - price: {p} - id: {item.id} - Seller: {seller_info['seller_name']}, Sellertype: {seller_info['seller_type']}")
-                # Verkäufer-Typ prüfen
-                if seller_info["seller_type"] == "COMMERCIAL":
-                    print(f"🔎 Überspringe gewerblichen Verkäufer: {seller_info['seller_name']}")
-                    continue
-                
-                # ❌ Neue Accounts rausfiltern
-                if seller_info["seller_age_days"] < 7:
-                    print(f"⛔ Neuer Verkäufer ({seller_info['seller_name']}, "f"{seller_info['seller_age_days']} Tage) → Skip")
-                    continue
-
-                if contains_excluded_desc_keywords(seller_info["description"]):
-                    # Hier: 'description' statt "description"
-                    print(f"Backlist DESC Word! title: {item.title} - price: {p} - id: {item.id} - description: {seller_info['description']} → Skip")
-                    continue
-
-                item.seller_name = seller_info['seller_name']
-                item.seller_agedays = seller_info['seller_age_days']
-                
-                # --- WHITELIST CHECK (Sofort-Benachrichtigung) ---
-                if isWhitelistMatch:
-                    telegram.send_formated_message(item, is_whitelist=True)           
-                    # Wichtig: Mit 'continue' springen wir zum nächsten Artikel in der Schleife.
-                    # So wird für diesen Artikel kein eBay-Preis gesucht und kein GPT genutzt.
-                    continue
-
-                potential_items.append({"id": item.id, "title": item.title, "item": item, "price": p, "seller_name": seller_info['seller_name'], "seller_agedays": seller_info['seller_age_days'], "date": item.date.strftime("%d.%m.%Y %H:%M") if hasattr(item.date, 'strftime') else str(item.date)})
+            potential_items.append({"id": item.id, "title": item.title, "item": item, "price": p, "seller_name": seller_info['seller_name'], "seller_agedays": seller_info['seller_age_days'], "date": item.date.strftime("%d.%m.%Y %H:%M") if hasattr(item.date, 'strftime') else str(item.date)})
         except Exception as e:
             print(f"⚠️ Fehler bei Vorfilterung Item {item.id}: {e}")
             
     if not potential_items:
         return
 
-    # SCHRITT 3: Batch-Generierung der Suchbegriffe (1 GPT Call für alle)
+    # SCHRITT 3: Batch-Generierung der Suchbegriffe (parallele GPT-Chunks, nur ungecachte Titel)
     clean_queries = []
     try:
         clean_queries = generate_search_queries_batch(potential_items)
@@ -737,19 +693,32 @@ def get_all_post(db: Session, telegram_message=False):
     # SCHRITT 4: Median-Preise & GPT-Vorbereitung
     batch_for_gpt = []
     item_map = {}  # Um später schnell auf das Item-Objekt per ID zuzugreifen
+    potential_by_id = {str(x['id']): x for x in potential_items}
+
+    # Alle Preise auf einmal: gleiche Queries nur einmal, verschiedene parallel
+    medians = {}
+    try:
+        medians = get_ebay_median_prices(
+            (q_data['query'], potential_by_id[str(q_data['id'])]['price'])
+            for q_data in clean_queries if str(q_data['id']) in potential_by_id)
+    except Exception as e:
+        print(f"❌ Fehler bei Batch-Preisabfrage: {e}")
    
     for q_data in clean_queries:
         try:
-            item_id = q_data['id']
+            item_id = str(q_data['id'])
             # Finde das originale Item-Objekt
-            orig = next((x for x in potential_items if str(x['id']) == item_id), None)
+            orig = potential_by_id.get(item_id)
             if not orig: continue
         
             cleaned_query = q_data['query']
-            m_price = get_ebay_median_price(cleaned_query, orig['price'])
+            m_price = medians.get((cleaned_query, orig['price']))
+            # Ins Archiv kommt nur ein echter Marktwert - sonst hielte replay den
+            # Fallback später für einen Median und erfände Alarme bzw. verlöre welche.
+            archived_median = m_price or None
         
             if not m_price:
-                m_price = 1000
+                m_price = FALLBACK_MEDIAN
             
             batch_for_gpt.append({
                 "id": item_id,
@@ -759,11 +728,12 @@ def get_all_post(db: Session, telegram_message=False):
                 "description": (orig['item'].description or "")[:400]
             })
             
+            trail[item_id].update(query=cleaned_query, ebay_median=archived_median)
             item_map[item_id] = {"obj": orig['item'], "m_price": m_price, "price": orig['price'], "date": orig['date'], "cleanedquery": cleaned_query, "seller_name": orig['seller_name'], "seller_agedays": orig['seller_agedays']}
         except Exception as e:
             print(f"⚠️ Fehler bei Median-Check für {q_data.get('id')}: {e}")
     
-    # SCHRITT 5: Großes Batch-Scoring (1 GPT Call für alle Items)
+    # SCHRITT 5: Batch-Scoring (parallele GPT-Chunks für alle Items)
     results = []
     try:
         results = evaluate_listings_batch(batch_for_gpt)
@@ -800,7 +770,8 @@ def get_all_post(db: Session, telegram_message=False):
                 continue
         
             info = item_map[rid]
-            itemPrice = parse_price(info['obj'].price)
+            trail[rid]["gpt_flags"] = res
+            itemPrice = item_offer_price(info['obj'])
             ebayMedianPrice = info['m_price']
                 
             expected_margin, score = calculate_score(
@@ -820,22 +791,17 @@ def get_all_post(db: Session, telegram_message=False):
             f"flags={res}"
             )
             
-            # Standardmäßig überspringen, außer ein Kriterium passt
-            skipItem = True
-            
-            # Kriterium 1: Margin passt
-            if expected_margin is not None and expected_margin >= MINIMUM_MARGIN_EUR:
-                skipItem = False
-        
-            # Kriterium 2: Score passt
-            if skipItem and score >= MINIMUM_SCORE:
-                skipItem = False 
-            
-            # Sicherheits-Check gegen KI-Fehler (Price > Median trotz hohem Score)
-            if score == 0:
-                skipItem = True
-            
+            skipItem = not is_alert(expected_margin, score, rules)
+            trail[rid]["verdict"] = "no_deal" if skipItem else "alert"
+
+            boosters = rules.matcher.matches(info['obj'].title_lower, "score_boosters") + \
+                rules.matcher.matches((info['obj'].description or "").lower(), "score_boosters")
+            if boosters:
+                crud_rule_hits.record(rid, "score_boosters", dict.fromkeys(boosters))
+
             if skipItem:
+                remember_verdict(info['obj'], fingerprints, "no_deal")
+                crud_rule_hits.record(rid, "decision", ["no_deal"])
                 continue
                 
             # Wir reichern das Dictionary mit den GPT-Ergebnissen an
@@ -843,12 +809,14 @@ def get_all_post(db: Session, telegram_message=False):
             info['margin_eur'] = expected_margin
             # ÜBERGABE DES GANZEN DICTS STATT NUR info["obj"]
             telegram.send_formated_message(info)
-            P2_Match =  [word for word in P2_LIST if word.lower() in info['obj'].title.lower()]
+            remember_verdict(info['obj'], fingerprints, "alert")
+            crud_rule_hits.record(rid, "decision", ["alert"])
+            P2_Match = rules.matcher.matches(info['obj'].title_lower, "p2")
             if P2_Match:
+                crud_rule_hits.record(rid, "p2", P2_Match)
                 telegram.send_formated_message_p2(info)   
                 
             #telegram.send_formated_message(info["obj"])
-            sleep(randint(0, 30) / 10)
         except Exception as e:
             print(f"⚠️ Fehler bei finaler Verarbeitung von Item {res.get('id')}: {e}")
 
@@ -856,33 +824,36 @@ if __name__ == "__main__":
     cli(sys.argv[1:])
 
 def parse_price(raw_price) -> float | None:
-    if not raw_price:
-        return NONE_PRICE
-
-    text = str(raw_price).lower()
-
-    # Zu verschenken / VB ohne Zahl
-    if "verschenk" in text or text.strip() in ["vb", "verhandlungsbasis"]:
-        return NONE_PRICE
+    price = ebayclass.parse_price_value(raw_price)
+    return NONE_PRICE if price is None else price
 
-    # Zahl extrahieren
-    match = re.search(r"(\d{1,3}(?:[.,]\d{3})*(?:[.,]\d+)?)", text)
-    if not match:
-        return NONE_PRICE
 
-    number = match.group(1)
+def item_offer_price(item: ebayclass.ListingRecord) -> float:
+    # gleiche Semantik wie parse_price(item.price), nur ohne erneutes Parsen
+    return NONE_PRICE if item.price_value is None else item.price_value
 
-    # Tausenderpunkte entfernen
-    number = number.replace(".", "").replace(",", ".")
-
-    try:
-        return float(number)
-    except:
-        return NONE_PRICE
 
+def is_alert(expected_margin, score, rules: RuleSet) -> bool:
+    # Standardmäßig überspringen, außer ein Kriterium passt
+    skipItem = True
+    
+    # Kriterium 1: Margin passt
+    if expected_margin is not None and expected_margin >= rules.minimum_margin_eur:
+        skipItem = False
 
-def calculate_score(itemTitle, itemDescription, offer_price, ebay_median, gpt_flags):
-    net_sale = ebay_median * EBAY_ASKING_TO_SALE_FACTOR
+    # Kriterium 2: Score passt
+    if skipItem and score >= rules.minimum_score:
+        skipItem = False 
+    
+    # Sicherheits-Check gegen KI-Fehler (Price > Median trotz hohem Score)
+    if score == 0:
+        skipItem = True
+    return not skipItem
+
+def calculate_score(itemTitle, itemDescription, offer_price, ebay_median, gpt_flags, sale_factor=None):
+    if sale_factor is None:
+        sale_factor = EBAY_ASKING_TO_SALE_FACTOR
+    net_sale = ebay_median * sale_factor
     target_buy = offer_price * 0.88
     margin_eur = net_sale - target_buy
     margin_pct = margin_eur / target_buy if target_buy else -1
@@ -898,7 +869,8 @@ def calculate_score(itemTitle, itemDescription, offer_price, ebay_median, gpt_fl
     # Score boosters-
     title_lower = (itemTitle or "").lower()
     description_lower = (itemDescription or "").lower()
-    if ([word for word in SCORE_BOOSTERS if word.lower() in title_lower] or [word for word in SCORE_BOOSTERS if word.lower() in description_lower]):
+    matcher = current_rules().matcher
+    if matcher.matches(title_lower, "score_boosters") or matcher.matches(description_lower, "score_boosters"):
         score += 30
 
     score = max(0, min(100, int(score)))
@@ -914,24 +886,24 @@ def estimate_negotiated_price(price, negotiability):
 def margin_percent(buy_price, sell_price):
     return (sell_price - buy_price) / buy_price
 
-def contains_excluded_keywords_test(title, description=""):
-    # Text in Wörter zerlegen (Satzzeichen entfernen)
+def matched_excluded_keywords(title, description=""):
     text = f"{title} {description}".lower()
-    # Entfernt Sonderzeichen, um nur reine Wörter zu haben
-    words_in_text = set(re.findall(r'\w+', text))
-    
-    # Prüfe, ob es eine Überschneidung gibt
-    return not EXCLUDED_SET.isdisjoint(words_in_text)
+    return current_rules().matcher.matches(text, "excluded_keywords")
+
+def matched_excluded_title_keywords(title):
+    text = f"{title}".lower()
+    return current_rules().matcher.matches(text, "title_blacklist")
+
+def matched_excluded_desc_keywords(desc):
+    text = f"{desc}".lower()
+    return current_rules().matcher.matches(text, "desc_blacklist")
 
 def contains_excluded_keywords(title, description=""):
-    text = f"{title} {description}".lower()
-    return any(word in text for word in EXCLUDED_KEYWORDS)
+    return bool(matched_excluded_keywords(title, description))
 
 def contains_excluded_title_keywords(title):
-    text = f"{title}".lower()
-    return any(word in text for word in TITLE_BLACKLIST)
+    return bool(matched_excluded_title_keywords(title))
 
 def contains_excluded_desc_keywords(desc):
-    text = f"{desc}".lower()
-    return any(word in text for word in DESC_BLACKLIST)
+    return bool(matched_excluded_desc_keywords(desc))
 
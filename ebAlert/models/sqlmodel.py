@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, inspect, text
 from sqlalchemy.sql import func
 
 from ebAlert import create_logger
@@ -23,6 +23,63 @@ class EbayLink(Base):
 
     id = Column(Integer, primary_key=True)
     link = Column(String)
+    # Höchste bereits gesehene Anzeigen-ID ("Wasserstand") fürs Weiterblättern
+    last_seen_id = Column(Integer)
+    # Validatoren der ersten Ergebnisseite für bedingte Requests / Fingerprint-Vergleich
+    etag = Column(String)
+    last_modified = Column(String)
+    fingerprint = Column(String)
+
+
+class ListingFingerprint(Base):
+    __tablename__ = "listing_fingerprint"
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, index=True)
+    # SimHash über Titel + Beschreibung (vorzeichenbehaftet gespeichert, siehe core/simhash.py)
+    fingerprint = Column(Integer)
+    price_band = Column(Integer)
+    # Ergebnis der Bewertung: "alert", "whitelist", "no_deal" oder "drop:<Filterstufe>"
+    verdict = Column(String)
+    date = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RuleHit(Base):
+    """Aufsummierte Treffer pro Regel - eine Zeile pro (Liste, Keyword)."""
+    __tablename__ = "rule_hit"
+
+    id = Column(Integer, primary_key=True)
+    rule_list = Column(String, index=True)
+    keyword = Column(String)
+    hits = Column(Integer, default=0)
+    last_hit = Column(DateTime)
+
+
+class DecisionTrace(Base):
+    """Welche Regel hat was mit welcher Anzeige gemacht (rollierend, siehe DECISION_TRACE_DAYS)."""
+    __tablename__ = "decision_trace"
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, index=True)
+    rule_list = Column(String)
+    keyword = Column(String)
+    date = Column(DateTime(timezone=True), server_default=func.now())
+
+
+def add_missing_columns():
+    """create_all legt nur fehlende Tabellen an, aber keine neuen Spalten in bereits
+    bestehenden - die werden hier für vorhandene Datenbankdateien nachgezogen."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                log.info(f"Adding column {table.name}.{column.name}")
+                with engine.begin() as connection:
+                    connection.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    ))
 
 
 Base.metadata.create_all(engine)
+add_missing_columns()
@@ -0,0 +1,117 @@
+"""
+Offline-Replay der archivierten Scans (siehe core/scan_archive.py): dieselben Filterstufen,
+dieselbe Score-Berechnung und dieselbe Alarm-Entscheidung wie im Live-Betrieb, aber mit
+den archivierten Verkäuferdaten, eBay-Medianen und GPT-Flags statt Netzwerk-Abrufen.
+Anzeigen, für die das Archiv nicht genug Daten hat (z.B. damals schon vor dem Abruf der
+Detailseite verworfen, jetzt aber durchgelassen), werden als "unknown" gezählt.
+"""
+import io
+import time
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional
+
+from ebAlert.core.pipeline import Candidate, FilterPipeline, Stage
+from ebAlert.core.rules import RuleSet
+from ebAlert.core.scan_archive import iter_records, listing_from_dict, seller_info_from_dict
+from ebAlert.main import PREFILTER_STAGES, calculate_score, is_alert, item_offer_price, use_rules
+
+ALERT_VERDICTS = ("alert", "whitelist")
+
+
+@dataclass
+class ReplayResult:
+    items: int = 0
+    seconds: float = 0.0
+    # (Archiv-Eintrag, altes Urteil, neues Urteil)
+    new_alerts: List[tuple] = field(default_factory=list)
+    lost_alerts: List[tuple] = field(default_factory=list)
+    unknown: int = 0
+    verdicts: Dict[str, int] = field(default_factory=dict)
+
+
+def replay_stages(records: Dict[str, dict]) -> List[Stage]:
+    """Die Live-Stufen, nur ohne Netzwerk: Verkäuferdaten kommen aus dem Archiv und die
+    Repost-Erkennung ist aus, weil ihr Index vom damaligen Zeitpunkt abhängt."""
+    def archived_seller_info(check):
+        def stage(candidate: Candidate) -> bool:
+            seller_info = records[str(candidate.item.id)].get("seller_info")
+            if seller_info is None:
+                candidate.ctx["unknown"] = True
+                return False
+            candidate.ctx["seller_info"] = seller_info_from_dict(seller_info)
+            return check(candidate)
+        return stage
+
+    stages = []
+    for stage in PREFILTER_STAGES:
+        if stage.name == "repost":
+            stage = replace(stage, check=lambda candidate: True)
+        elif stage.fetch is not None:
+            stage = replace(stage, check=archived_seller_info(stage.check), fetch=None)
+        stages.append(stage)
+    return stages
+
+
+def replay_records(records: Iterable[dict], rules: RuleSet, sale_factor: Optional[float] = None) -> ReplayResult:
+    started = time.perf_counter()
+    by_id = {str(record["listing"]["id"]): record for record in records}
+    items = [listing_from_dict(record["listing"]) for record in by_id.values()]
+    result = ReplayResult(items=len(items))
+
+    pipeline = FilterPipeline(replay_stages(by_id))
+    verdicts = {}
+    # Die Stufen schreiben wie im Live-Betrieb ihre Meldungen - beim Replay nur Rauschen
+    with use_rules(rules), redirect_stdout(io.StringIO()):
+        survivors = pipeline.run(items)
+        for candidate in pipeline.dropped:
+            verdicts[str(candidate.item.id)] = "unknown" if candidate.ctx.get("unknown") \
+                else f"drop:{candidate.dropped_by}"
+        for candidate in survivors:
+            item_id = str(candidate.item.id)
+            if candidate.ctx["whitelist"]:
+                verdicts[item_id] = "whitelist"
+                continue
+            record = by_id[item_id]
+            if record.get("ebay_median") is None or record.get("gpt_flags") is None:
+                verdicts[item_id] = "unknown"
+                continue
+            expected_margin, score = calculate_score(
+                itemTitle=candidate.item.title,
+                itemDescription=candidate.item.description,
+                offer_price=item_offer_price(candidate.item),
+                ebay_median=record["ebay_median"],
+                gpt_flags=record["gpt_flags"],
+                sale_factor=sale_factor,
+            )
+            verdicts[item_id] = "alert" if is_alert(expected_margin, score, rules) else "no_deal"
+
+    for item_id, verdict in verdicts.items():
+        record = by_id[item_id]
+        recorded = record.get("verdict")
+        result.verdicts[verdict] = result.verdicts.get(verdict, 0) + 1
+        if verdict == "unknown":
+            result.unknown += 1
+        elif verdict in ALERT_VERDICTS and recorded not in ALERT_VERDICTS:
+            result.new_alerts.append((record, recorded, verdict))
+        elif verdict not in ALERT_VERDICTS and recorded in ALERT_VERDICTS:
+            result.lost_alerts.append((record, recorded, verdict))
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def replay_archive(days: int, rules: RuleSet, sale_factor: Optional[float] = None) -> ReplayResult:
+    return replay_records(iter_records(days), rules, sale_factor)
+
+
+def print_diff(result: ReplayResult):
+    rate = result.items / result.seconds if result.seconds else 0
+    print(f"{result.items} Anzeigen in {result.seconds:.2f}s ({rate:.0f}/s) neu bewertet")
+    print("Urteile: " + ", ".join(f"{verdict}={count}" for verdict, count in sorted(result.verdicts.items())))
+    for title, entries in (("Neue Alarme", result.new_alerts), ("Entfallene Alarme", result.lost_alerts)):
+        print(f"{title}: {len(entries)}")
+        for record, recorded, verdict in entries:
+            listing = record["listing"]
+            print(f"  {listing['id']:<12}{str(listing.get('price')):<12}{recorded} -> {verdict}  {listing['title']}")
+    if result.unknown:
+        print(f"{result.unknown} Anzeigen ohne ausreichende Archivdaten (damals früher verworfen)")
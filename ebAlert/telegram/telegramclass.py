@@ -5,24 +5,17 @@ import html
 from ebAlert.core.config import settings
 from ebAlert.ebayscrapping.ebayclass import EbayItem
 from urllib.parse import quote
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from ebAlert.core.fetch_engine import host_of
+from ebAlert.core.http_client import http_client
+from ebAlert.core.ratelimit import limiter_for
 import time
 
 class SendingClass:
 
     def __init__(self):      
-        # Session erstellen (Hält die Verbindung zum Server offen)
-        self.session = requests.Session()
-        
-        # Retry-Strategie: Wenn der Server gar nicht antwortet oder schluckauf hat
-        retries = Retry(
-            total=5,                          # Insgesamt 5 Versuche
-            backoff_factor=1,                 # Wartezeit zwischen Versuchen: 1s, 2s, 4s...
-            status_forcelist=[429, 500, 502, 503, 504], # Bei diesen Fehlern wiederholen
-            raise_on_status=False
-        )
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        # Gemeinsamer HTTP-Client (hält die Verbindung zum Server offen, Retries bei
+        # Verbindungsfehlern, Rate-Limiter für api.telegram.org) - siehe core/http_client.py
+        self.http = http_client
         
     def send_message(self, message, buttons=None, disable_notfication=False, is_whitelistChat=False):
         """
@@ -56,26 +49,7 @@ class SendingClass:
                 "inline_keyboard": [buttons]
             })
 
-        for attempt in range(3): # Zusätzliche manuelle Schleife für Timeouts
-            try:
-                # Timeout ist entscheidend: 5s für Connect, 15s für Datentransfer
-                response = self.session.post(url, data=payload, timeout=(5, 15))
-                
-                if response.status_code == 200:
-                    return response.json()
-                
-                if response.status_code == 429:
-                    # Telegram sagt "zu schnell" -> Wartezeit aus der Antwort lesen
-                    retry_after = response.json().get("parameters", {}).get("retry_after", 5)
-                    print(f"⚠️ Rate Limit! Warte {retry_after}s...")
-                    time.sleep(retry_after)
-                    continue
-
-                print(f"❌ Fehler {response.status_code}: {response.text}")
-            
-            except requests.exceptions.RequestException as e:
-                print(f"🔔 Verbindungsversuch {attempt + 1} fehlgeschlagen: {e}")
-                time.sleep(2) # Kurze Pause vor dem nächsten Versuch
+        return self._post_message(url, payload)
 
 
     def send_message_p2(self, message, buttons=None, disable_notfication=False, is_whitelistChat=False):
@@ -110,19 +84,32 @@ class SendingClass:
                 "inline_keyboard": [buttons]
             })
 
-        for attempt in range(3): # Zusätzliche manuelle Schleife für Timeouts
+        return self._post_message(url, payload)
+    
+    def _post_message(self, url, payload):
+        """
+        POST an die Bot-API mit bis zu drei Versuchen. Der HTTP-Client wiederholt weder
+        POSTs nach Lese-Timeouts noch 429 - das passiert hier. Die Wartezeit bei 429
+        übernimmt der Rate-Limiter: retry_after aus der Antwort sperrt ihn, der nächste
+        Versuch wartet dann in http_client.post().
+        """
+        for attempt in range(3):
             try:
                 # Timeout ist entscheidend: 5s für Connect, 15s für Datentransfer
-                response = self.session.post(url, data=payload, timeout=(5, 15))
+                response = self.http.post(url, data=payload, timeout=(5, 15))
                 
                 if response.status_code == 200:
                     return response.json()
                 
                 if response.status_code == 429:
-                    # Telegram sagt "zu schnell" -> Wartezeit aus der Antwort lesen
+                    # Telegram sagt "zu schnell" -> Wartezeit aus der Antwort an den Limiter
                     retry_after = response.json().get("parameters", {}).get("retry_after", 5)
-                    print(f"⚠️ Rate Limit! Warte {retry_after}s...")
-                    time.sleep(retry_after)
+                    print(f"⚠️ Rate Limit! Nächster Versuch in {retry_after}s...")
+                    limiter = limiter_for(host_of(url))
+                    if limiter:
+                        limiter.hold(retry_after)
+                    else:
+                        time.sleep(retry_after)
                     continue
 
                 print(f"❌ Fehler {response.status_code}: {response.text}")
@@ -130,7 +117,7 @@ class SendingClass:
             except requests.exceptions.RequestException as e:
                 print(f"🔔 Verbindungsversuch {attempt + 1} fehlgeschlagen: {e}")
                 time.sleep(2) # Kurze Pause vor dem nächsten Versuch
-    
+
     def send_formated_message(self, item_data, is_whitelist=False):
         # FALL A: Das angereicherte Paket (Dictionary)
         if isinstance(item_data, dict) and "obj" in item_data:
@@ -170,13 +157,14 @@ class SendingClass:
             message += f" (Ebay: ~{m_price}€)"
 
         # Den Verkäufernamen sicher machen
-        raw_seller = getattr(item, 'seller_name', 'Nicht verfügbar')
+        raw_seller = getattr(item, 'seller_name', None) or 'Nicht verfügbar'
         safe_seller = html.escape(str(raw_seller))
                 
         message += f"\n📍 Ort: {item.city}\n"
         message += f"---------------------------\n"
         message += f"🛍️ <b>Verkäufer: {safe_seller}</b>\n"
-        message += f"📅 <b>Aktiv seit: {getattr(item, 'seller_agedays', 'Nicht verfügbar')} Tagen</b>\n"
+        seller_agedays = getattr(item, 'seller_agedays', None)
+        message += f"📅 <b>Aktiv seit: {seller_agedays if seller_agedays is not None else 'Nicht verfügbar'} Tagen</b>\n"
         
         if score is not None:
             message += (
@@ -248,13 +236,14 @@ class SendingClass:
             message += f" (Ebay: ~{m_price}€)"
 
         # Den Verkäufernamen sicher machen
-        raw_seller = getattr(item, 'seller_name', 'Nicht verfügbar')
+        raw_seller = getattr(item, 'seller_name', None) or 'Nicht verfügbar'
         safe_seller = html.escape(str(raw_seller))
                 
         message += f"\n📍 Ort: {item.city}\n"
         message += f"---------------------------\n"
         message += f"🛍️ <b>Verkäufer: {safe_seller}</b>\n"
-        message += f"📅 <b>Aktiv seit: {getattr(item, 'seller_agedays', 'Nicht verfügbar')} Tagen</b>\n"
+        seller_agedays = getattr(item, 'seller_agedays', None)
+        message += f"📅 <b>Aktiv seit: {seller_agedays if seller_agedays is not None else 'Nicht verfügbar'} Tagen</b>\n"
         
         if score is not None:
             message += (
@@ -292,7 +281,7 @@ class SendingClass:
             "disable_web_page_preview": True
         }
         try:
-            response = self.session.post(url, data=payload, timeout=(5, 10))
+            response = self.http.post(url, data=payload, timeout=(5, 10))
             return response.json()
         except Exception as e:
             print(f"⚠️ Fehler beim Editieren der Status-Nachricht: {e}")
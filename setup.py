@@ -4,12 +4,18 @@ setup(
     name='ebayAlert',
     version='1.5',
     packages=find_packages(),
+    package_data={'ebAlert': ['rules.toml']},
+    python_requires='>=3.11',
     install_requires=[
         'click>=7.1',
         'requests>=2.31',
         'bs4>=0.0.1',
         'sqlalchemy>=1.4',
-        'urllib3>=2.2.0'
+        'urllib3>=2.2.0',
+        'lxml>=4.9',
+        'brotli>=1.0',
+        'numpy>=1.24',
+        'openai>=1.0'
     ],
     entry_points={'console_scripts': 'ebAlert=ebAlert.main:cli'}
 )
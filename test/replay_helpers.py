@@ -0,0 +1,27 @@
+"""Gemeinsame Testdaten für die Archiv-Tests (test_replay, test_batch_score)."""
+from dataclasses import replace
+from datetime import datetime
+
+from ebAlert.core.keyword_matcher import KeywordMatcher
+from ebAlert.core.rules import KEYWORD_LISTS
+from ebAlert.ebayscrapping.ebayclass import ListingRecord
+
+SELLER = {"seller_name": "Max", "seller_type": "PRIVATE", "active_since": datetime(2019, 2, 3),
+          "seller_age_days": 2000, "description": "Top Zustand"}
+FLAGS = {"bundle": False, "obsolete": False, "accessory_only": False, "liquidity": "medium"}
+
+
+def make_record(item_id, title, price, verdict, seller_info=SELLER, ebay_median=None, gpt_flags=None):
+    listing = ListingRecord(id=item_id, link=f"https://www.kleinanzeigen.de/s-anzeige/{item_id}", title=title,
+                            title_lower=title.lower(), price=f"{price} €", price_value=float(price), city="Köln",
+                            distance=None, date_raw="Heute, 10:00", date=datetime(2026, 1, 5, 10), description="")
+    return {"listing": listing, "seller_info": seller_info, "price": float(price), "ebay_median": ebay_median,
+            "gpt_flags": gpt_flags, "verdict": verdict}
+
+
+def with_changes(rules, **changes):
+    """RuleSet mit geänderten Werten; matcher=None baut den Matcher neu."""
+    rules = replace(rules, **{key: value for key, value in changes.items() if key != "matcher"})
+    if "matcher" in changes:
+        rules = replace(rules, matcher=KeywordMatcher({name: getattr(rules, name) for name in KEYWORD_LISTS}))
+    return rules
@@ -0,0 +1,71 @@
+import random
+from datetime import date, datetime
+
+import numpy as np
+
+from ebAlert.batch_score import alert_mask, load_candidates, parse_range, round_like_python, score_batch, sweep
+from ebAlert.core.rules import default_rules_path, load_rules
+from ebAlert.core.scan_archive import append_records, iter_records
+from ebAlert.main import calculate_score, is_alert, use_rules
+
+from replay_helpers import FLAGS, make_record
+
+
+def test_batch_matches_calculate_score():
+    rng = random.Random(17)
+    rules = load_rules(default_rules_path())
+    booster = rules.score_boosters[0]
+    rows = []
+    for _ in range(5000):
+        flags = {"bundle": rng.random() < 0.1, "obsolete": rng.random() < 0.1, "accessory_only": rng.random() < 0.05}
+        # auch glatte Beträge, damit Rundungsgrenzen (x,xx5) vorkommen
+        offer = rng.choice([0, round(rng.uniform(1, 800), 2), rng.randint(1, 800)])
+        median = rng.choice([round(rng.uniform(1, 1500), 2), rng.randint(1, 1500) + 0.5])
+        title = f"Angebot {booster}" if rng.random() < 0.2 else "Angebot"
+        rows.append((title, offer, median, flags))
+
+    with use_rules(rules):
+        for factor in (None, 0.6, 0.75):
+            expected = [calculate_score(title, "", offer, median, flags, sale_factor=factor)
+                        for title, offer, median, flags in rows]
+            margins, scores = score_batch(
+                [offer for _, offer, _, _ in rows], [median for _, _, median, _ in rows],
+                [flags["bundle"] for *_, flags in rows], [flags["obsolete"] for *_, flags in rows],
+                [flags["accessory_only"] for *_, flags in rows], [title != "Angebot" for title, *_ in rows],
+                sale_factor=factor)
+            assert [(float(margin), int(score)) for margin, score in zip(margins, scores)] == expected
+            alerts = alert_mask(margins, scores, rules.minimum_margin_eur, rules.minimum_score)
+            assert list(alerts) == [is_alert(margin, score, rules) for margin, score in expected]
+
+
+def test_round_like_python_near_ties():
+    values = np.array([2.675, 1.005, 0.125, -0.125, 1.115, 10.005, 1234.565])
+    assert list(round_like_python(values, 2)) == [round(float(value), 2) for value in values]
+
+
+def test_sweep_counts_alerts_and_precision(tmp_path):
+    records = [
+        make_record(1, "Grafikkarte", 200, "alert", ebay_median=400, gpt_flags=FLAGS),
+        make_record(2, "Mainboard", 300, "no_deal", ebay_median=300, gpt_flags=FLAGS),
+        make_record(3, "Monitor", 100, "alert", ebay_median=200, gpt_flags=FLAGS),
+        # ohne Median nie bis zur Bewertung gekommen
+        make_record(4, "Suche Grafikkarte", 200, "drop:title_blacklist", seller_info=None),
+    ]
+    append_records(records, directory=str(tmp_path), now=datetime(2026, 1, 5, 12))
+    archived = list(iter_records(1, directory=str(tmp_path), today=date(2026, 1, 5)))
+    rules = load_rules(default_rules_path())
+
+    batch = load_candidates(archived, rules, labels={"1": 1, "3": 0})
+    assert list(batch.ids) == ["1", "2", "3"]
+    cells = sweep(batch, [0.6642, 0.5], [60, 101], [35, 1000])
+    assert len(cells) == 8
+    by_key = {(cell.sale_factor, cell.minimum_score, cell.minimum_margin_eur): cell for cell in cells}
+    loose = by_key[(0.6642, 60, 35)]
+    assert (loose.alerts, loose.labeled_alerts, loose.good_alerts, loose.precision) == (2, 2, 1, 0.5)
+    assert by_key[(0.6642, 101, 1000)].alerts == 0
+    assert by_key[(0.6642, 101, 1000)].precision is None
+
+
+def test_parse_range():
+    assert parse_range("40:60:10") == [40.0, 50.0, 60.0]
+    assert parse_range("0.6,0.65") == [0.6, 0.65]
@@ -0,0 +1,93 @@
+import json
+import threading
+
+from ebAlert.core.cache_store import CacheStore
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(tmp_path, clock=None, memory_entries=16):
+    return CacheStore(str(tmp_path / "cache.db"), memory_entries=memory_entries, clock=clock or FakeClock())
+
+
+def test_roundtrip_and_namespaces(tmp_path):
+    store = make_store(tmp_path)
+    prices = store.namespace("prices", "v1")
+    queries = store.namespace("queries", "v1")
+    prices.set("rtx 3080", 420.5)
+    queries.set("rtx 3080", "RTX 3080 10GB")
+    assert prices.get("rtx 3080") == 420.5
+    assert queries.get("rtx 3080") == "RTX 3080 10GB"
+    assert prices.get("missing", "default") == "default"
+
+    # neuer Prozess: ohne LRU direkt aus der Datei
+    reopened = make_store(tmp_path).namespace("prices", "v1")
+    assert reopened.get("rtx 3080") == 420.5
+    assert len(reopened) == 1
+
+
+def test_ttl_and_stored_at(tmp_path):
+    clock = FakeClock()
+    cache = make_store(tmp_path, clock).namespace("prices", "v1")
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, stored_at=500.0)
+    assert cache.get_entry("b").age(clock.now) == 500.0
+    clock.now += 61
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_version_change_drops_entries(tmp_path):
+    make_store(tmp_path).namespace("prices", "v1").set("a", 1)
+    cache = make_store(tmp_path).namespace("prices", "v2")
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_eviction_keeps_newest(tmp_path):
+    clock = FakeClock()
+    cache = make_store(tmp_path, clock).namespace("prices", "v1", max_entries=3)
+    for index in range(5):
+        clock.now += 1
+        cache.set(f"k{index}", index)
+    assert len(cache) == 3
+    assert [cache.get(f"k{index}") for index in range(5)] == [None, None, 2, 3, 4]
+
+
+def test_json_import_runs_once(tmp_path):
+    legacy = tmp_path / "ebay_price_cache.json"
+    legacy.write_text(json.dumps({
+        "rtx 3080": {"price": 420.0, "timestamp": 900.0, "version": "v6"},
+        "gtx 970": {"price": 80.0, "timestamp": 900.0, "version": "v4"},
+    }))
+    convert = lambda key, raw: (raw["price"], raw["timestamp"]) if raw.get("version") == "v6" else None
+    cache = make_store(tmp_path).namespace("prices", "v6")
+    assert cache.import_json_once(str(legacy), convert) == 1
+    assert cache.get_entry("rtx 3080").stored_at == 900.0
+    assert cache.get("gtx 970") is None
+
+    cache.set("rtx 3080", 450.0)
+    assert make_store(tmp_path).namespace("prices", "v6").import_json_once(str(legacy), convert) == 0
+    assert make_store(tmp_path).namespace("prices", "v6").get("rtx 3080") == 450.0
+
+
+def test_concurrent_writers(tmp_path):
+    store = make_store(tmp_path)
+    cache = store.namespace("prices", "v1")
+
+    def write(offset):
+        for index in range(50):
+            cache.set(f"{offset}-{index}", index)
+
+    threads = [threading.Thread(target=write, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(make_store(tmp_path).namespace("prices", "v1")) == 200
@@ -0,0 +1,232 @@
+import threading
+import time
+
+import pytest
+
+from ebAlert.core.cache_store import CacheStore
+from ebAlert.core.single_flight import SingleFlight
+from ebAlert.ebayscrapping import ebay_market
+from ebAlert.ebayscrapping.ebay_token import EbayTokenManager
+
+
+@pytest.fixture(autouse=True)
+def legacy_estimator(monkeypatch):
+    # die erwarteten Mediane unten sind mit dem bisherigen Bucket-Verfahren gerechnet
+    monkeypatch.setattr(ebay_market.settings, "PRICE_ESTIMATOR", "legacy")
+
+
+def test_single_flight_merges_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("q", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("q", slow))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+    assert results == [42] * 4
+    assert len(calls) == 1
+    assert flight.merged == 3
+
+
+SAMPLES = {
+    "rtx 3080": {"p": [400.0, 420.0, 430.0, 440.0, 900.0], "c": [3000] * 5, "n": 7},
+    "ryzen 5 3600": {"p": [70.0, 75.0, 80.0, 200.0], "c": [3000] * 4, "n": 4},
+    "gtx 1080": {"p": [150.0, 150.0], "c": [4000, 5000], "n": 2},
+}
+
+
+def test_median_prices_dedup_and_parallel(monkeypatch):
+    calls = []
+
+    def fake_resolve(query):
+        calls.append(query)
+        time.sleep(0.3)
+        return ebay_market.PriceLookup(query, SAMPLES[query.lower().strip()], None)
+
+    monkeypatch.setattr(ebay_market, "resolve_samples", fake_resolve)
+    monkeypatch.setattr(ebay_market, "price_cache", lambda: None)
+    started = time.perf_counter()
+    medians = ebay_market.get_ebay_median_prices([
+        ("RTX 3080", 300), ("rtx 3080 ", 120), ("Ryzen 5 3600", 60), ("GTX 1080", 100),
+    ])
+    elapsed = time.perf_counter() - started
+
+    # eine Stichprobe pro Query, der Median aber pro Angebotspreis (120€: nichts im Korridor,
+    # None - den Fallback wählt der Scan selbst)
+    assert medians == {("RTX 3080", 300): 425.0, ("rtx 3080 ", 120): None, ("Ryzen 5 3600", 60): 72.5,
+                       ("GTX 1080", 100): 150.0}
+    assert sorted(calls) == ["GTX 1080", "RTX 3080", "Ryzen 5 3600"]
+    # drei Abfragen zu je 0.3s parallel statt nacheinander
+    assert elapsed < 0.8
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_token_manager(store, clock, tokens):
+    def fetch():
+        tokens.append(f"token-{len(tokens) + 1}")
+        return tokens[-1], clock.now + 7200
+    return EbayTokenManager(store.namespace("ebay_oauth", "v1"), fetch=fetch, refresh_margin=600, clock=clock)
+
+
+def test_token_is_shared_and_refreshed_ahead_of_expiry(tmp_path):
+    clock = FakeClock()
+    tokens = []
+    first = make_token_manager(CacheStore(str(tmp_path / "cache.db"), clock=clock), clock, tokens)
+    assert first.get() == "token-1"
+
+    # zweiter Prozess: nimmt den gespeicherten Token statt selbst einen zu holen
+    second = make_token_manager(CacheStore(str(tmp_path / "cache.db"), clock=clock), clock, tokens)
+    assert second.get() == "token-1"
+    assert tokens == ["token-1"]
+
+    # bis kurz vor Ablauf nichts zu tun, danach erneuert genau einer
+    assert first.refresh_if_due() == 7200 - 600
+    clock.now += 7200 - 500
+    first.refresh_if_due()
+    assert tokens == ["token-1", "token-2"]
+    assert second.refresh_if_due() == 7200 - 600
+    assert second.get() == "token-2"
+    assert tokens == ["token-1", "token-2"]
+
+
+def test_token_refresh_respects_lease(tmp_path):
+    clock = FakeClock()
+    tokens = []
+    store = CacheStore(str(tmp_path / "cache.db"), clock=clock)
+    manager = make_token_manager(store, clock, tokens)
+    assert store.acquire_lease("ebay_token_refresh", "other-host:1", 60)
+    assert manager.refresh_if_due() == 5.0
+    assert tokens == []
+    clock.now += 61
+    manager.refresh_if_due()
+    assert tokens == ["token-1"]
+
+
+def use_price_caches(monkeypatch, tmp_path):
+    store = CacheStore(str(tmp_path / "cache.db"))
+    samples = store.namespace("ebay_samples", ebay_market.SAMPLE_CACHE_VERSION)
+    legacy = store.namespace("ebay_price", ebay_market.CACHE_VERSION)
+    monkeypatch.setattr(ebay_market, "sample_cache", lambda: samples)
+    monkeypatch.setattr(ebay_market, "price_cache", lambda: legacy)
+    history = ebay_market.PriceHistory(store)
+    monkeypatch.setattr(ebay_market, "price_history", lambda: history)
+    monkeypatch.setattr(ebay_market.settings, "EBAY_CLIENT_ID", "id")
+    monkeypatch.setattr(ebay_market.settings, "EBAY_CLIENT_SECRET", "secret")
+    monkeypatch.setattr(ebay_market, "price_stats", ebay_market.Counter())
+    return samples, legacy
+
+
+def fake_search_results(*values):
+    return [{"price": {"value": str(value), "currency": "EUR"}, "conditionId": "3000"} for value in values]
+
+
+def wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return
+        time.sleep(0.02)
+
+
+def test_samples_serve_any_offer_price(tmp_path, monkeypatch):
+    use_price_caches(monkeypatch, tmp_path)
+    calls = []
+    monkeypatch.setattr(ebay_market, "search_ebay_listings",
+                        lambda query: calls.append(query) or fake_search_results(90, 95, 100, 400, 420, 430))
+    assert ebay_market.get_ebay_median_price("RTX 3080", 300) == 420.0
+    assert ebay_market.get_ebay_median_price("RTX 3080", 60) == 92.5
+    assert calls == ["RTX 3080"]
+    assert ebay_market.price_stats["fresh"] == 1
+
+
+def test_stale_price_is_served_and_revalidated(tmp_path, monkeypatch):
+    samples, _ = use_price_caches(monkeypatch, tmp_path)
+    now = time.time()
+    samples.set("rtx 3080", {"p": [400.0, 410.0], "c": [3000, 3000], "n": 2},
+                stored_at=now - ebay_market.CACHE_EXPIRY - 3600)
+    samples.set("gtx 970", {"p": [90.0], "c": [3000], "n": 1},
+                stored_at=now - ebay_market.CACHE_EXPIRY - ebay_market.settings.EBAY_PRICE_STALE_SECONDS - 1)
+    released = threading.Event()
+    live_calls = []
+
+    def fake_search(query):
+        live_calls.append(query)
+        released.wait(2)
+        return fake_search_results(450, 455, 460)
+
+    monkeypatch.setattr(ebay_market, "search_ebay_listings", fake_search)
+
+    # im Stale-Fenster: sofort der alte Wert, die Live-Abfrage läuft im Hintergrund
+    assert ebay_market.get_ebay_median_price("RTX 3080", 300) == 405.0
+    assert ebay_market.get_ebay_median_price("RTX 3080", 300) == 405.0
+    released.set()
+    wait_for(lambda: samples.get_entry("rtx 3080").value["n"] == 3)
+    assert ebay_market.get_ebay_median_price("RTX 3080", 300) == 455.0
+    assert live_calls == ["RTX 3080"]
+
+    # älter als das Stale-Fenster: wie bisher live im Scan
+    assert ebay_market.get_ebay_median_price("GTX 970", 300) == 455.0
+    stats = ebay_market.price_stats
+    assert (stats["stale"], stats["revalidated"], stats["fresh"], stats["live"]) == (2, 1, 1, 1)
+
+
+def test_legacy_median_bridges_until_samples_arrive(tmp_path, monkeypatch):
+    samples, legacy = use_price_caches(monkeypatch, tmp_path)
+    legacy.set("rtx 3080", 420.0)
+    monkeypatch.setattr(ebay_market, "search_ebay_listings", lambda query: fake_search_results(450, 455, 460))
+    assert ebay_market.get_ebay_median_price("RTX 3080", 300) == 420.0
+    wait_for(lambda: samples.get_entry("rtx 3080") is not None)
+    assert ebay_market.get_ebay_median_price("RTX 3080", 300) == 455.0
+
+
+def test_live_fetch_records_history_and_adapts_expiry(tmp_path, monkeypatch):
+    samples, _ = use_price_caches(monkeypatch, tmp_path)
+    history = ebay_market.price_history()
+    now = time.time()
+    # Grafikkarte im Preisverfall: 10% pro Woche
+    for week, median in enumerate([600.0, 540.0, 486.0]):
+        history.record("rtx 5080", ebay_market.PricePoint(now - (3 - week) * 7 * 86400, median, 20, 0.1))
+    samples.set("rtx 5080", {"p": [450.0, 455.0, 460.0], "c": [3000] * 3, "n": 3}, stored_at=now - 10 * 86400)
+    monkeypatch.setattr(ebay_market, "search_ebay_listings", lambda query: fake_search_results(430, 437.5, 445))
+
+    # 10 Tage alt wäre mit festen 8 Wochen frisch - bei dem Trend ist die Stichprobe veraltet
+    assert ebay_market.cache_expiry("rtx 5080") < 10 * 86400
+    ebay_market.get_ebay_median_price("RTX 5080", 400)
+    wait_for(lambda: len(history.series("rtx 5080")) == 4)
+    point = history.series("rtx 5080").current()
+    assert point.median == 437.5 and point.n_samples == 3
+
+    # ohne Verlauf bleibt es bei der festen Laufzeit
+    assert ebay_market.cache_expiry("gtx 970") == ebay_market.CACHE_EXPIRY
+
+
+def test_trend_adjusts_older_samples(tmp_path, monkeypatch):
+    samples, _ = use_price_caches(monkeypatch, tmp_path)
+    monkeypatch.setattr(ebay_market.settings, "PRICE_TREND_ADJUST", True)
+    monkeypatch.setattr(ebay_market.settings, "PRICE_TREND_DAYS", 30)
+    history = ebay_market.price_history()
+    now = time.time()
+    for days_ago, median in [(20, 440.0), (10, 420.0), (5, 410.0)]:
+        history.record("rtx 3080", ebay_market.PricePoint(now - days_ago * 86400, median, 20, 0.1))
+    samples.set("rtx 3080", {"p": [400.0, 410.0, 420.0], "c": [3000] * 3, "n": 3}, stored_at=now - 5 * 86400)
+    adjusted = ebay_market.get_ebay_median_price("RTX 3080", 300)
+    # Regressionsgerade: -2€ pro Tag bei im Mittel 423,33€, fortgeschrieben über 5 Tage
+    assert adjusted == pytest.approx(410.0 * (1 - 5 * 2.0 / (1270 / 3)), abs=0.01)
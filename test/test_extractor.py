@@ -1,6 +1,7 @@
 from bs4 import BeautifulSoup
 
-from ebAlert.ebayscrapping.ebayclass import EbayItemFactory, EbayItem
+from ebAlert.ebayscrapping import ebayclass
+from ebAlert.ebayscrapping.ebayclass import EbayItemFactory, EbayItem, LxmlEbayItem, parse_price_value
 
 
 def test_item_extractor():
@@ -11,7 +12,7 @@ def test_item_extractor():
 
 
 def test_ebay_item():
-    with open("./test_article.html", "r") as f:
+    with open("./test_article.html", "r", encoding="cp1252") as f:
         soup = BeautifulSoup(f.read())
         article = soup.find("article")
         item = EbayItem(article)
@@ -26,5 +27,166 @@ def test_ebay_item():
                                    " Boy-Sega-Playstation & PC / Atari..."
 
 
+def test_parser_backends_are_identical():
+    with open("./test.html", "r", encoding="UTF-8") as f:
+        soup_items = [EbayItem(item) for item in EbayItemFactory.extract_item_from_page(f.read())]
+    with open("./test.html", "rb") as f:
+        lxml_items = [LxmlEbayItem(item) for item in EbayItemFactory.extract_item_from_bytes(f.read())]
+    assert len(lxml_items) == len(soup_items) == 27
+    for soup_item, lxml_item in zip(soup_items, lxml_items):
+        for field in ("id", "link", "title", "price", "description", "city", "distance", "date_raw", "is_topad"):
+            assert getattr(soup_item, field) == getattr(lxml_item, field)
+
+
+class FakePagesFactory(EbayItemFactory):
+    def get_webpage(self, url=None, conditional=False):
+        with open("./test.html", "rb") as f:
+            return f.read()
+
+
+def test_next_page_url():
+    with open("./test.html", "rb") as f:
+        assert EbayItemFactory.extract_next_page_url(f.read()) == "https://www.kleinanzeigen.de/s-seite:2/sega/k0"
+
+
+def test_pagination_watermark():
+    # ohne Wasserstand nur die erste Seite
+    factory = FakePagesFactory("https://www.kleinanzeigen.de/s-sega/k0")
+    assert factory.pages_fetched == 1
+    assert len(factory.item_list) == 27
+    assert factory.max_id == 2513558197
+    # Wasserstand liegt innerhalb der ersten Seite -> Early-Stop
+    factory = FakePagesFactory("https://www.kleinanzeigen.de/s-sega/k0", watermark=2513450000)
+    assert factory.pages_fetched == 1
+    assert factory.stopped_early
+    # Wasserstand älter als alle Anzeigen -> blättern bis zum Seitenlimit
+    factory = FakePagesFactory("https://www.kleinanzeigen.de/s-sega/k0", watermark=2400000000, max_pages=3)
+    assert factory.pages_fetched == 3
+    assert factory.hit_page_limit
+    assert not factory.stopped_early
+    assert len(factory.item_list) == 27
+
+
+def test_listing_record():
+    with open("./test.html", "rb") as f:
+        records, regular_ids = FakePagesFactory("link").extract_records(f.read(), set())
+    assert len(records) == 27
+    assert len(regular_ids) == 25
+    record = records[0]
+    assert record.id == 2469197759
+    assert record.is_topad
+    assert record.title == 'Suche alte Spiele:Nintendo-GameBoy-Sega-Playstation-C64-Amiga-PC'
+    assert record.title_lower == record.title.lower()
+    assert record.price == '1.234 € VB'
+    assert record.price_value == 1234.0
+    assert record.city == '69207 Sandhausen'
+    assert not hasattr(record, "__dict__")
+
+
+def test_known_ids_are_not_materialized(monkeypatch):
+    built = []
+    original_init = LxmlEbayItem.__init__
+    monkeypatch.setattr(LxmlEbayItem, "__init__", lambda self, contents: built.append(1) or original_init(self, contents))
+    factory = FakePagesFactory("link", known_ids={2469197759, 2513558197})
+    # für bekannte Anzeigen wird kein Item gebaut (und damit nichts ausgelesen)
+    assert len(built) == 25
+    assert len(factory.item_list) == 25
+    assert factory.known_skipped == 2
+    # bekannte Anzeigen zählen trotzdem für den Wasserstand
+    assert factory.max_id == 2513558197
+
+
+def test_parse_price_value():
+    assert parse_price_value("1.234 € VB") == 1234.0
+    assert parse_price_value("12,50 €") == 12.5
+    assert parse_price_value("VB") is None
+    assert parse_price_value("Zu verschenken") is None
+    assert parse_price_value(None) is None
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = "utf-8"
+        self.headers = headers or {}
+
+    def __bool__(self):
+        return self.status_code < 400
+
+
+def test_unchanged_page_is_not_parsed(monkeypatch):
+    with open("./test.html", "rb") as f:
+        content = f.read()
+    sent_headers = []
+
+    def fake_get(url, headers=None, timeout=None):
+        sent_headers.append(headers)
+        if headers.get("if-none-match") == '"v2"':
+            return FakeResponse(304)
+        return FakeResponse(200, content, {"etag": '"v1"'})
+
+    monkeypatch.setattr(ebayclass.http_client, "get", fake_get)
+    first = EbayItemFactory("https://www.kleinanzeigen.de/s-sega/k0")
+    assert not first.unchanged
+    assert len(first.item_list) == 27
+    assert first.max_id == 2513558197
+    assert first.validators["etag"] == '"v1"'
+
+    # gleicher Fingerprint -> nichts parsen
+    second = EbayItemFactory("https://www.kleinanzeigen.de/s-sega/k0", validators=first.validators)
+    assert sent_headers[-1]["if-none-match"] == '"v1"'
+    assert second.unchanged
+    assert second.item_list == []
+
+    # 304 -> ebenfalls unverändert, Validatoren bleiben erhalten
+    third = EbayItemFactory("https://www.kleinanzeigen.de/s-sega/k0", validators={"etag": '"v2"', "fingerprint": "x"})
+    assert third.unchanged
+    assert third.validators["fingerprint"] == "x"
+
+
+def test_partial_crawl_is_retried_on_next_scan(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from ebAlert import main
+    from ebAlert.models.sqlmodel import Base, EbayLink
+
+    with open("./test.html", "rb") as f:
+        content = f.read()
+    requested = []
+    page_two_up = False
+
+    def fake_get(url, headers=None, timeout=None):
+        requested.append(url)
+        if "seite:2" in url and not page_two_up:
+            return FakeResponse(500)
+        return FakeResponse(200, content, {"etag": '"v1"'})
+
+    monkeypatch.setattr(ebayclass.http_client, "get", fake_get)
+    monkeypatch.setattr(main.settings, "MAX_PAGES_PER_LINK", 2)
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    link = EbayLink(id=1, link="https://www.kleinanzeigen.de/s-sega/k0", last_seen_id=2400000000)
+    db.add(link)
+    db.commit()
+
+    # Seite 2 schlägt fehl: weder Wasserstand noch Validatoren rücken vor
+    items, new_per_link = main.collect_new_items(db, [link])
+    assert new_per_link == {1: 27}
+    assert link.last_seen_id == 2400000000
+    assert link.etag is None and link.fingerprint is None
+
+    # nächster Scan: Seite 1 ist unverändert, wird aber nicht als "unverändert" übersprungen
+    page_two_up = True
+    requested.clear()
+    main.collect_new_items(db, [link])
+    assert any("seite:2" in url for url in requested)
+    assert link.last_seen_id == 2513558197
+    assert link.etag == '"v1"' and link.fingerprint
+    db.close()
+
+
 if __name__ == "__main__":
     pass
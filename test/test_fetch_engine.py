@@ -0,0 +1,63 @@
+import time
+
+from ebAlert.core.fetch_engine import Job, host_of, iter_completed
+
+
+def test_jobs_run_concurrently_in_completion_order():
+    jobs = [Job(key=delay, func=lambda d=delay: time.sleep(d) or d, host="example.org") for delay in (0.3, 0.1, 0.2)]
+    started = time.perf_counter()
+    results = list(iter_completed(jobs, per_host_limit=3))
+    assert [r.key for r in results] == [0.1, 0.2, 0.3]
+    assert [r.result for r in results] == [0.1, 0.2, 0.3]
+    assert time.perf_counter() - started < 0.5
+
+
+def test_per_host_limit():
+    jobs = [Job(key=i, func=lambda: time.sleep(0.1), host="example.org") for i in range(4)]
+    started = time.perf_counter()
+    list(iter_completed(jobs, per_host_limit=2))
+    assert time.perf_counter() - started >= 0.2
+
+
+def test_errors_and_timeouts_are_reported():
+    def fail():
+        raise ValueError("kaputt")
+
+    jobs = [Job(key="fail", func=fail), Job(key="slow", func=lambda: time.sleep(0.5), timeout=0.1)]
+    results = {r.key: r for r in iter_completed(jobs)}
+    assert isinstance(results["fail"].error, ValueError)
+    assert isinstance(results["slow"].error, TimeoutError)
+
+
+def test_timed_out_job_keeps_its_host_slot():
+    started = {}
+
+    def slow():
+        started["slow"] = time.perf_counter()
+        time.sleep(0.4)
+
+    def fast():
+        started["fast"] = time.perf_counter()
+
+    jobs = [Job(key="slow", func=slow, host="slots.example", timeout=0.1),
+            Job(key="fast", func=fast, host="slots.example")]
+    results = {r.key: r for r in iter_completed(jobs, per_host_limit=1)}
+    assert isinstance(results["slow"].error, TimeoutError)
+    # der zweite Job startet erst, wenn der Thread des ersten wirklich fertig ist
+    assert started["fast"] - started["slow"] >= 0.35
+
+
+def test_hanging_thread_counts_against_the_next_round():
+    jobs = [Job(key="hang", func=lambda: time.sleep(0.4), host="rounds.example", timeout=0.05)]
+    list(iter_completed(jobs, per_host_limit=1))
+    started = time.perf_counter()
+    list(iter_completed([Job(key="next", func=lambda: None, host="rounds.example")], per_host_limit=1))
+    assert time.perf_counter() - started >= 0.25
+
+
+def test_host_of():
+    assert host_of("https://www.kleinanzeigen.de/s-ryzen/k0") == "www.kleinanzeigen.de"
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from ebAlert import gpt_evaluator
+from ebAlert.core.cache_store import CacheStore
+
+
+class FakeCompletions:
+    """Antwortet nach `delay` Sekunden wie die Chat-API; Chunks mit einer ID aus `fail` werfen."""
+
+    def __init__(self, delay=0.3, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def create(self, messages, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            content = messages[-1]["content"]
+            if content.startswith("["):
+                chunk = json.loads(content)
+                payload = {"result": [{"id": entry["id"], "bundle": False, "obsolete": False,
+                                       "accessory_only": False, "liquidity": "high"} for entry in chunk]}
+            else:
+                chunk = json.loads(content.split("Anzeigen: ", 1)[1])
+                payload = {"queries": [{"id": entry["id"], "query": entry["title"].upper()} for entry in chunk]}
+            if self.fail & {entry["id"] for entry in chunk}:
+                raise RuntimeError("rate limited")
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(payload)))])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def use_fake_client(monkeypatch, completions):
+    monkeypatch.setattr(gpt_evaluator, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(gpt_evaluator.settings, "GPT_CONCURRENCY", 5)
+
+
+def test_evaluation_chunks_run_concurrently(monkeypatch):
+    completions = FakeCompletions()
+    use_fake_client(monkeypatch, completions)
+    listings = [{"id": str(i), "title": f"Artikel {i}"} for i in range(40)]
+    started = time.perf_counter()
+    results = gpt_evaluator.evaluate_listings_batch(listings)
+    elapsed = time.perf_counter() - started
+    assert [r["id"] for r in results] == [str(i) for i in range(40)]
+    assert completions.calls == 5 and completions.max_active == 5
+    # fünf Aufrufe zu je 0.3s - parallel statt 1.5s nacheinander
+    assert elapsed < 0.9
+
+
+def test_failed_chunks_keep_partial_results(monkeypatch, tmp_path):
+    completions = FakeCompletions(delay=0.05, fail={"3"})
+    use_fake_client(monkeypatch, completions)
+    cache = CacheStore(str(tmp_path / "cache.db")).namespace("gpt_query", gpt_evaluator.GPT_CACHE_VERSION)
+    monkeypatch.setattr(gpt_evaluator, "gpt_query_cache", lambda: cache)
+    monkeypatch.setattr(gpt_evaluator.settings, "GPT_QUERY_CHUNK_SIZE", 4)
+    items = [{"id": i, "title": f"rtx {i}"} for i in range(10)]
+
+    results = gpt_evaluator.generate_search_queries_batch(items)
+    # der Chunk mit ID 3 (IDs 0-3) fehlt, die anderen sind da und gecacht
+    assert sorted(int(r["id"]) for r in results) == list(range(4, 10))
+    assert cache.get("rtx 7") == "RTX 7" and cache.get("rtx 0") is None
+
+    completions.fail.clear()
+    results = gpt_evaluator.generate_search_queries_batch(items)
+    assert sorted(int(r["id"]) for r in results) == list(range(10))
+    assert completions.calls == 4
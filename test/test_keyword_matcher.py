@@ -0,0 +1,33 @@
+import random
+
+from ebAlert.core.keyword_matcher import KeywordMatcher
+from ebAlert.core.rules import default_rules_path, load_rules
+
+
+def test_matches_every_list_in_one_scan():
+    matcher = KeywordMatcher({"gpu": ["4070 ti", "4070", "rtx"], "bad": ["defekt", "ti s"]})
+    result = matcher.scan("Verkaufe RTX 4070 Ti Super, nicht defekt")
+    assert result == {"gpu": ("4070 ti", "4070", "rtx"), "bad": ("defekt", "ti s")}
+    assert matcher.matches("nichts passendes", "gpu") == ()
+
+
+def test_word_boundary_lists():
+    matcher = KeywordMatcher({"substring": ["nas"], "words": ["nas", "ti"]}, word_boundary=["words"])
+    assert matcher.scan("Nascar Modell") == {"substring": ("nas",)}
+    assert matcher.scan("Synology NAS, 4070 Ti") == {"substring": ("nas",), "words": ("nas", "ti")}
+    # erster Treffer mitten im Wort, zweiter als eigenes Wort
+    assert matcher.matches("tisch und ti", "words") == ("ti",)
+
+
+def test_same_result_as_substring_search():
+    rules = load_rules(default_rules_path())
+    lists = {"title": rules.title_blacklist, "desc": rules.desc_blacklist, "excluded": rules.excluded_keywords,
+             "white": rules.whitelist}
+    matcher = KeywordMatcher(lists)
+    rng = random.Random(7)
+    vocabulary = [word for words in lists.values() for word in words] + ["gpu", "pc", "top", "zustand", "4070"]
+    for _ in range(500):
+        text = " ".join(rng.choice(vocabulary)[: rng.randint(1, 12)] for _ in range(rng.randint(1, 12))).lower()
+        for name, words in lists.items():
+            expected = tuple(dict.fromkeys(word for word in words if word in text))
+            assert matcher.matches(text, name) == expected
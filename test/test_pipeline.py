@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ebAlert.core.pipeline import Cost, FilterPipeline, Stage, order_stages
+
+
+def make_items(count):
+    return [SimpleNamespace(id=str(i), link=f"https://example.org/{i}") for i in range(count)]
+
+
+def test_stages_run_cheapest_first_and_after_their_requirements():
+    stages = [
+        Stage("api", Cost.PAID_API, lambda c: True),
+        Stage("fetch", Cost.NETWORK, lambda c: True, fetch=lambda c: 1),
+        Stage("post_check", Cost.CPU, lambda c: True, requires=("fetch",)),
+        Stage("disk", Cost.LOCAL_IO, lambda c: True),
+        Stage("cpu", Cost.CPU, lambda c: True),
+    ]
+    assert [stage.name for stage in order_stages(stages)] == ["cpu", "disk", "fetch", "post_check", "api"]
+
+
+def test_unknown_requirement_is_rejected():
+    with pytest.raises(ValueError):
+        order_stages([Stage("a", Cost.CPU, lambda c: True, requires=("missing",))])
+
+
+def test_short_circuit_and_funnel_stats():
+    fetched = []
+
+    def fetch(candidate):
+        fetched.append(candidate.item.id)
+        return int(candidate.item.id) * 10
+
+    pipeline = FilterPipeline([
+        Stage("detail", Cost.NETWORK, lambda c: c.ctx["detail"] != 20, fetch=fetch),
+        Stage("even", Cost.CPU, lambda c: int(c.item.id) % 2 == 0),
+        Stage("broken", Cost.CPU, lambda c: 1 / (int(c.item.id) - 4)),
+    ])
+    survivors = pipeline.run(make_items(6))
+
+    assert [c.item.id for c in survivors] == ["0"]
+    # das teure Laden passiert nur für Anzeigen, die die billigen Stufen überstanden haben
+    assert sorted(fetched) == ["0", "2"]
+    assert pipeline.stats["even"].passed == 3 and pipeline.stats["even"].dropped == 3
+    assert pipeline.stats["broken"].errors == 1
+    assert pipeline.stats["detail"].passed == 1
+    assert "even [CPU] 6→3" in pipeline.format_stats()
+
+
+def test_fetch_errors_drop_the_item():
+    def fetch(candidate):
+        if candidate.item.id == "1":
+            raise RuntimeError("kaputt")
+        return candidate.item.id
+
+    pipeline = FilterPipeline([Stage("detail", Cost.NETWORK, lambda c: True, fetch=fetch)])
+    survivors = pipeline.run(make_items(3))
+    assert [c.ctx["detail"] for c in survivors] == ["0", "2"]
+    assert pipeline.stats["detail"].errors == 1
@@ -0,0 +1,52 @@
+import random
+import statistics
+
+from ebAlert.ebayscrapping.price_estimators import compare, estimate, estimate_batch
+
+
+def old_median(prices, offer_price):
+    """Das Verfahren aus get_ebay_median_price vor der Umstellung auf price_estimators."""
+    all_prices = [p for p in prices if offer_price * 0.5 <= p <= offer_price * 3.0]
+    if len(all_prices) < 2:
+        return None
+    bucket_size = 20 if offer_price < 150 else 50
+    buckets = {}
+    for p in all_prices:
+        lower_bound = int(p // bucket_size) * bucket_size
+        buckets[lower_bound] = buckets.get(lower_bound, []) + [p]
+    sorted_buckets = sorted(buckets.items(), key=lambda x: len(x[1]), reverse=True)
+    return round(statistics.median(sorted_buckets[0][1]), 2)
+
+
+def test_legacy_estimator_matches_old_algorithm():
+    rng = random.Random(23)
+    samples, offers = [], []
+    for _ in range(2000):
+        base = rng.uniform(20, 900)
+        # gerundete Preise und glatte Beträge, damit Bucket-Gleichstände vorkommen
+        samples.append([round(max(16.0, rng.gauss(base, base * 0.3)), 2) if rng.random() < 0.8
+                        else float(rng.choice([50, 100, 150, 200])) for _ in range(rng.randint(0, 50))])
+        offers.append(rng.choice([round(rng.uniform(10, 700), 2), 100, 149.99, 150, 200]))
+    estimates = estimate_batch(samples, offers, "legacy")
+    assert [e.median for e in estimates] == [old_median(p, o) for p, o in zip(samples, offers)]
+
+
+def test_robust_estimator_rejects_outliers():
+    prices = [400, 410, 415, 420, 425, 430, 440, 890]
+    result = estimate(prices, 300, "robust")
+    assert result.n_corridor == 8
+    assert result.n_used == 7
+    assert result.median == 420.0
+    assert result.n_samples == 8 and result.iqr > 0 and 0 < result.dispersion < 0.2
+    assert 400 <= result.mode <= 450
+
+
+def test_batch_matches_single_calls_and_handles_empty_rows():
+    samples = [[400, 420, 430], [], [90, 95, 100, 400], [500]]
+    offers = [300, 300, 60, 300]
+    for estimator in ("robust", "legacy"):
+        batch = estimate_batch(samples, offers, estimator)
+        assert batch == [estimate(p, o, estimator) for p, o in zip(samples, offers)]
+        assert batch[1].median is None and batch[1].n_samples == 0
+        assert batch[3].median is None and batch[3].n_corridor == 1
+    assert set(compare(samples, offers)) == {"robust", "legacy"}
@@ -0,0 +1,81 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from ebAlert.core.cache_store import CacheStore
+from ebAlert.ebayscrapping.price_history import DAY, PriceHistory, PricePoint, PriceSeries, fresh_seconds, trend_factor
+
+START = 1_700_000_000.0
+
+
+def make_series(medians, step_days=1.0):
+    return PriceSeries(PricePoint(START + i * step_days * DAY, median, 10, 0.1) for i, median in enumerate(medians))
+
+
+def test_window_queries_match_direct_computation():
+    rng = random.Random(24)
+    times = sorted(START + rng.uniform(0, 365) * DAY for _ in range(400))
+    medians = [500 + rng.gauss(0, 40) for _ in times]
+    series = PriceSeries(PricePoint(t, m, 10, None) for t, m in zip(times, medians))
+    for at in (times[50], times[199] + 3600, None):
+        end = at if at is not None else times[-1]
+        inside = [(t, m) for t, m in zip(times, medians) if end - 30 * DAY <= t <= end]
+        t = np.array([p[0] for p in inside]) / DAY
+        v = np.array([p[1] for p in inside])
+        slope = np.polyfit(t, v, 1)[0]
+        assert series.trend(30, at) == pytest.approx(slope / v.mean(), rel=1e-6)
+        assert series.volatility(30, at) == pytest.approx(v.std(ddof=1) / v.mean(), rel=1e-6)
+        assert series.mean(30, at) == pytest.approx(v.mean())
+    assert series.current(times[10] + 1).timestamp == times[10]
+    assert series.current(START - 1) is None
+
+
+def test_series_is_append_only():
+    series = make_series([100.0, 110.0])
+    with pytest.raises(ValueError):
+        series.append(PricePoint(START, 90.0, 10, None))
+    assert series.trend(7) == pytest.approx(10 / 105)
+    assert make_series([100.0]).trend(7) is None
+
+
+def test_history_is_shared_between_instances(tmp_path):
+    store = CacheStore(str(tmp_path / "cache.db"))
+    writer, reader = PriceHistory(store), PriceHistory(store)
+    writer.record("rtx 3080", PricePoint(START, 420.0, 12, 0.1))
+    assert len(reader.series("rtx 3080")) == 1
+    writer.record("rtx 3080", PricePoint(START + DAY, 410.0, 15, 0.2))
+    # der Leser hält seinen Stand im Speicher, bis er neu lädt
+    assert len(reader.series("rtx 3080")) == 1
+    reader.refresh("rtx 3080")
+    assert reader.series("rtx 3080").current() == PricePoint(START + DAY, 410.0, 15, 0.2)
+    assert reader.queries() == ["rtx 3080"]
+
+
+def test_record_updates_the_loaded_series(tmp_path):
+    history = PriceHistory(CacheStore(str(tmp_path / "cache.db")))
+    series = history.series("rtx 3080")
+    history.record("rtx 3080", PricePoint(START, 420.0, 12, 0.1))
+    history.record("rtx 3080", PricePoint(START + DAY, 410.0, 15, 0.2))
+    assert history.series("rtx 3080") is series and len(series) == 2
+    # ein ersetzter Zeitpunkt lässt sich nicht anhängen - die Query wird neu geladen
+    history.record("rtx 3080", PricePoint(START + DAY, 400.0, 16, 0.2))
+    assert [point.median for point in history.series("rtx 3080").points] == [420.0, 400.0]
+
+
+def test_expiry_follows_volatility_and_trend():
+    args = dict(default=56 * DAY, minimum=3 * DAY, maximum=112 * DAY, target=0.05, trend_days=7, volatility_days=180)
+    stable = make_series([300.0, 301.0, 299.0, 300.0], step_days=30)
+    falling = make_series([600.0, 570.0, 540.0, 510.0], step_days=3)
+    assert fresh_seconds(stable, **args) == 112 * DAY
+    assert fresh_seconds(falling, **args) < 7 * DAY
+    assert fresh_seconds(make_series([300.0, 600.0]), **args) == 56 * DAY
+
+
+def test_trend_factor_is_capped():
+    falling = make_series([600.0, 540.0, 480.0])
+    now = START + 2 * DAY
+    assert trend_factor(falling, now - DAY, now, 7, 0.15) == pytest.approx(1 - 60 / 540)
+    assert trend_factor(falling, now - 30 * DAY, now, 7, 0.15) == 0.85
+    assert math.isclose(trend_factor(make_series([600.0]), now - DAY, now, 7, 0.15), 1.0)
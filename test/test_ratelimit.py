@@ -0,0 +1,69 @@
+from ebAlert.core.ratelimit import AdaptiveRateLimiter, is_block_page
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_limiter(clock, **kwargs):
+    options = dict(initial_rate=2.0, min_rate=0.2, max_rate=4.0, burst=2, additive_step=0.5, penalty_seconds=10)
+    options.update(kwargs)
+    return AdaptiveRateLimiter("test", clock=clock, sleep=clock.sleep, **options)
+
+
+def test_token_bucket_paces_requests():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    for _ in range(6):
+        limiter.acquire()
+    # 2 Tokens Burst, danach 4 Requests mit 2/s
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_additive_increase_multiplicative_decrease():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    for _ in range(10):
+        limiter.observe(200, 0.1)
+    assert limiter.rate == 4.0
+    limiter.observe(429, 0.1)
+    assert limiter.rate == 2.0
+    limiter.observe(200, 0.1, content=b"<html>Bitte das Captcha l\xc3\xb6sen</html>")
+    assert limiter.rate == 1.0
+    assert limiter.throttle_events == 2
+    # langsame Antwort bremst leicht
+    limiter.observe(200, 30.0)
+    assert abs(limiter.rate - 0.9) < 1e-9
+
+
+def test_throttle_blocks_for_retry_after():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.observe(429, 0.1, retry_after="30")
+    assert limiter.cooldown_remaining() == 30
+    limiter.acquire()
+    assert clock.now >= 30
+
+
+def test_hold_extends_pause_without_lowering_rate():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.observe(429, 0.1)
+    rate = limiter.rate
+    limiter.hold(45)
+    assert limiter.rate == rate and limiter.throttle_events == 1
+    assert limiter.cooldown_remaining() == 45
+    limiter.acquire()
+    assert clock.now >= 45
+
+
+def test_block_page_detection():
+    assert is_block_page(b"<html><title>Zugriff verweigert</title></html>")
+    assert not is_block_page(b'<html><ul id="srchrslt-adtable"></ul></html>')
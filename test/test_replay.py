@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+from ebAlert.core.rules import default_rules_path, load_rules
+from ebAlert.core.scan_archive import append_records, iter_records, listing_to_dict
+from ebAlert.replay import replay_records
+
+from replay_helpers import FLAGS, make_record, with_changes
+
+
+def test_archive_roundtrip(tmp_path):
+    now = datetime(2026, 1, 5, 12)
+    append_records([make_record(1, "Grafikkarte", 200, "no_deal")], directory=str(tmp_path), now=now)
+    append_records([make_record(2, "Monitor", 100, "alert")], directory=str(tmp_path), now=now)
+    records = list(iter_records(1, directory=str(tmp_path), today=date(2026, 1, 5)))
+    assert [record["listing"]["id"] for record in records] == [1, 2]
+    assert records[0]["seller_info"]["active_since"] == "2019-02-03T00:00:00"
+    assert records[1]["listing"] == {**listing_to_dict(make_record(2, "Monitor", 100, "alert")["listing"]),
+                                     "date": "2026-01-05T10:00:00"}
+
+
+def test_replay_shows_changed_alerts(tmp_path):
+    records = [
+        # knapp über der Margen-Schwelle -> Alarm
+        make_record(1, "Grafikkarte", 200, "alert", ebay_median=400, gpt_flags=FLAGS),
+        # klar kein Deal
+        make_record(2, "Mainboard", 300, "no_deal", ebay_median=300, gpt_flags=FLAGS),
+        # damals schon vor der Detailseite verworfen
+        make_record(3, "Suche Grafikkarte", 200, "drop:title_blacklist", seller_info=None),
+    ]
+    append_records(records, directory=str(tmp_path), now=datetime(2026, 1, 5, 12))
+    archived = list(iter_records(1, directory=str(tmp_path), today=date(2026, 1, 5)))
+    rules = load_rules(default_rules_path())
+
+    same = replay_records(archived, rules)
+    assert same.new_alerts == [] and same.lost_alerts == [] and same.unknown == 0
+    assert same.verdicts == {"alert": 1, "no_deal": 1, "drop:title_blacklist": 1}
+
+    # strengere Schwellen und ein schlechterer Verkaufsfaktor kosten den Alarm
+    strict = with_changes(rules, minimum_margin_eur=500, minimum_score=100)
+    result = replay_records(archived, strict, sale_factor=0.5)
+    assert [record["listing"]["id"] for record, _, _ in result.lost_alerts] == [1]
+
+    # ohne "suche" auf der Blacklist fehlen für Anzeige 3 die Verkäuferdaten
+    relaxed = load_rules(default_rules_path())
+    relaxed = with_changes(relaxed, title_blacklist=tuple(word for word in relaxed.title_blacklist if "suche" not in word),
+                     matcher=None)
+    assert replay_records(archived, relaxed).unknown == 1
+
+
+def test_fallback_median_is_unknown_in_replay(tmp_path):
+    # ohne eBay-Preis wurde mit dem Fallback bewertet und alarmiert - archiviert ist None
+    records = [make_record(1, "Grafikkarte", 200, "alert", ebay_median=None, gpt_flags=FLAGS)]
+    append_records(records, directory=str(tmp_path), now=datetime(2026, 1, 5, 12))
+    archived = list(iter_records(1, directory=str(tmp_path), today=date(2026, 1, 5)))
+    rules = load_rules(default_rules_path())
+    result = replay_records(archived, with_changes(rules, minimum_margin_eur=500, minimum_score=100))
+    assert result.unknown == 1 and result.lost_alerts == [] and result.new_alerts == []
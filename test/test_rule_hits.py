@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ebAlert.core.rules import parse_rules
+from ebAlert.crud.rule_hits import CRUDRuleHits
+from ebAlert.models.sqlmodel import Base, RuleHit
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://', echo=False, future=True)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    yield db
+    db.close()
+
+
+def get_rules():
+    return parse_rules({
+        "version": 1,
+        "thresholds": {"minimum_score": 60, "minimum_margin_eur": 35, "max_item_price": 800, "min_item_price": 60},
+        "keywords": {"whitelist": ["4090"], "p2": [], "score_boosters": [], "title_blacklist": ["suche", "tausche"],
+                     "desc_blacklist": [], "excluded_keywords": ["defekt", "oppo", "oppo"]},
+    })
+
+
+def test_counters_accumulate_across_flushes(db):
+    crud = CRUDRuleHits(RuleHit)
+    crud.record(1, "title_blacklist", ["suche"])
+    crud.record(2, "title_blacklist", ["suche", "tausche"])
+    crud.flush(db)
+    crud.record(3, "title_blacklist", ["suche"])
+    crud.record(3, "stage", ["price_range"])
+    crud.flush(db)
+
+    rows = {(row.rule_list, row.keyword): row for row in crud.report(db, get_rules())}
+    assert rows[("title_blacklist", "suche")].hits == 3
+    assert rows[("title_blacklist", "tausche")].hits == 1
+    assert rows[("stage", "price_range")].hits == 1
+    assert rows[("excluded_keywords", "defekt")].hits == 0
+    assert rows[("excluded_keywords", "oppo")].occurrences == 2
+
+
+def test_trace_shows_decisions_per_ad(db):
+    crud = CRUDRuleHits(RuleHit)
+    crud.record(7, "excluded_keywords", ["defekt", "oppo"])
+    crud.record(8, "decision", ["alert"])
+    crud.flush(db)
+    assert [(entry.rule_list, entry.keyword) for entry in crud.trace(db, 7)] == \
+           [("excluded_keywords", "defekt"), ("excluded_keywords", "oppo")]
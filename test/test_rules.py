@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import pytest
+
+from ebAlert.core.rules import RuleError, RulesWatcher, default_rules_path, load_rules
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.toml"
+    shutil.copy(default_rules_path(), path)
+    return path
+
+
+def rewrite(path, old, new, bump_mtime=True):
+    text = path.read_text(encoding="utf-8")
+    assert old in text
+    path.write_text(text.replace(old, new, 1), encoding="utf-8")
+    if bump_mtime:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_packaged_rules_are_valid():
+    rules = load_rules(default_rules_path())
+    assert rules.min_item_price < rules.max_item_price
+    assert rules.matcher.matches("suche rtx 4090", "title_blacklist") == ("suche",)
+    assert rules.matcher.matches("rtx 4090 founders", "whitelist") == ("4090",)
+
+
+@pytest.mark.parametrize("old, new", [
+    ("minimum_score = 60", "minimum_score = 160"),
+    ("min_item_price = 60", "min_item_price = 900"),
+    ("minimum_margin_eur = 35", 'minimum_margin_eur = "35"'),
+    ("word_boundary = []", 'word_boundary = ["gibtsnicht"]'),
+    ("version = 1", "version = 1\n[["),
+])
+def test_invalid_rules_are_rejected(rules_file, old, new):
+    rewrite(rules_file, old, new)
+    with pytest.raises(RuleError):
+        load_rules(str(rules_file))
+
+
+def test_watcher_swaps_only_valid_rules(rules_file):
+    watcher = RulesWatcher(str(rules_file))
+    assert not watcher.reload_if_changed()
+
+    rewrite(rules_file, "minimum_score = 60", "minimum_score = 70")
+    rewrite(rules_file, "version = 1", "version = 2")
+    assert watcher.reload_if_changed()
+    assert watcher.current.minimum_score == 70 and watcher.current.version == 2
+
+    rewrite(rules_file, "minimum_score = 70", "minimum_score = -1")
+    assert not watcher.reload_if_changed()
+    assert watcher.current.minimum_score == 70
@@ -0,0 +1,41 @@
+from ebAlert.core.scheduler import LinkScheduler
+
+
+def get_scheduler():
+    return LinkScheduler(min_interval=45, max_interval=900, max_polls_per_hour=1000, target_new_per_poll=1)
+
+
+def test_new_links_are_due_immediately():
+    scheduler = get_scheduler()
+    scheduler.sync([1, 2], now=0)
+    assert sorted(scheduler.due(now=0)) == [1, 2]
+    scheduler.sync([2], now=0)
+    assert scheduler.due(now=0) == [2]
+
+
+def test_intervals_follow_yield():
+    scheduler = get_scheduler()
+    scheduler.sync([1, 2], now=0)
+    for link_id in (1, 2):
+        scheduler.record(link_id, 5, now=0)
+    # Link 1: 4 neue Anzeigen pro Minute, Link 2: keine
+    scheduler.record(1, 4, now=60)
+    scheduler.record(2, 0, now=60)
+    assert scheduler.links[1].interval == 45
+    assert scheduler.links[2].interval == 900
+    assert scheduler.due(now=60 + 45 * 1.2) == [1]
+
+
+def test_budget_stretches_intervals():
+    scheduler = LinkScheduler(min_interval=45, max_interval=900, max_polls_per_hour=80, target_new_per_poll=1)
+    scheduler.sync([1, 2], now=0)
+    for link_id in (1, 2):
+        scheduler.record(link_id, 0, now=0)
+        scheduler.record(link_id, 10, now=60)
+    # 2 Links im 45s-Takt wären 160 Abrufe/h - doppelt so viel wie erlaubt
+    assert sum(3600 / schedule.interval for schedule in scheduler.links.values()) <= 80.01
+    assert scheduler.links[1].interval == scheduler.links[2].interval == 90
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,96 @@
+from ebAlert.ebayscrapping import seller_helper
+from ebAlert.ebayscrapping.seller_helper import extract_seller_fields, parse_seller_info_soup, build_seller_info
+
+DETAIL_PAGE = """<!DOCTYPE html>
+<html><head><title>Anzeige</title><script>var x = "<span>";</script></head>
+<body>
+<div id="viewad-description">
+  <p id="viewad-description-text" class="text-force-linebreak">
+    Verkaufe meine Konsole.<br>
+    Kaum benutzt, <b>mit OVP</b>.<!-- intern -->
+    Nur Abholung.
+  </p>
+</div>
+<div class="text-body-regular-strong text-force-linebreak userprofile-vip">
+  <a href="/s-bestandsliste.html?userId=1"> Max Müller </a>
+</div>
+<div class="userprofile-vip-details">
+  <span class="userprofile-vip-details-text">Privater Nutzer</span>
+  <span class="userprofile-vip-details-text">Aktiv seit 03.02.2019</span>
+</div>
+""" + "<div>Ähnliche Anzeigen</div>" * 2000 + "</body></html>"
+
+
+def chunked(data: bytes, size: int, consumed: list):
+    for start in range(0, len(data), size):
+        consumed.append(start)
+        yield data[start:start + size]
+
+
+def test_streaming_matches_soup():
+    expected = parse_seller_info_soup(DETAIL_PAGE)
+    assert expected["seller_name"] == "Max Müller"
+    assert expected["seller_type"] == "PRIVATE"
+    for size in (7, 512, 1 << 20):
+        fields = extract_seller_fields(chunked(DETAIL_PAGE.encode("utf-8"), size, []))
+        assert build_seller_info(**fields) == expected
+
+
+def test_streaming_stops_after_all_fields():
+    data = DETAIL_PAGE.encode("utf-8")
+    consumed = []
+    extract_seller_fields(chunked(data, 1024, consumed))
+    assert len(consumed) < len(data) // 1024 / 4
+
+
+def test_missing_seller_returns_none():
+    page = DETAIL_PAGE.replace("userprofile-vip\"", "other\"")
+    assert parse_seller_info_soup(page) is None
+    assert build_seller_info(**extract_seller_fields([page.encode("utf-8")])) is None
+
+
+class FakeResponse:
+    def __init__(self, data: bytes, consumed: list):
+        self.status_code = 200
+        self.encoding = "utf-8"
+        self.url = "https://www.kleinanzeigen.de/s-anzeige/1"
+        self.closed_at = None
+        self._data, self._consumed = data, consumed
+
+    def iter_content(self, size):
+        return chunked(self._data, size, self._consumed)
+
+    def close(self):
+        self.closed_at = len(self._consumed)
+
+
+class FakeClient:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        assert kwargs.get("stream")
+        return self.response
+
+    def record_transfer(self, response):
+        pass
+
+
+def test_fetch_reads_to_eof_so_the_connection_is_reused(monkeypatch):
+    data = DETAIL_PAGE.encode("utf-8")
+    consumed = []
+    response = FakeResponse(data, consumed)
+    monkeypatch.setattr(seller_helper, "http_client", FakeClient(response))
+    assert seller_helper.fetch_seller_info(response.url) == parse_seller_info_soup(DETAIL_PAGE)
+    # erst nach dem letzten Chunk geschlossen
+    assert response.closed_at == len(consumed) == -(-len(data) // seller_helper.CHUNK_SIZE)
+
+
+def test_fetch_detects_block_page(monkeypatch):
+    throttled = []
+    limiter = type("Limiter", (), {"on_throttle": lambda self, reason: throttled.append(reason)})()
+    response = FakeResponse(b"<html><body>Bitte Captcha l\xc3\xb6sen</body></html>", [])
+    monkeypatch.setattr(seller_helper, "http_client", FakeClient(response))
+    monkeypatch.setattr(seller_helper, "limiter_for", lambda host: limiter if host == "www.kleinanzeigen.de" else None)
+    assert seller_helper.fetch_seller_info(response.url) is None
+    assert throttled == ["Sperrseite erkannt"]
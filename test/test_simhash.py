@@ -0,0 +1,194 @@
+import random
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ebAlert import main
+from ebAlert.core.pipeline import Candidate, Cost, FilterPipeline, Stage
+from ebAlert.core.simhash import SimHashIndex, hamming, price_band, simhash
+from ebAlert.ebayscrapping.ebayclass import EbayItem, EbayItemFactory
+from ebAlert.crud.fingerprint import CRUDFingerprint
+from ebAlert.models.sqlmodel import Base, ListingFingerprint
+
+TEXT = ("Nintendo Switch OLED weiß mit zwei Controllern und Ladestation, kaum benutzt, "
+        "Originalverpackung vorhanden, nur Abholung in Köln")
+
+
+def test_near_duplicates_are_found():
+    repost = TEXT.replace("kaum benutzt", "kaum  benutzt!!") + " Versand möglich"
+    other = "Fahrrad 28 Zoll Damenrad mit Korb und Licht, Rahmen rot, guter Zustand"
+    assert hamming(simhash(TEXT), simhash(TEXT.upper())) == 0
+    index = SimHashIndex()
+    index.add(1, simhash(TEXT), price_band(200), "no_deal")
+    assert index.find(simhash(repost), price_band(200))[:2] == (1, "no_deal")
+    assert index.find(simhash(other), price_band(200)) is None
+
+
+def listing_texts():
+    with open("./test.html", "r", encoding="UTF-8") as f:
+        items = [EbayItem(article) for article in EbayItemFactory.extract_item_from_page(f.read())]
+    return [main.repost_text(item) for item in items]
+
+
+def test_repost_recall_on_real_listings():
+    texts = listing_texts()
+    vocabulary = sorted({word for text in texts for word in text.split()})
+    index = SimHashIndex()
+    for key, text in enumerate(texts):
+        index.add(key, simhash(text), 30, "no_deal")
+    # keine zwei Anzeigen der Seite gelten als Neueinstellung der jeweils anderen
+    for key, text in enumerate(texts):
+        assert index.find(simhash(text), 30)[0] == key
+
+    rng = random.Random(0)
+    found = total = 0
+    for key, text in enumerate(texts):
+        for _ in range(20):
+            words = text.split()
+            for _ in range(2):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(vocabulary))
+            match = index.find(simhash(" ".join(words)), 30)
+            found += match is not None and match[0] == key
+            total += 1
+    assert found / total >= 0.85
+
+
+def test_index_matches_reposts_but_not_cheaper_ones():
+    index = SimHashIndex()
+    fingerprint = simhash(TEXT)
+    index.add(1, fingerprint, price_band(200), "no_deal")
+    assert index.find(fingerprint ^ 0b101, price_band(205)) == (1, "no_deal", 2)
+    # deutlich billiger neu eingestellt -> neu bewerten
+    assert index.find(fingerprint, price_band(150)) is None
+    assert index.find(fingerprint ^ 0b111111111, price_band(200)) is None
+    index.remove(1)
+    assert index.find(fingerprint, price_band(200)) is None
+
+
+def best_of(runs, func):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def test_lookup_is_faster_than_a_linear_scan():
+    rng = random.Random(1)
+    index = SimHashIndex()
+    for key in range(30000):
+        index.add(key, rng.getrandbits(64), 30, "no_deal")
+    queries = [rng.getrandbits(64) for _ in range(100)]
+    entries = list(index.entries.items())
+
+    def linear():
+        for query in queries:
+            min(((query ^ fingerprint).bit_count(), key) for key, (fingerprint, _, _) in entries)
+
+    def indexed():
+        for query in queries:
+            index.find(query, 30)
+    # relativ statt absoluter Millisekunden - die hängen von der Maschine ab
+    assert best_of(3, indexed) * 3 < best_of(3, linear)
+
+
+def test_fingerprints_survive_a_restart():
+    engine = create_engine('sqlite://', echo=False, future=True)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    fingerprint = simhash(TEXT) | 1 << 63
+
+    crud = CRUDFingerprint(ListingFingerprint)
+    crud.load_index(db)
+    crud.remember(42, fingerprint, 35, "alert")
+    crud.flush(db)
+
+    restarted = CRUDFingerprint(ListingFingerprint)
+    restarted.load_index(db)
+    assert restarted.find_repost(fingerprint, 35) == (42, "alert", 0)
+    db.close()
+
+
+def make_listing(post_id, title=TEXT, description="No Description", price="200 €"):
+    return SimpleNamespace(id=post_id, title=title, description=description, price=price,
+                           link=f"https://www.kleinanzeigen.de/s-anzeige/{post_id}")
+
+
+def repost_pipeline(monkeypatch, seller_infos):
+    """Repost-Stufe + Verkäufer-Stufen aus main, mit In-Memory-DB und erfundenen Verkäuferdaten."""
+    engine = create_engine('sqlite://', echo=False, future=True)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    crud = CRUDFingerprint(ListingFingerprint)
+    crud.load_index(db)
+    monkeypatch.setattr(main, "crud_fingerprint", crud)
+
+    def fetch(candidate):
+        info = seller_infos[candidate.item.id]
+        if isinstance(info, Exception):
+            raise info
+        return info
+
+    def price(candidate):
+        candidate.ctx["price"] = 200.0
+        return True
+
+    stages = [Stage("price_range", Cost.CPU, price),
+              Stage("repost", Cost.CPU, main.stage_repost, requires=("price_range",)),
+              Stage("seller_info", Cost.NETWORK, main.stage_seller_info, fetch=fetch, requires=("repost",)),
+              Stage("seller_age", Cost.CPU, main.stage_seller_age, requires=("seller_info",))]
+    pipeline = FilterPipeline(stages)
+
+    def run(items):
+        survivors = pipeline.run(items)
+        for candidate in pipeline.dropped:
+            main.remember_drop(candidate)
+        return survivors, {c.item.id: c.dropped_by for c in pipeline.dropped}
+    return run
+
+
+def seller(name, age_days):
+    return {"seller_name": name, "seller_type": "PRIVATE", "seller_age_days": age_days, "description": ""}
+
+
+def test_seller_dependent_drops_are_not_reused(monkeypatch):
+    run = repost_pipeline(monkeypatch, {1: seller("neu", 2), 2: seller("alt", 400)})
+    _, dropped = run([make_listing(1)])
+    assert dropped == {1: "seller_age"}
+    # gleicher Text, anderer (etablierter) Verkäufer -> wird ganz normal ausgewertet
+    survivors, dropped = run([make_listing(2)])
+    assert [c.item.id for c in survivors] == [2] and dropped == {}
+
+
+def test_fetch_errors_are_not_remembered(monkeypatch):
+    run = repost_pipeline(monkeypatch, {1: ConnectionError("Timeout"), 2: seller("alt", 400)})
+    _, dropped = run([make_listing(1)])
+    assert dropped == {1: "seller_info"}
+    survivors, _ = run([make_listing(2)])
+    assert [c.item.id for c in survivors] == [2]
+
+
+def test_short_titles_without_description_are_not_fingerprinted():
+    assert main.repost_text(make_listing(1, title="iPhone 13")).strip() == "iPhone 13"
+    candidate = Candidate(make_listing(1, title="iPhone 13"), 0, {"price": 200.0})
+    assert main.stage_repost(candidate) and "fingerprint" not in candidate.ctx
+
+
+def test_stale_seller_verdicts_are_purged_on_load():
+    engine = create_engine('sqlite://', echo=False, future=True)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    crud = CRUDFingerprint(ListingFingerprint)
+    crud.load_index(db)
+    fingerprint = simhash(TEXT)
+    crud.remember(1, fingerprint, 35, "drop:seller_age")
+    crud.remember(2, fingerprint ^ 1, 35, "no_deal")
+    crud.flush(db)
+
+    restarted = CRUDFingerprint(ListingFingerprint)
+    restarted.load_index(db, exclude_verdicts=["drop:seller_age"])
+    assert restarted.find_repost(fingerprint, 35) == (2, "no_deal", 1)
+    db.close()